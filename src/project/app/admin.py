@@ -10,7 +10,7 @@ class StudentAdmin(admin.ModelAdmin):
 
 # app/admin.py (append)
 from django.contrib import admin
-from .models import Activity, EventSlot, Registration, Submission, PointLedger, Reward, Redemption, BadgeThreshold
+from .models import Activity, EventSlot, Registration, Submission, PointLedger, PointLedgerArchive, Reward, Redemption, BadgeThreshold, StudentBadge
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
@@ -20,14 +20,33 @@ class ActivityAdmin(admin.ModelAdmin):
 
 @admin.register(EventSlot)
 class EventSlotAdmin(admin.ModelAdmin):
-    list_display = ("activity","start_at","end_at","max_participants","registered_count","location")
+    list_display = ("activity","start_at","end_at","max_participants","registered_count","waitlisted_count","location")
     list_filter = ("activity","start_at")
     search_fields = ("activity__title","location")
+    # the counters belong to the registration services (row lock + F()); an
+    # admin save must never write back the values its form happened to load
+    COUNTERS = ("registered_count", "waitlisted_count")
+    readonly_fields = COUNTERS
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save(update_fields=[f.name for f in obj._meta.concrete_fields
+                                    if not f.primary_key and f.name not in self.COUNTERS])
+        else:
+            super().save_model(request, obj, form, change)
+        if change and "max_participants" in form.changed_data:
+            from .models import promote_waitlist
+            promote_waitlist(obj)
 
 @admin.register(Registration)
 class RegistrationAdmin(admin.ModelAdmin):
-    list_display = ("event","user","status","created_at")
+    list_display = ("event","user","status","waitlist_position","created_at")
     list_filter = ("status","event__activity")
+    def delete_model(self, request, obj):
+        from .models import remove_registrations
+        remove_registrations([obj])
+    def delete_queryset(self, request, queryset):
+        from .models import remove_registrations
+        remove_registrations(list(queryset))
 
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
@@ -35,26 +54,34 @@ class SubmissionAdmin(admin.ModelAdmin):
     list_filter = ("status","activity")
     search_fields = ("student__user__email","activity__title")
     actions = ["approve_selected","reject_selected"]
+    def _bulk(self, request, queryset, action):
+        from django.contrib import messages
+        from .models import bulk_verify_submissions, describe_outcomes
+        report = bulk_verify_submissions(queryset.values_list("pk", flat=True), request.user, action)
+        summary, ok = describe_outcomes(report)
+        self.message_user(request, summary, messages.SUCCESS if ok else messages.WARNING)
     def approve_selected(self, request, queryset):
-        for s in queryset:
-            try: 
-                from .models import approve_submission
-                approve_submission(s, request.user)
-            except Exception:
-                pass
+        self._bulk(request, queryset, "approve")
     def reject_selected(self, request, queryset):
-        for s in queryset:
-            try:
-                from .models import reject_submission
-                reject_submission(s, request.user)
-            except Exception:
-                pass
+        self._bulk(request, queryset, "reject")
 
 @admin.register(PointLedger)
 class PointLedgerAdmin(admin.ModelAdmin):
     list_display = ("user","activity","points","source","reference_id","created_at")
     list_filter = ("source","activity")
     search_fields = ("user__email","reference_id")
+    # Balances, standings, rollups and versions are derived from inserts only
+    # (record_ledger_rows); correct a row by adding a manual row instead.
+    def has_change_permission(self, request, obj=None):
+        return False
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(PointLedgerArchive)
+class PointLedgerArchiveAdmin(admin.ModelAdmin):
+    list_display = ("user","activity","points","source","reference_id","created_at","summary_ref")
+    list_filter = ("source",)
+    search_fields = ("user__email","reference_id","summary_ref")
 
 @admin.register(Reward)
 class RewardAdmin(admin.ModelAdmin):
@@ -67,8 +94,34 @@ class RedemptionAdmin(admin.ModelAdmin):
     list_display = ("user","reward","status","fulfilled_by","fulfilled_at","created_at")
     list_filter = ("status",)
     search_fields = ("user__email","reward__title")
+    def get_readonly_fields(self, request, obj=None):
+        # a canceled redemption was refunded; reopening it would spend nothing
+        return ("status",) if obj and obj.status == "canceled" else ()
+    def save_model(self, request, obj, form, change):
+        from django.db import transaction
+        from .models import cancel_redemption
+        with transaction.atomic():
+            if change and "status" in form.changed_data and obj.status == "canceled":
+                cancel_redemption(obj)
+            super().save_model(request, obj, form, change)
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.filter(pk=obj.pk))
+    def delete_queryset(self, request, queryset):
+        from django.db import transaction
+        from .models import cancel_redemption
+        with transaction.atomic():
+            for redemption in queryset:
+                cancel_redemption(redemption)
+            queryset.delete()
 
 @admin.register(BadgeThreshold)
 class BadgeThresholdAdmin(admin.ModelAdmin):
     list_display = ("code","name","percent_of_potential","active")
     list_filter = ("active",)
+
+@admin.register(StudentBadge)
+class StudentBadgeAdmin(admin.ModelAdmin):
+    list_display = ("user","threshold","earned","potential","awarded_at")
+    list_filter = ("threshold",)
+    search_fields = ("user__email",)
+    raw_id_fields = ("user",)
@@ -0,0 +1,121 @@
+# app/api.py
+"""
+Read-only JSON API (v1) for kiosks and mobile clients.
+
+Every endpoint returns a projection (.values()) rather than model instances
+and supports conditional GET. The ETag is built from version counters in the
+cache (app/versions.py) plus the request path, so a poll that matches
+If-None-Match gets a 304 before any big table is read. The check runs inside
+the DRF view, after authentication and permissions, so the ETag belongs to
+the authenticated user and anonymous callers never get a 304.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.decorators import api_view
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import leaderboard as lb
+from . import versions
+from .models import EventSlot, PointBalance, Registration
+
+def _etag(request, *parts):
+    # The minute bucket retires slots that ended without any write happening.
+    raw = "|".join(str(p) for p in (*parts, int(time.time() // 60), request.get_full_path()))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+def _events_etag(request, *args, **kwargs):
+    return _etag(request, "events", versions.get("events"))
+
+def _leaderboard_etag(request, *args, **kwargs):
+    return _etag(request, "leaderboard", versions.get("leaderboard"), lb.month_board())
+
+def conditional(etag_func):
+    """Answer If-None-Match with 304 once DRF has resolved request.user."""
+    def deco(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            etag = quote_etag(etag_func(request))
+            wanted = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag in wanted or "*" in wanted:
+                response = Response(status=304)
+            else:
+                response = view(request, *args, **kwargs)
+            response["ETag"] = etag
+            return response
+        return wrapped
+    return deco
+
+def _me_etag(request, *args, **kwargs):
+    # points and registrations move user:<pk>, rank moves with the leaderboard
+    vs = versions.get_many([f"user:{request.user.pk}", "events", "leaderboard"])
+    return _etag(request, "me", request.user.pk, *vs.values())
+
+class EventCursor(CursorPagination):
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    ordering = ("start_at", "id")
+
+EVENT_FIELDS = ("id", "activity_id", "start_at", "end_at", "location",
+                "max_participants", "registered_count", "waitlisted_count")
+
+@api_view(["GET"])
+@conditional(_events_etag)
+def events(request):
+    qs = (EventSlot.objects
+          .filter(end_at__gte=timezone.now())
+          .values(*EVENT_FIELDS, title=F("activity__title"), tier=F("activity__tier")))
+    if request.query_params.get("include_full") != "true":
+        qs = qs.filter(registered_count__lt=F("max_participants"))
+    paginator = EventCursor()
+    page = paginator.paginate_queryset(qs, request)
+    return paginator.get_paginated_response(page)
+
+@api_view(["GET"])
+@conditional(_leaderboard_etag)
+def leaderboard(request):
+    board = request.query_params.get("board") or lb.OVERALL
+    try:
+        limit = min(100, max(1, int(request.query_params.get("limit", 25))))
+    except ValueError:
+        limit = 25
+    rows, cursor = lb.top(board, limit=limit, after=request.query_params.get("after"))
+    nxt = None
+    if cursor:
+        q = request.query_params.copy()
+        q["after"] = cursor
+        nxt = request.build_absolute_uri(f"{request.path}?{q.urlencode()}")
+    return Response({
+        "board": board,
+        "next": nxt,
+        "results": [{"user_id": r["user__id"], "name": r["user__first_name"],
+                     "points": r["total"], "rank": r["rank"]} for r in rows],
+    })
+
+@api_view(["GET"])
+@conditional(_me_etag)
+def me(request):
+    user = request.user
+    balance = (PointBalance.objects.filter(user=user)
+               .values("earned", "spent", "available").first()
+               or {"earned": 0, "spent": 0, "available": 0})
+    regs = list(Registration.objects
+                .filter(user=user, event__end_at__gte=timezone.now())
+                .exclude(status="canceled")
+                .order_by("event__start_at")
+                .values("id", "status", "waitlist_position", "event_id",
+                        start_at=F("event__start_at"), end_at=F("event__end_at"),
+                        location=F("event__location"), title=F("event__activity__title"))[:50])
+    return Response({
+        "user_id": user.pk,
+        "name": user.first_name,
+        "points": balance,
+        "rank": lb.rank_of(lb.OVERALL, user),
+        "upcoming_registrations": regs,
+    })
@@ -0,0 +1,108 @@
+# app/archival.py
+"""
+Keep PointLedger small: months older than settings.LEDGER_ARCHIVE_AFTER_DAYS
+are moved row for row into PointLedgerArchive and replaced by one "summary"
+ledger row per (user, activity, month), dated at the start of that month.
+
+Every aggregate reads the same numbers before and after: the per-user sum is
+unchanged (balances, leaderboards) and so is every per-month sum (monthly
+boards, rollups, total_points over whole months). Submission references keep
+their idempotency through already_credited(), which checks both tables.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import profile_cache
+from .models import PointLedger, PointLedgerArchive
+from .rollups import add_months, month_start
+
+BATCH = 1000
+
+def _aware(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+def cutoff(days=None, now=None):
+    """Start of the month holding now - horizon; only whole months before it move."""
+    days = settings.LEDGER_ARCHIVE_AFTER_DAYS if days is None else days
+    return _aware(month_start((now or timezone.now()) - timedelta(days=days)))
+
+def summary_ref(user_id, activity_id, period) -> str:
+    return f"summary:{user_id}:{activity_id}:{period:%Y-%m}"
+
+def _delete_rows(ids, size=500):
+    """
+    Plain DELETE by id. QuerySet.delete() would load every row to send
+    post_delete; totals don't move here and archive() invalidates the
+    affected profiles once.
+    """
+    table = connection.ops.quote_name(PointLedger._meta.db_table)
+    with connection.cursor() as cur:
+        for i in range(0, len(ids), size):
+            part = ids[i:i + size]
+            cur.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(part))})", part)
+
+def _month_qs(start, end):
+    return (PointLedger.objects.filter(created_at__gte=start, created_at__lt=end)
+            .exclude(source="summary"))
+
+@transaction.atomic
+def archive_month(period):
+    """Move one month (a date on the 1st) into the archive. Returns (rows moved, summaries touched)."""
+    start, end = _aware(period), _aware(add_months(period, 1))
+    totals, moved = {}, 0
+    qs = _month_qs(start, end).order_by("id").values_list(
+        "id", "user_id", "activity_id", "points", "source", "reference_id", "created_at")
+    while True:
+        chunk = list(qs[:BATCH])
+        if not chunk:
+            break
+        archived = []
+        for pk, uid, aid, pts, source, ref, created in chunk:
+            totals[uid, aid] = totals.get((uid, aid), 0) + pts
+            archived.append(PointLedgerArchive(
+                ledger_id=pk, user_id=uid, activity_id=aid, points=pts, source=source,
+                reference_id=ref, created_at=created, summary_ref=summary_ref(uid, aid, period)))
+        PointLedgerArchive.objects.bulk_create(archived)
+        _delete_rows([row[0] for row in chunk])
+        moved += len(chunk)
+
+    # Fold into existing summaries (a late row for an already archived month) or add new ones.
+    refs = {summary_ref(uid, aid, period): (uid, aid, pts) for (uid, aid), pts in totals.items()}
+    existing = set(PointLedger.objects.filter(source="summary", reference_id__in=list(refs))
+                   .values_list("reference_id", flat=True))
+    for ref in existing:
+        PointLedger.objects.filter(source="summary", reference_id=ref).update(points=F("points") + refs[ref][2])
+    new = [PointLedger(user_id=uid, activity_id=aid, points=pts, source="summary", reference_id=ref)
+           for ref, (uid, aid, pts) in refs.items() if ref not in existing]
+    PointLedger.objects.bulk_create(new, batch_size=500)  # no save(): derived tables already count these points
+    # auto_now_add stamped "now"; date them inside the month they stand for
+    PointLedger.objects.filter(source="summary", reference_id__in=[o.reference_id for o in new]).update(created_at=start)
+    return moved, len(refs)
+
+def pending_months(before):
+    return list(PointLedger.objects.filter(created_at__lt=before).exclude(source="summary")
+                .annotate(m=TruncMonth("created_at")).values_list("m", flat=True)
+                .distinct().order_by("m"))
+
+def archive(days=None, dry_run=False) -> dict:
+    """Archive every whole month older than the horizon, one transaction per month."""
+    before = cutoff(days)
+    months = [month_start(m) for m in pending_months(before)]
+    report = {"cutoff": before, "months": len(months), "rows": 0, "summaries": 0}
+    if dry_run:
+        report["rows"] = PointLedger.objects.filter(created_at__lt=before).exclude(source="summary").count()
+        return report
+    users = set()
+    for period in months:
+        start, end = _aware(period), _aware(add_months(period, 1))
+        users.update(_month_qs(start, end).values_list("user_id", flat=True).distinct())
+        moved, summaries = archive_month(period)
+        report["rows"] += moved
+        report["summaries"] += summaries
+    profile_cache.invalidate(users)
+    return report
@@ -0,0 +1,36 @@
+# app/auth_backends.py
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+
+
+def normalize_email(email) -> str:
+    return (email or "").strip().lower()
+
+
+def find_by_email(email):
+    """One query, served by the unique LOWER(email) index (migration 0010)."""
+    # email > '' repeats the index predicate so the planner can use the partial index
+    return (User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower=normalize_email(email), email__gt="").first())
+
+
+class EmailBackend(ModelBackend):
+    """
+    authenticate(request, email=..., password=...). Accepts an email passed as
+    `username` as well, so the admin login form works with either.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = email or username
+        if not email or password is None or "@" not in email:
+            return None
+        user = find_by_email(email)
+        if user is None:
+            # hash anyway so a miss takes as long as a wrong password
+            User().set_password(password)
+            return None
+        # check_password re-hashes with current parameters when they changed
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
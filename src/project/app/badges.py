@@ -0,0 +1,63 @@
+# app/badges.py
+"""
+Badge engine for BadgeThreshold.
+
+A student's potential is the sum of Activity tiers over every event slot that
+has finished since they joined; earned is PointBalance.earned. A student gets
+every active threshold whose percent_of_potential their earned/potential
+reaches. Awards are permanent (StudentBadge keeps the figures at award time).
+
+evaluate() scores a set of students in one query (potential is a correlated
+SUM over the slot start_at index), so the full pass and the incremental
+one after new ledger rows share the same code.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BadgeThreshold, EventSlot, StudentBadge
+
+def scores(user_ids=None, now=None):
+    """[(user_id, earned, potential)] for students (optionally just `user_ids`)."""
+    now = now or timezone.now()
+    potential = (EventSlot.objects
+                 .filter(start_at__gte=OuterRef("date_joined"), end_at__lte=now)
+                 .order_by()
+                 .annotate(total=Func(F("activity__tier"), function="SUM"))
+                 .values("total"))
+    qs = User.objects.filter(student__isnull=False)
+    if user_ids is not None:
+        qs = qs.filter(pk__in=list(user_ids))
+    return list(qs.annotate(
+        earned=Coalesce(F("point_balance__earned"), 0),
+        potential=Coalesce(Subquery(potential, output_field=IntegerField()), 0),
+    ).values_list("id", "earned", "potential"))
+
+def evaluate(user_ids=None, now=None):
+    """Award newly reached badges; returns the number of StudentBadge rows created."""
+    from . import profile_cache
+    thresholds = list(BadgeThreshold.objects.filter(active=True).values_list("id", "percent_of_potential"))
+    if not thresholds:
+        return 0
+    awards = []
+    for uid, earned, potential in scores(user_ids, now):
+        if potential <= 0:
+            continue
+        pct = earned * 100 / potential
+        awards.extend(StudentBadge(user_id=uid, threshold_id=tid, earned=earned, potential=potential)
+                      for tid, need in thresholds if pct >= need)
+    if not awards:
+        return 0
+    have = set(StudentBadge.objects.filter(user_id__in={a.user_id for a in awards})
+               .values_list("user_id", "threshold_id"))
+    new = [a for a in awards if (a.user_id, a.threshold_id) not in have]
+    StudentBadge.objects.bulk_create(new, ignore_conflicts=True)
+    profile_cache.invalidate({a.user_id for a in new})
+    return len(new)
+
+def evaluate_after_commit(user_ids):
+    """Re-score just these students once the ledger rows are committed."""
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: evaluate(user_ids))
@@ -0,0 +1,105 @@
+# app/batching.py
+"""
+Group-commit sign-ups for popular EventSlots.
+
+Concurrent callers for the same slot queue up here. The first one becomes the
+leader: it waits `window` seconds for company, then resolves up to `max_batch`
+queued requests with one locked transaction (models.register_users_for_event)
+and keeps going until the queue is empty. Everyone else just waits for their
+own result. Only requests running at the same time in the same process are
+batched together, so this pays off with threaded WSGI workers only. Under ASGI
+every sync view runs in the one thread-sensitive thread, so sign-ups never
+overlap and each batch holds a single request.
+
+If the batched insert fails on a constraint (say, someone registered through
+another path in between), each request in it is retried on its own, so one
+bad row costs its own request an error instead of failing the whole batch.
+"""
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import register_users_for_event, register_user_for_event
+
+class StillProcessing(Exception):
+    """The leader hasn't finished our batch in time; it may still commit."""
+
+def _register_one(user, event):
+    try:
+        return register_user_for_event(user, event)
+    except ValueError as e:
+        return e
+    except IntegrityError:
+        return ValueError("Could not register you for this event; please try again.")
+
+class RegistrationBatcher:
+    def __init__(self, window=0.005, max_batch=64, timeout=30):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = {}     # event pk -> [(user, Future)]
+        self._leading = set()  # event pks with an active leader
+
+    def submit(self, user, event):
+        fut = Future()
+        with self._lock:
+            self._pending.setdefault(event.pk, []).append((user, fut))
+            lead = event.pk not in self._leading
+            if lead:
+                self._leading.add(event.pk)
+        if lead:
+            self._drain(event)
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise StillProcessing("Your registration is still being processed.") from None
+
+    def _take(self, event_pk):
+        with self._lock:
+            queue = self._pending.get(event_pk, [])
+            batch, rest = queue[:self.max_batch], queue[self.max_batch:]
+            if rest:
+                self._pending[event_pk] = rest
+            else:
+                self._pending.pop(event_pk, None)
+            if not batch:
+                self._leading.discard(event_pk)
+            return batch
+
+    def _drain(self, event):
+        try:
+            time.sleep(self.window)
+            while True:
+                batch = self._take(event.pk)
+                if not batch:
+                    return
+                try:
+                    results = register_users_for_event(event, [u for u, _ in batch])
+                except IntegrityError:
+                    results = [_register_one(u, event) for u, _ in batch]
+                except Exception as e:  # the whole batch failed (e.g. DB error)
+                    results = [e] * len(batch)
+                for (_, fut), res in zip(batch, results):
+                    if isinstance(res, Exception):
+                        fut.set_exception(res)
+                    else:
+                        fut.set_result(res)
+        except BaseException:
+            with self._lock:
+                self._leading.discard(event.pk)
+            raise
+
+batcher = RegistrationBatcher()
+
+def register(user, event):
+    """Entry point for views: batched when REGISTRATION_GROUP_COMMIT is on."""
+    if not getattr(settings, "REGISTRATION_GROUP_COMMIT", False):
+        return register_user_for_event(user, event)
+    if timezone.now() > event.end_at:
+        raise ValueError("Event already ended.")
+    return batcher.submit(user, event)
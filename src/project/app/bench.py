@@ -0,0 +1,84 @@
+# app/bench.py
+"""Small timing helpers shared by the bench_* management commands."""
+import threading
+import time
+
+from django.db import connection
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+def summarize(latencies, elapsed, errors=0):
+    n = len(latencies)
+    return {
+        "ops": n,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(n / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+def run_concurrently(fn, items):
+    """
+    Call fn(item) for every item on its own thread, all released at once.
+    Returns (summary, results) where failed calls yield their exception.
+    """
+    barrier = threading.Barrier(len(items) + 1)
+    results = [None] * len(items)
+    latencies = [0.0] * len(items)
+
+    def worker(i, item):
+        barrier.wait()
+        t0 = time.perf_counter()
+        try:
+            results[i] = fn(item)
+        except Exception as e:
+            results[i] = e
+        finally:
+            latencies[i] = time.perf_counter() - t0
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i, it)) for i, it in enumerate(items)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    errors = sum(1 for r in results if isinstance(r, Exception) and not isinstance(r, ValueError))
+    return summarize(latencies, elapsed, errors), results
+
+def time_calls(fn, repeat):
+    """Run fn() `repeat` times sequentially; returns the summary dict."""
+    latencies = []
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - t0)
+
+def compare(baseline, current, threshold=0.25, min_ms=0.5):
+    """
+    Match run_benchmarks results ({size: {"ops": {op: summary}}}) against a
+    baseline. A case regresses when its p50 grew by more than `threshold`
+    (a fraction) and by at least `min_ms`, so sub-millisecond jitter is ignored.
+    """
+    rows = []
+    for size, run in current.items():
+        base_ops = baseline.get(size, {}).get("ops", {})
+        for op, summary in run["ops"].items():
+            if op not in base_ops:
+                continue
+            before, after = base_ops[op]["p50_ms"], summary["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            rows.append({"size": size, "op": op, "baseline_p50_ms": before, "p50_ms": after,
+                         "change": round(change, 3),
+                         "regressed": change > threshold and after - before >= min_ms})
+    return rows
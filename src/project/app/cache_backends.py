@@ -0,0 +1,185 @@
+# app/cache_backends.py
+"""
+A cache every worker process on the host can share, with no cache server.
+
+SharedFileCache keeps entries in one small SQLite file (by default on
+/dev/shm, i.e. in shared memory), opened in WAL mode and memory-mapped by
+each process. SQLite's file locking makes add/incr/decr atomic across
+processes. Entries carry an absolute expiry, are skipped once stale and are
+culled when the table passes MAX_ENTRIES, which bounds its size.
+
+    CACHES = {"default": {
+        "BACKEND": "app.cache_backends.SharedFileCache",
+        "LOCATION": "/dev/shm/eco-campus-cache.sqlite3",
+        "OPTIONS": {"MAX_ENTRIES": 20000, "MMAP_SIZE": 64 * 1024 * 1024},
+    }}
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+"""
+_LIVE = "(expires IS NULL OR expires > ?)"
+
+class SharedFileCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._mmap_size = int(options.get("MMAP_SIZE", 64 * 1024 * 1024))
+        self._cull_every = int(options.get("CULL_EVERY", 64))  # check size ~1 in N writes
+        self._local = threading.local()
+
+    # ----- connection handling -----
+    def _conn(self):
+        # "fast" connections never wait for a lock; see the async API below
+        attr = "fast_conn" if getattr(self._local, "fast", False) else "conn"
+        conn = getattr(self._local, attr, None)
+        if conn is None or getattr(self._local, attr + "_pid", None) != os.getpid():  # never reuse across fork
+            conn = sqlite3.connect(self._path, timeout=0 if attr == "fast_conn" else 10,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # it's a cache; losing it is fine
+            conn.execute(f"PRAGMA mmap_size={self._mmap_size}")
+            conn.executescript(_SCHEMA)
+            setattr(self._local, attr, conn)
+            setattr(self._local, attr + "_pid", os.getpid())
+        return conn
+
+    # ----- value encoding: ints stay native so incr can be done in SQL -----
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(raw):
+        return raw if isinstance(raw, int) else pickle.loads(raw)
+
+    # ----- BaseCache API -----
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            f"SELECT value FROM cache WHERE key = ? AND {_LIVE}", (key, time.time())).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, self._encode(value), self.get_backend_timeout(timeout)))
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cur = self._conn().execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._encode(value), self.get_backend_timeout(timeout), time.time()))
+        self._maybe_cull()
+        return cur.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cur = self._conn().execute(
+            f"UPDATE cache SET expires = ? WHERE key = ? AND {_LIVE}",
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return cur.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            f"UPDATE cache SET value = value + ? WHERE key = ? AND {_LIVE} "
+            "AND typeof(value) = 'integer' RETURNING value",
+            (delta, key, time.time())).fetchone()
+        if row is None:
+            # missing, expired, or a pickled non-int (e.g. float): BaseCache semantics
+            row = self._conn().execute(
+                f"SELECT value FROM cache WHERE key = ? AND {_LIVE}", (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            self._conn().execute("UPDATE cache SET value = ? WHERE key = ?", (self._encode(value), key))
+            return value
+        return row[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conn().execute(
+            f"SELECT 1 FROM cache WHERE key = ? AND {_LIVE}", (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conn().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount == 1
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    # ----- async API -----
+    # An entry lookup is a local SQLite read (microseconds on /dev/shm), far
+    # cheaper than BaseCache's hop to a worker thread, so async callers first
+    # try inline on a connection with no busy timeout. If another process holds
+    # the write lock that fails at once, and the call is retried on a worker
+    # thread, which may wait; the event loop never does.
+    async def _inline(self, method, *args):
+        self._local.fast = True
+        try:
+            return method(*args)
+        except sqlite3.OperationalError:  # "database is locked"
+            pass
+        finally:
+            self._local.fast = False
+        return await sync_to_async(method, thread_sensitive=False)(*args)
+
+    async def aget(self, key, default=None, version=None):
+        return await self._inline(self.get, key, default, version)
+
+    async def aget_many(self, keys, version=None):
+        return await self._inline(self.get_many, keys, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        await self._inline(self.set, key, value, timeout, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._inline(self.add, key, value, timeout, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return await self._inline(self.incr, key, delta, version)
+
+    async def ahas_key(self, key, version=None):
+        return await self._inline(self.has_key, key, version)
+
+    async def adelete(self, key, version=None):
+        return await self._inline(self.delete, key, version)
+
+    # ----- bounded size -----
+    def _maybe_cull(self):
+        # Inline async writes skip culling: a busy cull after a successful add
+        # would make the retry report the key as already present.
+        if getattr(self._local, "fast", False) or random.randrange(self._cull_every):
+            return
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            # drop the soonest-to-expire fraction, like the DB/file caches do
+            doomed = count // self._cull_frequency if self._cull_frequency else count
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+                (max(doomed, count - self._max_entries),))
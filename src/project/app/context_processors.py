@@ -0,0 +1,34 @@
+# app/context_processors.py
+from .permissions import is_volunteer
+
+
+def verify_badge(request):
+    """Pending-submission count for the nav badge (verifiers only)."""
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated or not (user.is_staff or is_volunteer(user)):
+        return {}
+    if hasattr(request, "pending_count"):  # async views fetch it up front
+        return {"pending_count": request.pending_count}
+    from .verification import pending_count
+    return {"pending_count": pending_count()}
+
+
+async def aprepare(request):
+    """
+    For async views: resolve the user, their Student row and the nav badge
+    count with async queries, so rendering (auth/verify_badge processors,
+    user.student in templates) does not touch the database from the event loop.
+    Returns (user, student or None).
+    """
+    from django.contrib.auth.models import User
+    from .models import Student
+    from .verification import apending_count
+    user = await request.auser()
+    request.user = user
+    student = None
+    if user.is_authenticated:
+        student = await Student.objects.filter(user=user).afirst()
+        User.student.related.set_cached_value(user, student)  # None caches "no profile"
+        if user.is_staff or (student and student.role == "volunteer"):
+            request.pending_count = await apending_count()
+    return user, student
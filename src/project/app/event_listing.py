@@ -0,0 +1,90 @@
+# app/event_listing.py
+"""
+Active-events listing: list or calendar (week/month) windows, tier and
+location filters, keyset pages on (start_at, id).
+
+Rows are values() projections (activity title/tier come along in the same
+query) and every page is a bounded index range scan, so the page cost does
+not grow with the number of slots in the table.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EventSlot
+from .rollups import add_months
+
+PAGE_SIZE = 20
+MODES = ("list", "week", "month")
+
+FIELDS = ("id", "start_at", "end_at", "location", "max_participants",
+          "registered_count", "waitlisted_count", "activity__title", "activity__tier")
+
+def window(mode: str, anchor: date):
+    """[start, end) of the week (Mon-Sun) or month containing `anchor`, plus prev/next anchors."""
+    if mode == "week":
+        lo = anchor - timedelta(days=anchor.weekday())
+        hi = lo + timedelta(days=7)
+        return lo, hi, lo - timedelta(days=7), hi
+    lo = anchor.replace(day=1)
+    hi = add_months(lo, 1)
+    return lo, hi, add_months(lo, -1), hi
+
+def _aware(d: date):
+    return timezone.make_aware(datetime.combine(d, datetime.min.time()))
+
+def encode_cursor(row):
+    return f'{row["start_at"].isoformat()}~{row["id"]}'
+
+def decode_cursor(value):
+    try:
+        ts, pk = value.split("~")
+        return datetime.fromisoformat(ts), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+def _locations_qs():
+    return (EventSlot.objects.filter(end_at__gte=timezone.now())
+            .order_by("location").values_list("location", flat=True).distinct())
+
+def locations():
+    """Distinct locations of slots that haven't ended (for the filter dropdown)."""
+    return list(_locations_qs())
+
+async def alocations():
+    return [loc async for loc in _locations_qs()]
+
+def _page_qs(mode, anchor, tier, location, include_full, after, limit):
+    qs = EventSlot.objects.filter(end_at__gte=timezone.now())
+    if mode in ("week", "month"):
+        lo, hi, _, _ = window(mode, anchor or timezone.localdate())
+        qs = qs.filter(start_at__gte=_aware(lo), start_at__lt=_aware(hi))
+    if not include_full:
+        qs = qs.filter(registered_count__lt=F("max_participants"))
+    if tier:
+        qs = qs.filter(activity__tier=tier)
+    if location:
+        qs = qs.filter(location=location)
+    pos = decode_cursor(after) if after else None
+    if pos:
+        qs = qs.filter(Q(start_at__gt=pos[0]) | Q(start_at=pos[0], id__gt=pos[1]))
+    return qs.order_by("start_at", "id").values(*FIELDS)[:limit + 1]
+
+def _cut(rows, limit):
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (encode_cursor(rows[-1]) if more else None)
+
+def active_page(mode="list", anchor=None, tier=None, location=None,
+                include_full=False, after=None, limit=PAGE_SIZE):
+    """
+    Returns (rows, next_cursor). In week/month mode only slots starting
+    inside that window are listed; in every mode slots that already ended are hidden.
+    """
+    return _cut(list(_page_qs(mode, anchor, tier, location, include_full, after, limit)), limit)
+
+async def aactive_page(mode="list", anchor=None, tier=None, location=None,
+                       include_full=False, after=None, limit=PAGE_SIZE):
+    qs = _page_qs(mode, anchor, tier, location, include_full, after, limit)
+    return _cut([row async for row in qs], limit)
@@ -0,0 +1,195 @@
+# app/leaderboard.py
+"""
+Ranked standings kept up to date from PointLedger writes.
+
+Each board ("all" plus one per calendar month) stores one LeaderboardEntry per
+user and a LeaderboardScore histogram of how many users hold each score.
+Pages and neighbours are keyset reads on (board, -score, user); a rank is
+1 + the users on strictly higher scores, summed over the (small) histogram.
+None of it touches PointLedger after the rows are written.
+"""
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import LeaderboardEntry, LeaderboardScore, PointLedger
+
+OVERALL = "all"
+
+def month_board(dt=None) -> str:
+    return timezone.localtime(dt or timezone.now()).strftime("%Y-%m")
+
+# ----- writes -----
+def _shift_bucket(board, score, n):
+    if not LeaderboardScore.objects.filter(board=board, score=score).update(users=F("users") + n):
+        LeaderboardScore.objects.get_or_create(board=board, score=score)
+        LeaderboardScore.objects.filter(board=board, score=score).update(users=F("users") + n)
+
+def apply_deltas(deltas):
+    """deltas: {(board, user_id): points}. Call inside the ledger transaction."""
+    for (board, user_id), pts in sorted(deltas.items()):
+        if not pts:
+            continue
+        entry, created = (LeaderboardEntry.objects.select_for_update()
+                          .get_or_create(board=board, user_id=user_id))
+        old = entry.score
+        LeaderboardEntry.objects.filter(pk=entry.pk).update(score=old + pts)
+        if not created:
+            _shift_bucket(board, old, -1)
+        _shift_bucket(board, old + pts, +1)
+
+def apply_rows(rows):
+    deltas = {}
+    for row in rows:
+        for board in (OVERALL, month_board(row.created_at)):
+            key = (board, row.user_id)
+            deltas[key] = deltas.get(key, 0) + row.points
+    apply_deltas(deltas)
+
+@transaction.atomic
+def rebuild():
+    """Recompute every board from the ledger (migrations, repairs)."""
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardScore.objects.all().delete()
+    totals = {}
+    for uid, pts in PointLedger.objects.values_list("user_id").annotate(s=Sum("points")).order_by():
+        totals[(OVERALL, uid)] = pts
+    monthly = (PointLedger.objects.annotate(m=TruncMonth("created_at"))
+               .values_list("m", "user_id").annotate(s=Sum("points")).order_by())
+    for m, uid, pts in monthly:
+        totals[(month_board(m), uid)] = pts
+    LeaderboardEntry.objects.bulk_create(
+        [LeaderboardEntry(board=b, user_id=uid, score=pts) for (b, uid), pts in totals.items()],
+        batch_size=1000)
+    hist = {}
+    for (b, _), pts in totals.items():
+        hist[(b, pts)] = hist.get((b, pts), 0) + 1
+    LeaderboardScore.objects.bulk_create(
+        [LeaderboardScore(board=b, score=sc, users=n) for (b, sc), n in hist.items()],
+        batch_size=1000)
+    return len(totals)
+
+# ----- reads -----
+# Each read has an async twin (a*) for the async views; they share the
+# queryset builders and only differ in how the queries are awaited.
+def rank_of_score(board, score) -> int:
+    above = (LeaderboardScore.objects.filter(board=board, score__gt=score)
+             .aggregate(n=Sum("users"))["n"] or 0)
+    return above + 1
+
+async def arank_of_score(board, score) -> int:
+    above = (await LeaderboardScore.objects.filter(board=board, score__gt=score)
+             .aaggregate(n=Sum("users")))["n"] or 0
+    return above + 1
+
+def _score_of(board, user):
+    return LeaderboardEntry.objects.filter(board=board, user=user).values_list("score", flat=True)
+
+def rank_of(board, user):
+    """The user's rank on `board`, or None if they have no points there."""
+    score = _score_of(board, user).first()
+    return None if score is None else rank_of_score(board, score)
+
+async def arank_of(board, user):
+    score = await _score_of(board, user).afirst()
+    return None if score is None else await arank_of_score(board, score)
+
+def _values(qs):
+    return qs.values("user__id", "user__first_name", total=F("score"))
+
+def _rows(qs):
+    return list(_values(qs))
+
+async def _arows(qs):
+    return [row async for row in _values(qs)]
+
+def _ties_before(board, head):
+    return LeaderboardEntry.objects.filter(board=board, score=head["total"], user_id__lt=head["user__id"])
+
+def _apply_ranks(rows, first, pos):
+    head = rows[0]
+    for i, row in enumerate(rows):
+        if row["total"] == head["total"]:
+            row["rank"] = first
+        elif row["total"] == rows[i - 1]["total"]:
+            row["rank"] = rows[i - 1]["rank"]
+        else:
+            row["rank"] = pos + i
+    return rows
+
+def _ranked(board, rows):
+    # Rows are contiguous in (-score, user) order, so one histogram read plus
+    # the tie offset of the first row places every row on the page.
+    if not rows:
+        return rows
+    first = rank_of_score(board, rows[0]["total"])
+    return _apply_ranks(rows, first, first + _ties_before(board, rows[0]).count())
+
+async def _aranked(board, rows):
+    if not rows:
+        return rows
+    first = await arank_of_score(board, rows[0]["total"])
+    return _apply_ranks(rows, first, first + await _ties_before(board, rows[0]).acount())
+
+def encode_cursor(row):
+    return f'{row["total"]}:{row["user__id"]}'
+
+def decode_cursor(cursor):
+    try:
+        score, uid = cursor.split(":")
+        return int(score), int(uid)
+    except (AttributeError, ValueError):
+        return None
+
+def _page_qs(board, after, limit):
+    qs = LeaderboardEntry.objects.filter(board=board).order_by("-score", "user_id")
+    pos = decode_cursor(after) if after else None
+    if pos:
+        qs = qs.filter(Q(score__lt=pos[0]) | Q(score=pos[0], user_id__gt=pos[1]))
+    return qs[:limit + 1]
+
+def _cut(rows, limit):
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (encode_cursor(rows[-1]) if more else None)
+
+def top(board=OVERALL, limit=20, after=None):
+    """One page of standings. Returns (rows, next_cursor)."""
+    return _cut(_ranked(board, _rows(_page_qs(board, after, limit))), limit)
+
+async def atop(board=OVERALL, limit=20, after=None):
+    return _cut(await _aranked(board, await _arows(_page_qs(board, after, limit))), limit)
+
+def _neighbours(board, user, me, radius):
+    base = LeaderboardEntry.objects.filter(board=board)
+    above = (base.filter(Q(score__gt=me) | Q(score=me, user_id__lt=user.id))
+             .order_by("score", "-user_id")[:radius])
+    rest = (base.filter(Q(score__lt=me) | Q(score=me, user_id__gte=user.id))
+            .order_by("-score", "user_id")[:radius + 1])
+    return above, rest
+
+def _mark(rows, ranks, user, me):
+    for row in rows:
+        row["rank"] = ranks[row["total"]]
+        row["is_me"] = row["user__id"] == user.id
+    return {"rank": ranks[me], "score": me, "rows": rows}
+
+def around(board, user, radius=2):
+    """The user's own row plus up to `radius` neighbours either side, or None."""
+    me = _score_of(board, user).first()
+    if me is None:
+        return None
+    above, rest = _neighbours(board, user, me, radius)
+    rows = _rows(above)[::-1] + _rows(rest)
+    ranks = {score: rank_of_score(board, score) for score in {r["total"] for r in rows}}
+    return _mark(rows, ranks, user, me)
+
+async def aaround(board, user, radius=2):
+    me = await _score_of(board, user).afirst()
+    if me is None:
+        return None
+    above, rest = _neighbours(board, user, me, radius)
+    rows = (await _arows(above))[::-1] + await _arows(rest)
+    ranks = {score: await arank_of_score(board, score) for score in {r["total"] for r in rows}}
+    return _mark(rows, ranks, user, me)
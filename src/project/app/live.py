@@ -0,0 +1,118 @@
+# app/live.py
+"""
+Live capacity updates for the events page (server-sent events over ASGI).
+
+One Hub per process keeps the open /events/stream/ connections, indexed by
+the EventSlot ids each one shows. Registration changes call notify() after
+commit; notifications arriving within COALESCE seconds are folded into a
+single flush, which reads all dirty slots in one query and pushes only rows
+that actually changed to the watchers of those slots. Writes made by other
+worker processes are picked up by polling the shared "events" version
+counter (app/versions.py), which triggers the same single-query flush.
+"""
+import asyncio
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import versions
+from .models import EventSlot
+
+COALESCE = 0.25      # seconds to gather a burst of changes into one flush
+VERSION_POLL = 1.0   # seconds between checks for writes from other processes
+QUEUE_SIZE = 64
+
+FIELDS = ("id", "registered_count", "max_participants", "waitlisted_count")
+
+def payload(row):
+    return {**row, "full": row["registered_count"] >= row["max_participants"]}
+
+async def snapshot(ids):
+    return [payload(row) async for row in EventSlot.objects.filter(pk__in=ids).values(*FIELDS)]
+
+class Hub:
+    def __init__(self, coalesce=COALESCE, poll=VERSION_POLL):
+        self.coalesce, self.poll = coalesce, poll
+        self.flushes = 0
+        self._loop = None
+        self._subs = {}                    # queue -> set(slot ids)
+        self._watchers = defaultdict(set)  # slot id -> {queue}
+        self._state = {}                   # slot id -> last payload sent
+        self._dirty = set()
+        self._pending = None
+        self._ticker = None
+
+    # ----- event-loop side -----
+    def subscribe(self, ids):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subs[queue] = set(ids)
+        for pk in ids:
+            self._watchers[pk].add(queue)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = self._loop.create_task(self._watch_version())
+        return queue
+
+    def unsubscribe(self, queue):
+        for pk in self._subs.pop(queue, ()):
+            watchers = self._watchers.get(pk)
+            if watchers is not None:
+                watchers.discard(queue)
+                if not watchers:
+                    del self._watchers[pk]
+                    self._state.pop(pk, None)
+        if not self._subs and self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+
+    def _mark(self, ids):
+        self._dirty.update(pk for pk in ids if pk in self._watchers)
+        if self._dirty and self._pending is None:
+            self._pending = self._loop.call_later(self.coalesce, self._start_flush)
+
+    def _start_flush(self):
+        self._pending = None
+        ids, self._dirty = self._dirty, set()
+        self._loop.create_task(self.flush(ids))
+
+    async def flush(self, ids):
+        """One query for `ids`; push rows that changed since the last flush."""
+        ids = [pk for pk in ids if pk in self._watchers]
+        if not ids:
+            return 0
+        self.flushes += 1
+        sent = 0
+        for row in await snapshot(ids):
+            if self._state.get(row["id"]) == row:
+                continue
+            self._state[row["id"]] = row
+            for queue in self._watchers.get(row["id"], ()):
+                try:
+                    queue.put_nowait(row)
+                    sent += 1
+                except asyncio.QueueFull:
+                    pass  # slow client; it gets the next change
+        return sent
+
+    async def _watch_version(self):
+        seen = await versions.aget("events")
+        while True:
+            await asyncio.sleep(self.poll)
+            current = await versions.aget("events")
+            if current != seen:
+                seen = current
+                await self.flush(set(self._watchers))
+
+    # ----- any thread -----
+    def notify(self, ids):
+        """Slots whose counts changed; safe to call from sync code and worker threads."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subs:
+            return
+        loop.call_soon_threadsafe(self._mark, list(ids))
+
+hub = Hub()
+
+def notify_after_commit(ids):
+    ids = list(ids)
+    transaction.on_commit(lambda: hub.notify(ids))
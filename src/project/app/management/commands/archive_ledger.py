@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import archival
+from app.models import PointLedger
+
+
+class Command(BaseCommand):
+    help = ("Move PointLedger rows older than LEDGER_ARCHIVE_AFTER_DAYS into PointLedgerArchive, "
+            "leaving one summary row per user, activity and month.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="override LEDGER_ARCHIVE_AFTER_DAYS")
+        parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        report = archival.archive(days=opts["days"], dry_run=opts["dry_run"])
+        verb = "would move" if opts["dry_run"] else "moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['rows']} row(s) from {report['months']} month(s) before "
+            f"{report['cutoff']:%Y-%m-%d} into {report['summaries']} summary row(s) "
+            f"in {time.perf_counter() - t0:.2f}s; {PointLedger.objects.count()} row(s) left in the ledger."))
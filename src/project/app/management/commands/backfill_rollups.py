@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild PointRollup month buckets from PointLedger in one grouped pass."
+
+    def handle(self, *args, **opts):
+        n = rollups.backfill()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {n} rollup bucket(s)."))
@@ -0,0 +1,72 @@
+import json
+import multiprocessing
+import os
+import tempfile
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import connection
+
+from app.bench import time_calls
+from app.cache_backends import SharedFileCache
+
+BENCH_TABLE = "bench_cache_table"
+
+
+def _incr_worker(path, n):
+    cache = SharedFileCache(path, {})
+    for _ in range(n):
+        cache.incr("shared-counter")
+
+
+class Command(BaseCommand):
+    help = ("Throughput of get/set/incr for LocMem, the database cache and "
+            "SharedFileCache, plus a cross-process incr correctness check.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=20000)
+        parser.add_argument("--processes", type=int, default=4)
+
+    def handle(self, *args, **opts):
+        ops = opts["ops"]
+        path = os.path.join(tempfile.gettempdir(), f"bench-shared-cache-{os.getpid()}.sqlite3")
+        creator = CreateCacheTable()
+        creator.verbosity = 0
+        creator.create_table("default", BENCH_TABLE, dry_run=False)
+        backends = {
+            "locmem": LocMemCache("bench", {"OPTIONS": {"MAX_ENTRIES": ops * 2}}),
+            "database": DatabaseCache(BENCH_TABLE, {"OPTIONS": {"MAX_ENTRIES": ops * 2}}),
+            "shared_file": SharedFileCache(path, {"OPTIONS": {"MAX_ENTRIES": ops * 2}}),
+        }
+        report = {}
+        try:
+            for name, cache in backends.items():
+                keys = iter(range(10 ** 12))
+                cache.set("counter", 0)
+                report[name] = {
+                    "set": time_calls(lambda: cache.set(f"k{next(keys) % 1000}", {"v": 1}, 300), ops),
+                    "get": time_calls(lambda: cache.get(f"k{next(keys) % 1000}"), ops),
+                    "incr": time_calls(lambda: cache.incr("counter"), ops),
+                }
+
+            shared = backends["shared_file"]
+            shared.set("shared-counter", 0)
+            procs, per_proc = opts["processes"], ops // opts["processes"]
+            ctx = multiprocessing.get_context("fork")
+            workers = [ctx.Process(target=_incr_worker, args=(path, per_proc)) for _ in range(procs)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            report["shared_file_cross_process_incr"] = {
+                "expected": procs * per_proc, "actual": shared.get("shared-counter"),
+            }
+        finally:
+            with connection.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        self.stdout.write(json.dumps(report, indent=2))
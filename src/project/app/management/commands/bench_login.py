@@ -0,0 +1,59 @@
+import json
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.auth_backends import find_by_email
+from app.bench import time_calls
+
+
+class _OldPBKDF2(PBKDF2PasswordHasher):
+    # stands in for hashes stored before the last iteration-count bump
+    iterations = PBKDF2PasswordHasher.iterations // 4
+
+
+class Command(BaseCommand):
+    help = "Time the login path: email lookup, hash verification, legacy two-step lookup and hash upgrades."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20000, help="rows in auth_user during the run")
+        parser.add_argument("--logins", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        n, logins = opts["users"], opts["logins"]
+        password = "correct horse battery staple"
+        report = {}
+        with transaction.atomic():
+            hashed = make_password(password)  # one hash, shared by every synthetic user
+            User.objects.bulk_create(
+                [User(username=f"bench{i}@login.test", email=f"Bench{i}@Login.test", password=hashed)
+                 for i in range(n)], batch_size=1000)
+            target = f"bench{n // 2}@login.test"
+
+            report["lookup_email_index"] = time_calls(lambda: find_by_email(target), logins * 10)
+            report["lookup_legacy_exact_email"] = time_calls(
+                lambda: User.objects.filter(email=f"Bench{n // 2}@Login.test").first(), logins * 10)
+            report["login_email_backend"] = time_calls(
+                lambda: authenticate(None, email=target, password=password), logins)
+            report["login_legacy_two_step"] = time_calls(
+                lambda: ModelBackend().authenticate(
+                    None, username=User.objects.get(email=f"Bench{n // 2}@Login.test").username,
+                    password=password), logins)
+            report["login_unknown_email"] = time_calls(
+                lambda: authenticate(None, email="nobody@login.test", password=password), logins)
+
+            # stale hash parameters: first login verifies with the old count, re-hashes and saves
+            old = User.objects.get(username=f"bench{n - 1}@login.test")
+            old.password = make_password(password, hasher=_OldPBKDF2())
+            old.save(update_fields=["password"])
+            report["login_with_hash_upgrade"] = time_calls(
+                lambda: authenticate(None, email=old.email, password=password), 1)
+            old.refresh_from_db()
+            report["hash_upgraded"] = old.password.split("$")[1] == str(PBKDF2PasswordHasher.iterations)
+            transaction.set_rollback(True)
+        report["users"] = n
+        self.stdout.write(json.dumps(report, indent=2))
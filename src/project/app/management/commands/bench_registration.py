@@ -0,0 +1,52 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.batching import RegistrationBatcher
+from app.bench import run_concurrently
+from app.models import Activity, EventSlot, Registration, register_user_for_event
+
+
+class Command(BaseCommand):
+    help = ("Compare per-request vs group-commit sign-ups for one EventSlot under "
+            "N concurrent clients. Creates and removes its own bench_* rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--capacity", type=int, default=150)
+        parser.add_argument("--window-ms", type=float, default=5.0)
+        parser.add_argument("--max-batch", type=int, default=64)
+
+    def handle(self, *args, **opts):
+        n = opts["clients"]
+        users = [User.objects.get_or_create(username=f"bench_reg_{i}")[0] for i in range(n)]
+        act = Activity.objects.create(title="bench_registration", tier=2)
+        try:
+            now = timezone.now()
+            report = {}
+            batcher = RegistrationBatcher(window=opts["window_ms"] / 1000.0, max_batch=opts["max_batch"])
+            modes = {
+                "per_request": register_user_for_event,
+                "group_commit": batcher.submit,
+            }
+            for mode, register in modes.items():
+                ev = EventSlot.objects.create(activity=act, start_at=now, end_at=now + timedelta(hours=1),
+                                              max_participants=opts["capacity"], location="bench")
+                summary, results = run_concurrently(lambda u: register(u, ev), users)
+                ev.refresh_from_db()
+                failed = [r for r in results if isinstance(r, Exception)]
+                if failed:
+                    summary["first_error"] = repr(failed[0])
+                summary["registered"] = Registration.objects.filter(event=ev, status="registered").count()
+                summary["waitlisted"] = Registration.objects.filter(event=ev, status="waitlisted").count()
+                summary["registered_count"] = ev.registered_count
+                report[mode] = summary
+            self.stdout.write(json.dumps(report, indent=2))
+        finally:
+            Registration.objects.filter(event__activity=act).delete()
+            EventSlot.objects.filter(activity=act).delete()
+            act.delete()
+            User.objects.filter(username__startswith="bench_reg_").delete()
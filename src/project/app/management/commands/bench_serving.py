@@ -0,0 +1,146 @@
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from app.bench import summarize
+from app.models import Student
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {k.strip().lower(): v.strip() for k, v in (l.split(":", 1) for l in lines[1:] if ":" in l)}
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def _client(host, port, paths, cookie, deadline, latencies, failures):
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write((f"GET {path} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n"
+                          "Connection: keep-alive\r\n\r\n").encode())
+            await writer.drain()
+            status, keep = await _read_response(reader)
+            if status != 200:
+                failures.append(status)
+            else:
+                latencies.append(time.perf_counter() - t0)
+            if not keep:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            failures.append("io")
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def _load(host, port, paths, cookie, clients, duration):
+    latencies, failures = [], []
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    await asyncio.gather(*(_client(host, port, paths, cookie, deadline, latencies, failures)
+                           for _ in range(clients)))
+    summary = summarize(latencies, time.perf_counter() - t0, errors=len(failures))
+    summary["rps"] = summary.pop("ops_per_sec")
+    if failures:
+        summary["first_failure"] = str(failures[0])
+    return summary
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port, proc, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        if proc.poll() is not None:
+            raise CommandError(f"server exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError("server did not start listening")
+
+
+class Command(BaseCommand):
+    help = ("Start the project under a WSGI (gunicorn) and an ASGI (uvicorn) server and hit the "
+            "read-heavy pages with N concurrent keep-alive clients; reports rps and p50/p99 latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--duration", type=float, default=10.0, help="seconds per deployment")
+        parser.add_argument("--paths", nargs="+", default=["/events/", "/leaderboard/data/", "/profile/"])
+        parser.add_argument("--workers", type=int, default=2, help="server processes")
+        parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+        parser.add_argument("--only", choices=["wsgi", "asgi"])
+
+    def handle(self, *args, **opts):
+        user, _ = User.objects.get_or_create(username="bench_serving", defaults={"email": "bench_serving@bench.test"})
+        Student.objects.get_or_create(user=user, defaults={"pnr": "bench_serving", "phone": "0",
+                                                           "department": "bench", "semester": "1"})
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+        servers = {
+            "wsgi": lambda port: [sys.executable, "-m", "gunicorn", "project.wsgi:application",
+                                  "-b", f"127.0.0.1:{port}", "-w", str(opts["workers"]),
+                                  "--threads", str(opts["threads"]), "--log-level", "warning"],
+            "asgi": lambda port: [sys.executable, "-m", "uvicorn", "project.asgi:application",
+                                  "--host", "127.0.0.1", "--port", str(port), "--workers", str(opts["workers"]),
+                                  "--log-level", "warning", "--no-access-log"],
+        }
+        report = {"clients": opts["clients"], "paths": opts["paths"]}
+        try:
+            for name, cmd in servers.items():
+                if opts["only"] and opts["only"] != name:
+                    continue
+                port = _free_port()
+                proc = subprocess.Popen(cmd(port), cwd=settings.BASE_DIR)
+                try:
+                    _wait_for(port, proc)
+                    asyncio.run(_load("127.0.0.1", port, opts["paths"], cookie, 20, 1.0))  # warm caches
+                    report[name] = asyncio.run(_load("127.0.0.1", port, opts["paths"], cookie,
+                                                     opts["clients"], opts["duration"]))
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+        finally:
+            session.delete()
+            user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
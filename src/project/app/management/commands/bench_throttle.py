@@ -0,0 +1,45 @@
+import json
+import time
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+
+from app.bench import time_calls
+from app.throttling import hit
+
+
+def _legacy_fixed_window(key, limit, window_sec):
+    # The previous simple_rate_limit body: get dict, mutate, set dict.
+    now = int(time.monotonic())
+    bucket = cache.get(key)
+    if not bucket or now - bucket["start"] >= window_sec:
+        bucket = {"start": now, "count": 0}
+    bucket["count"] += 1
+    cache.set(key, bucket, window_sec)
+    return bucket["count"] <= limit
+
+
+class Command(BaseCommand):
+    help = "Per-request overhead of the rate limiter vs the old fixed-window dict limiter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=50000)
+        parser.add_argument("--keys", type=int, default=100, help="distinct callers to rotate through")
+
+    def handle(self, *args, **opts):
+        calls, keys = opts["calls"], opts["keys"]
+        counter = iter(range(10 ** 12))
+
+        def legacy():
+            _legacy_fixed_window(f"bench:legacy:{next(counter) % keys}", 10 ** 9, 60)
+
+        def sliding():
+            hit(f"bench:sliding:{next(counter) % keys}", 10 ** 9, 60)
+
+        report = {}
+        for name, fn in (("legacy_fixed_window", legacy), ("sliding_window", sliding)):
+            summary = time_calls(fn, calls)
+            summary["us_per_call"] = round(summary["seconds"] / calls * 1e6, 2)
+            report[name] = summary
+        report["backend"] = caches["default"].__class__.__name__
+        self.stdout.write(json.dumps(report, indent=2))
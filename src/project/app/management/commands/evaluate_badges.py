@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import badges
+
+
+class Command(BaseCommand):
+    help = "Score every student against the active badge thresholds and award the ones reached."
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        awarded = badges.evaluate()
+        self.stdout.write(self.style.SUCCESS(
+            f"{awarded} badge(s) awarded in {time.perf_counter() - t0:.2f}s."))
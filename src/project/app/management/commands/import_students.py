@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.onboarding import import_students, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Import students from a registrar CSV (name,email,pnr,phone,department,semester[,password])."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password-hashing processes (default: CPU count; 1 = inline).")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and dedupe only.")
+
+    def handle(self, *args, **opts):
+        def progress(r):
+            rate = r["rows"] / r["seconds"] if r["seconds"] else 0
+            self.stdout.write(f"  {r['rows']} rows, {r['created']} created, "
+                              f"{r['existing'] + r['duplicate'] + r['invalid']} skipped ({rate:.0f} rows/s)")
+
+        try:
+            with open(opts["csv_path"], newline="", encoding="utf-8-sig") as fh:
+                report = import_students(iter_rows(fh), batch_size=opts["batch_size"],
+                                         workers=opts["workers"], dry_run=opts["dry_run"],
+                                         progress=progress)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for line, reason in report["errors"][:50]:
+            self.stdout.write(f"line {line}: {reason}")
+        if len(report["errors"]) > 50:
+            self.stdout.write(f"... and {len(report['errors']) - 50} more")
+        rate = report["created"] / report["seconds"] if report["seconds"] else 0
+        verb = "would be created" if opts["dry_run"] else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} student(s) {verb} in {report['seconds']:.1f}s ({rate:.0f}/s); "
+            f"{report['existing']} already registered, {report['duplicate']} duplicate, "
+            f"{report['invalid']} invalid."))
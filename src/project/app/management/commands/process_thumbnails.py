@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app.models import EvidenceBlob
+from app.thumbnails import make_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for evidence blobs still marked pending."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        ids = list(EvidenceBlob.objects.filter(thumb_status="pending")
+                   .order_by("id").values_list("id", flat=True)[:opts["limit"]])
+        done = {}
+        for blob_id in ids:
+            status = make_thumbnail(blob_id)
+            done[status] = done.get(status, 0) + 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(ids)} blob(s): {done}"))
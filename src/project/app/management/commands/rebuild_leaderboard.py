@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recompute all leaderboard standings from PointLedger."
+
+    def handle(self, *args, **opts):
+        n = leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {n} leaderboard entries."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.models import rebuild_point_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuild PointBalance from PointLedger/Redemption in one pass and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report drift, do not rewrite balances.")
+
+    def handle(self, *args, **opts):
+        drift = rebuild_point_balances(apply=not opts["dry_run"])
+        for uid, stored, expected in drift:
+            self.stdout.write(f"user {uid}: stored (earned, spent)={stored} expected={expected}")
+        verb = "found" if opts["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} drifted balance(s) {verb}."))
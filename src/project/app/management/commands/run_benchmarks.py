@@ -0,0 +1,134 @@
+import json
+import platform
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from app import leaderboard as lb
+from app import profile_cache, synthetic
+from app.bench import compare, time_calls
+from app.models import (
+    Activity, EventSlot, PointBalance, Reward, Submission,
+    approve_submission, cancel_registration, redeem_reward, register_user_for_event, total_points,
+)
+
+PREFIX = "syn_"
+
+
+def _cases(repeat):
+    """
+    Yield (name, fn) pairs; each fn is timed `repeat` times against the seeded
+    data. Being a generator, a case's setup runs only after the previous case
+    was timed, so cancel_registration works through the rows register made.
+    """
+    now = timezone.now()
+    users = list(User.objects.filter(username__startswith=PREFIX).select_related("student").order_by("id"))
+    staff = User.objects.create_user(username="bench_staff", is_staff=True)
+
+    ev = EventSlot.objects.create(activity=Activity.objects.filter(title__startswith=PREFIX).first(),
+                                  start_at=now + timedelta(days=1), end_at=now + timedelta(days=1, hours=2),
+                                  max_participants=max(1, repeat // 2), location="bench")  # half go to the waitlist
+    regs, joining = [], iter(users)
+    yield "register_user_for_event", lambda: regs.append(register_user_for_event(next(joining), ev))
+    leaving = iter(regs)
+    yield "cancel_registration", lambda: cancel_registration(next(leaving))
+
+    act = Activity.objects.filter(title__startswith=PREFIX).first()
+    subs = iter(Submission.objects.bulk_create(
+        [Submission(student=u.student, activity=act) for u in users[:repeat]]))
+    yield "approve_submission", lambda: approve_submission(next(subs), staff)
+
+    reward = Reward.objects.get(title=f"{PREFIX}reward")
+    rich = iter(User.objects.filter(pk__in=PointBalance.objects.filter(available__gte=1).values("user_id")[:repeat]))
+    yield "redeem_reward", lambda: redeem_reward(next(rich), reward)
+
+    cycle = iter(users * (repeat // len(users) + 1))
+    quarter = now - timedelta(days=90)
+    yield "total_points", lambda: total_points(next(cycle))
+    yield "total_points_range", lambda: total_points(next(cycle), start=quarter)
+
+    yield "leaderboard", lambda: (lb.top(lb.OVERALL, 20), lb.around(lb.OVERALL, next(cycle)))
+
+    # log everyone in up front: a login writes a session and last_login,
+    # which is not what this case measures
+    clients = []
+    for user in users[:repeat]:
+        client = Client()
+        client.force_login(user)
+        clients.append((user, client))
+    logged_in = iter(clients * (repeat // len(clients) + 1))
+    def profile():
+        user, client = next(logged_in)
+        profile_cache.invalidate([user.pk])  # cold: the cached fragment would hide the queries
+        assert client.get("/profile/").status_code == 200
+    yield "profile", profile
+
+
+class Command(BaseCommand):
+    help = ("Time the core domain services against freshly seeded databases of several sizes, "
+            "print JSON and optionally flag regressions against a baseline file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="200,2000", help="comma-separated student counts")
+        parser.add_argument("--ledger-per-student", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--output", help="also write the JSON report here")
+        parser.add_argument("--baseline", help="earlier --output file to compare against")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="allowed p50 growth before a case counts as regressed (0.25 = +25%%)")
+        parser.add_argument("--min-ms", type=float, default=0.5, help="ignore p50 changes smaller than this")
+
+    def handle(self, *args, **opts):
+        sizes = [int(s) for s in opts["sizes"].split(",") if s.strip()]
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in sizes:
+                results[str(size)] = self._run_size(size, opts, Path(tmp))
+                self.stderr.write(f"size {size}: done")
+
+        report = {
+            "meta": {"created": timezone.now().isoformat(), "python": platform.python_version(),
+                     "django": django.get_version(), "database": connection.vendor,
+                     "repeat": opts["repeat"], "ledger_per_student": opts["ledger_per_student"]},
+            "results": results,
+        }
+        regressed = []
+        if opts["baseline"]:
+            baseline = json.loads(Path(opts["baseline"]).read_text())["results"]
+            report["comparison"] = compare(baseline, results, opts["threshold"], opts["min_ms"])
+            regressed = [r for r in report["comparison"] if r["regressed"]]
+        text = json.dumps(report, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(text)
+        self.stdout.write(text)
+        if regressed:
+            raise CommandError("Regressed: " + ", ".join(f"{r['op']}@{r['size']} ({r['change']:+.0%})"
+                                                         for r in regressed))
+
+    def _run_size(self, size, opts, tmp):
+        # A throwaway database file per size, so runs never see each other's (or real) data.
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        old_test_name = test_settings.get("NAME")
+        test_settings["NAME"] = str(tmp / f"bench_{size}.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        caches = {"default": {"BACKEND": "app.cache_backends.SharedFileCache",
+                              "LOCATION": str(tmp / f"cache_{size}.sqlite3")}}
+        try:
+            with override_settings(CACHES=caches, ALLOWED_HOSTS=["testserver"]):
+                seeded = synthetic.seed(students=size, slots=max(50, size // 20),
+                                        ledger_rows=size * opts["ledger_per_student"], prefix=PREFIX)
+                ops = {}
+                for name, fn in _cases(opts["repeat"]):
+                    ops[name] = time_calls(fn, opts["repeat"])
+            return {"seed": seeded, "ops": ops}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings["NAME"] = old_test_name
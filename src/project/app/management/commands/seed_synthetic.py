@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app import synthetic
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with synthetic students, activities, slots and ledger rows "
+            "(bulk inserts; everything is named with --prefix so --clear can remove it).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000)
+        parser.add_argument("--activities", type=int, default=50)
+        parser.add_argument("--slots", type=int, default=200)
+        parser.add_argument("--ledger-rows", type=int, default=50000)
+        parser.add_argument("--months", type=int, default=12, help="history the ledger is spread over")
+        parser.add_argument("--prefix", default="syn_")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--clear", action="store_true", help="remove a previous data set instead")
+
+    def handle(self, *args, **opts):
+        if opts["clear"]:
+            n = synthetic.clear(opts["prefix"])
+            self.stdout.write(self.style.SUCCESS(f"Removed {n} synthetic student(s) and their rows."))
+            return
+        report = synthetic.seed(
+            students=opts["students"], activities=opts["activities"], slots=opts["slots"],
+            ledger_rows=opts["ledger_rows"], months=opts["months"], prefix=opts["prefix"],
+            seed_value=opts["seed"], log=self.stderr.write)
+        self.stdout.write(json.dumps(report, indent=2))
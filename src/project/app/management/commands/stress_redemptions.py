@@ -0,0 +1,74 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+
+from app.bench import run_concurrently
+from app.models import (PointBalance, Redemption, Reward, _bump_balance, redeem_reward)
+
+
+@transaction.atomic
+def _legacy_redeem(user, reward):
+    # The previous body: check stock, check balance, insert, decrement last.
+    if reward.stock is not None and reward.stock <= 0:
+        raise ValueError("Reward out of stock.")
+    available = (PointBalance.objects.select_for_update()
+                 .filter(user=user).values_list("available", flat=True).first() or 0)
+    if available < reward.points_cost:
+        raise ValueError("Insufficient points.")
+    red = Redemption.objects.create(user=user, reward=reward, status="pending")
+    _bump_balance(user.id, spent=reward.points_cost)
+    if reward.stock is not None:
+        Reward.objects.filter(pk=reward.pk, stock__gt=0).update(stock=F("stock") - 1)
+    return red
+
+
+class Command(BaseCommand):
+    help = ("Drop a limited-stock reward on N concurrent clients and report oversell, "
+            "overdrawn balances and redemptions/s. Creates and removes its own bench_* rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--stock", type=int, default=50)
+        parser.add_argument("--cost", type=int, default=10)
+        parser.add_argument("--tries", type=int, default=2,
+                            help="attempts per user; each user can afford exactly one")
+        parser.add_argument("--legacy", action="store_true", help="also run the previous implementation")
+
+    def handle(self, *args, **opts):
+        n, stock, cost = opts["clients"], opts["stock"], opts["cost"]
+        users = [User.objects.get_or_create(username=f"bench_redeem_{i}")[0] for i in range(n)]
+        modes = {"reserve_first": redeem_reward}
+        if opts["legacy"]:
+            modes["legacy"] = _legacy_redeem
+        report = {}
+        try:
+            for mode, redeem in modes.items():
+                reward = Reward.objects.create(title=f"bench_redeem_{mode}", points_cost=cost, stock=stock)
+                PointBalance.objects.filter(user__in=users).delete()
+                PointBalance.objects.bulk_create([PointBalance(user=u, earned=cost, available=cost) for u in users])
+
+                attempts = [u for u in users for _ in range(opts["tries"])]
+                summary, results = run_concurrently(lambda u: redeem(u, reward), attempts)
+                reward.refresh_from_db()
+                failed = [r for r in results if isinstance(r, Exception) and not isinstance(r, ValueError)]
+                if failed:
+                    summary["first_error"] = repr(failed[0])
+                redeemed = Redemption.objects.filter(reward=reward).count()
+                summary.update(
+                    redeemed=redeemed,
+                    stock_left=reward.stock,
+                    oversold=max(0, redeemed - stock),
+                    stock_drift=stock - redeemed - reward.stock,
+                    overdrawn_users=PointBalance.objects.filter(user__in=users, available__lt=0).count(),
+                    points_spent=PointBalance.objects.filter(user__in=users).aggregate(s=Sum("spent"))["s"],
+                    redemptions_per_sec=round(redeemed / summary["seconds"], 1) if summary["seconds"] else 0.0,
+                )
+                report[mode] = summary
+            self.stdout.write(json.dumps(report, indent=2))
+        finally:
+            Redemption.objects.filter(reward__title__startswith="bench_redeem_").delete()
+            Reward.objects.filter(title__startswith="bench_redeem_").delete()
+            User.objects.filter(username__startswith="bench_redeem_").delete()
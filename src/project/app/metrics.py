@@ -0,0 +1,211 @@
+# app/metrics.py
+"""
+Per-view latency and SQL metrics, exposed in Prometheus text format at /metrics/.
+
+MetricsMiddleware times every request and files it under its URL name; a
+database execute-wrapper (installed on each connection as it opens) counts
+the queries and SQL time of whichever request is current. The request is
+tracked in a ContextVar, so queries that async views run through
+sync_to_async are still charged to them.
+
+Histograms are fixed-bucket counters held in this process, so recording is a
+bisect and a few integer adds. With several workers each scrape sees the
+worker that answered it; Prometheus' rate()/histogram_quantile() still work
+per instance.
+
+Requests slower than METRICS_SLOW_REQUEST_MS are logged to "app.metrics"
+for a METRICS_SLOW_LOG_SAMPLE fraction of them, with the slowest statements.
+"""
+import heapq
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.http.response import StreamingHttpResponse
+
+logger = logging.getLogger("app.metrics")
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+KEEP_SLOWEST = 5  # statements remembered per request for the slow log
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self):
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        running, out = 0, []
+        for bound, c in zip(self.bounds + (float("inf"),), counts):
+            running += c
+            out.append((bound, running))
+        return out, total, n
+
+# name -> (help, bounds); series are created per view on first use
+METRICS = {
+    "ecocampus_request_seconds": ("Time spent in the view and the middleware below this one.", SECONDS),
+    "ecocampus_sql_queries": ("SQL statements executed per request.", QUERIES),
+    "ecocampus_sql_seconds": ("Time spent executing SQL per request.", SECONDS),
+    "ecocampus_response_bytes": ("Response body size (streaming responses are not counted).", BYTES),
+}
+_series = {}           # (metric, view) -> Histogram
+_requests = {}         # (view, status class) -> count
+_series_lock = threading.Lock()
+
+def _hist(metric, view):
+    h = _series.get((metric, view))
+    if h is None:
+        with _series_lock:
+            h = _series.setdefault((metric, view), Histogram(METRICS[metric][1]))
+    return h
+
+def reset():
+    with _series_lock:
+        _series.clear()
+        _requests.clear()
+
+# ----- SQL capture -----
+class RequestStats:
+    __slots__ = ("queries", "sql_time", "slowest")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest = []  # min-heap of (seconds, sql)
+
+_current = ContextVar("metrics_request", default=None)
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        took = time.perf_counter() - t0
+        stats.queries += 1
+        stats.sql_time += took
+        if len(stats.slowest) < KEEP_SLOWEST:
+            heapq.heappush(stats.slowest, (took, sql))
+        elif took > stats.slowest[0][0]:
+            heapq.heapreplace(stats.slowest, (took, sql))
+
+def _wrap(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+def install():
+    """Called from AppConfig.ready(): wrap open connections and every new one."""
+    connection_created.connect(_wrap, dispatch_uid="app.metrics")
+    for conn in connections.all(initialized_only=True):
+        _wrap(conn)
+
+# ----- middleware -----
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_after = getattr(settings, "METRICS_SLOW_REQUEST_MS", 500) / 1000
+        self.sample = getattr(settings, "METRICS_SLOW_LOG_SAMPLE", 0.1)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, t0 = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - t0)
+        return response
+
+    async def __acall__(self, request):
+        stats, t0 = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - t0)
+        return response
+
+    def _record(self, request, response, stats, took):
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name or "<unnamed>") if match else "<unmatched>"
+        _hist("ecocampus_request_seconds", view).observe(took)
+        _hist("ecocampus_sql_queries", view).observe(stats.queries)
+        _hist("ecocampus_sql_seconds", view).observe(stats.sql_time)
+        if not isinstance(response, StreamingHttpResponse):
+            _hist("ecocampus_response_bytes", view).observe(len(response.content))
+        key = (view, f"{response.status_code // 100}xx")
+        with _series_lock:
+            _requests[key] = _requests.get(key, 0) + 1
+        if took >= self.slow_after and random.random() < self.sample:
+            logger.warning(
+                "slow request %s %s (%s): %.0f ms, %d queries, %.0f ms SQL; slowest:\n%s",
+                request.method, request.path, view, took * 1000, stats.queries, stats.sql_time * 1000,
+                "\n".join(f"  {t * 1000:.1f} ms  {sql}" for t, sql in sorted(stats.slowest, reverse=True)))
+
+# ----- exposition -----
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt(n):
+    return "+Inf" if n == float("inf") else repr(n) if isinstance(n, float) else str(n)
+
+def render() -> str:
+    lines = ["# HELP ecocampus_requests_total Requests served, by view and status class.",
+             "# TYPE ecocampus_requests_total counter"]
+    with _series_lock:
+        requests = sorted(_requests.items())
+        series = sorted(_series.items())
+    for (view, status), n in requests:
+        lines.append(f'ecocampus_requests_total{{view="{_label(view)}",status="{status}"}} {n}')
+    for metric, (help_text, _) in METRICS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for (name, view), h in series:
+            if name != metric:
+                continue
+            buckets, total, n = h.cumulative()
+            v = _label(view)
+            lines += [f'{metric}_bucket{{view="{v}",le="{_fmt(le)}"}} {c}' for le, c in buckets]
+            lines += [f'{metric}_sum{{view="{v}"}} {_fmt(total)}', f'{metric}_count{{view="{v}"}} {n}']
+    return "\n".join(lines) + "\n"
+
+def metrics_view(request):
+    """Prometheus scrape target: staff sessions, or REMOTE_ADDR in METRICS_ALLOWED_IPS."""
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", [])
+    user = getattr(request, "user", None)
+    if request.META.get("REMOTE_ADDR") not in allowed and not (user and user.is_staff):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
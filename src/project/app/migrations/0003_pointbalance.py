@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    PointLedger = apps.get_model('app', 'PointLedger')
+    Redemption = apps.get_model('app', 'Redemption')
+    PointBalance = apps.get_model('app', 'PointBalance')
+    earned = dict(PointLedger.objects.values_list('user_id').annotate(s=Sum('points')).order_by())
+    spent = dict(Redemption.objects.exclude(status='canceled')
+                 .values_list('user_id').annotate(s=Sum('reward__points_cost')).order_by())
+    PointBalance.objects.bulk_create([
+        PointBalance(user_id=uid, earned=earned.get(uid, 0), spent=spent.get(uid, 0),
+                     available=earned.get(uid, 0) - spent.get(uid, 0))
+        for uid in set(earned) | set(spent)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_activity_badgethreshold_reward_student_role_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='point_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('earned', models.IntegerField(default=0)),
+                ('spent', models.IntegerField(default=0)),
+                ('available', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
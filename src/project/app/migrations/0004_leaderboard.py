@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_standings(apps, schema_editor):
+    PointLedger = apps.get_model('app', 'PointLedger')
+    LeaderboardEntry = apps.get_model('app', 'LeaderboardEntry')
+    LeaderboardScore = apps.get_model('app', 'LeaderboardScore')
+    totals = {}
+    for uid, pts in PointLedger.objects.values_list('user_id').annotate(s=Sum('points')).order_by():
+        totals[('all', uid)] = pts
+    monthly = (PointLedger.objects.annotate(m=TruncMonth('created_at'))
+               .values_list('m', 'user_id').annotate(s=Sum('points')).order_by())
+    for m, uid, pts in monthly:
+        totals[(m.strftime('%Y-%m'), uid)] = pts
+    hist = {}
+    for (board, _), pts in totals.items():
+        hist[(board, pts)] = hist.get((board, pts), 0) + 1
+    LeaderboardEntry.objects.bulk_create(
+        [LeaderboardEntry(board=b, user_id=uid, score=pts) for (b, uid), pts in totals.items()],
+        batch_size=1000)
+    LeaderboardScore.objects.bulk_create(
+        [LeaderboardScore(board=b, score=sc, users=n) for (b, sc), n in hist.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_pointbalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=16)),
+                ('score', models.IntegerField()),
+                ('users', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('board', 'score'), name='uniq_board_score')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=16)),
+                ('score', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', '-score', 'user'], name='board_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('board', 'user'), name='uniq_board_user')],
+            },
+        ),
+        migrations.RunPython(backfill_standings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    PointLedger = apps.get_model('app', 'PointLedger')
+    PointRollup = apps.get_model('app', 'PointRollup')
+    grouped = (PointLedger.objects.annotate(m=TruncMonth('created_at'))
+               .values_list('user_id', 'activity_id', 'm')
+               .annotate(s=Sum('points'), n=Count('id')).order_by())
+    PointRollup.objects.bulk_create(
+        [PointRollup(user_id=uid, activity_id=aid, period=m.date(), points=pts, entries=n)
+         for uid, aid, m, pts, n in grouped],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='point_rollups', to='app.activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='point_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'user'], name='rollup_period_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'activity', 'period'), name='uniq_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_waitlists(apps, schema_editor):
+    Registration = apps.get_model('app', 'Registration')
+    EventSlot = apps.get_model('app', 'EventSlot')
+    counts = {}
+    queued = (Registration.objects.filter(status='waitlisted')
+              .order_by('event_id', 'created_at', 'id').only('id', 'event_id'))
+    for reg in queued.iterator():
+        counts[reg.event_id] = counts.get(reg.event_id, 0) + 1
+        Registration.objects.filter(pk=reg.pk).update(waitlist_position=counts[reg.event_id])
+    for ev_pk, n in counts.items():
+        EventSlot.objects.filter(pk=ev_pk).update(waitlisted_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_pointrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventslot',
+            name='waitlisted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='waitlist_position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['event', 'status', 'waitlist_position'], name='reg_waitlist_idx'),
+        ),
+        migrations.RunPython(number_waitlists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_submission_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(upload_to='evidence/')),
+                ('size', models.PositiveBigIntegerField()),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('thumbnail', models.FileField(blank=True, upload_to='evidence/thumbs/')),
+                ('thumb_status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=8)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='evidence_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='app.evidenceblob'),
+        ),
+    ]
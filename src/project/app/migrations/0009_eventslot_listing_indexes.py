@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_evidence_blob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventslot',
+            index=models.Index(fields=['start_at', 'id'], name='slot_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventslot',
+            index=models.Index(condition=models.Q(('registered_count__lt', models.F('max_participants'))), fields=['start_at', 'id'], name='slot_open_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventslot',
+            index=models.Index(fields=['end_at'], name='slot_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventslot',
+            index=models.Index(fields=['location', 'start_at'], name='slot_location_start_idx'),
+        ),
+    ]
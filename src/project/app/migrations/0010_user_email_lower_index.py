@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    clashes = list(User.objects.exclude(email='').annotate(e=Lower('email'))
+                   .values('e').annotate(n=Count('id')).filter(n__gt=1).values_list('e', flat=True))
+    if clashes:
+        raise RuntimeError(
+            "Accounts differing only in email case must be merged before this migration: "
+            + ", ".join(clashes[:20]))
+    for pk, email in User.objects.exclude(email='').values_list('id', 'email').iterator():
+        if email != email.lower():
+            User.objects.filter(pk=pk).update(email=email.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_eventslot_listing_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        # Login looks users up by LOWER(email) (app/auth_backends.py); this index
+        # serves that lookup and keeps emails unique regardless of case.
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email > \'\'',
+            'DROP INDEX auth_user_email_lower_uniq',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_user_email_lower_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentBadge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned', models.IntegerField()),
+                ('potential', models.IntegerField()),
+                ('awarded_at', models.DateTimeField(auto_now_add=True)),
+                ('threshold', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='awards', to='app.badgethreshold')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='badges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'threshold'), name='uniq_user_badge')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_cap_counters(apps, schema_editor):
+    # Pending submissions hold a reservation, approved ones a committed slot,
+    # both in the month they were submitted.
+    Submission = apps.get_model('app', 'Submission')
+    MonthlyCapCounter = apps.get_model('app', 'MonthlyCapCounter')
+    counters = {}
+    rows = (Submission.objects
+            .filter(activity__monthly_cap_per_student__isnull=False, status__in=('pending', 'approved'))
+            .values_list('pk', 'student__user_id', 'activity_id', 'created_at', 'status'))
+    by_month = {}
+    for pk, uid, aid, created_at, status in rows.iterator():
+        month = timezone.localtime(created_at).date().replace(day=1)
+        by_month.setdefault(month, []).append(pk)
+        res, com = counters.get((uid, aid, month), (0, 0))
+        counters[(uid, aid, month)] = (res + 1, com) if status == 'pending' else (res, com + 1)
+    for month, pks in by_month.items():
+        Submission.objects.filter(pk__in=pks).update(cap_period=month)
+    MonthlyCapCounter.objects.bulk_create([
+        MonthlyCapCounter(user_id=uid, activity_id=aid, month=month, reserved=res, committed=com)
+        for (uid, aid, month), (res, com) in counters.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_student_badge'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='cap_period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MonthlyCapCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('committed', models.PositiveIntegerField(default=0)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'activity', 'month'), name='uniq_cap_counter')],
+            },
+        ),
+        migrations.RunPython(backfill_cap_counters, migrations.RunPython.noop),
+    ]
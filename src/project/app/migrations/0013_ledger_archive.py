@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_monthly_cap_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pointledger',
+            name='source',
+            field=models.CharField(choices=[('submission', 'submission'), ('manual', 'manual'), ('summary', 'summary')], max_length=16),
+        ),
+        migrations.CreateModel(
+            name='PointLedgerArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger_id', models.BigIntegerField()),
+                ('points', models.IntegerField()),
+                ('source', models.CharField(max_length=16)),
+                ('reference_id', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField()),
+                ('summary_ref', models.CharField(max_length=64)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app.activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='app_pointle_user_id_0f78b6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'reference_id'), name='uniq_archive_source_reference')],
+            },
+        ),
+    ]
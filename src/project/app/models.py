@@ -1,5 +1,6 @@
 # app/models.py
-from django.db import models, transaction
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
 from django.db.models import F, Q, UniqueConstraint, CheckConstraint
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -44,6 +45,7 @@ class EventSlot(models.Model):
     end_at = models.DateTimeField()
     max_participants = models.PositiveIntegerField()
     registered_count = models.PositiveIntegerField(default=0)  # denormalized
+    waitlisted_count = models.PositiveIntegerField(default=0)  # denormalized, = last waitlist position
     location = models.CharField(max_length=200)
     notes = models.TextField(blank=True)
 
@@ -52,6 +54,15 @@ class EventSlot(models.Model):
             CheckConstraint(check=Q(end_at__gt=F('start_at')), name="event_time_valid"),
             CheckConstraint(check=Q(registered_count__gte=0), name="event_regcnt_nonneg"),
         ]
+        indexes = [
+            # keyset order for the events page / calendar windows
+            models.Index(fields=["start_at", "id"], name="slot_start_idx"),
+            # same order, only slots with free seats (the default listing)
+            models.Index(fields=["start_at", "id"], name="slot_open_start_idx",
+                         condition=Q(registered_count__lt=F("max_participants"))),
+            models.Index(fields=["end_at"], name="slot_end_idx"),
+            models.Index(fields=["location", "start_at"], name="slot_location_start_idx"),
+        ]
 
     def __str__(self): return f"{self.activity.title} @ {self.start_at:%Y-%m-%d %H:%M}"
 
@@ -72,14 +83,28 @@ class Registration(models.Model):
     event = models.ForeignKey(EventSlot, on_delete=models.CASCADE, related_name="registrations")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="registrations")
     status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="registered")
+    # 1-based and dense while waitlisted ("you are #N"), NULL otherwise
+    waitlist_position = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [models.Index(fields=["event", "status", "waitlist_position"], name="reg_waitlist_idx")]
         constraints = [
             UniqueConstraint(fields=["event","user"], name="uniq_event_user"),
         ]
 
 # ====== Verification Workflow & Points ======
+class EvidenceBlob(models.Model):
+    """One stored copy per distinct evidence upload (keyed by content hash)."""
+    THUMB_CHOICES = [("pending","Pending"), ("done","Done"), ("skipped","Skipped"), ("failed","Failed")]
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="evidence/")
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    thumbnail = models.FileField(upload_to="evidence/thumbs/", blank=True)
+    thumb_status = models.CharField(max_length=8, choices=THUMB_CHOICES, default="pending")
+    created_at = models.DateTimeField(auto_now_add=True)
+
 class Submission(models.Model):
     STATUS_CHOICES = [("pending","Pending"), ("approved","Approved"), ("rejected","Rejected")]
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="submissions")
@@ -87,11 +112,20 @@ class Submission(models.Model):
     event_slot = models.ForeignKey(EventSlot, on_delete=models.SET_NULL, null=True, blank=True)
     evidence_url = models.URLField(blank=True)
     evidence_file = models.FileField(upload_to="evidence/", blank=True)
+    evidence_blob = models.ForeignKey(EvidenceBlob, null=True, blank=True, on_delete=models.SET_NULL, related_name="submissions")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
     verified_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="verifications")
     verified_at = models.DateTimeField(null=True, blank=True)
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Short lease so two verifiers working the queue don't get the same items
+    claimed_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="claimed_submissions")
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    # Month whose MonthlyCapCounter this submission holds a slot in (capped activities only)
+    cap_period = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at", "id"], name="sub_status_created_idx")]
 
     def can_verify(self, by_user: User) -> bool:
     # admins always allowed (but block self-approval below)
@@ -109,13 +143,13 @@ class Submission(models.Model):
         return self.student.user_id != by_user.id
 
 class PointLedger(models.Model):
-    SOURCE_CHOICES = [("submission","submission"), ("manual","manual")]
+    SOURCE_CHOICES = [("submission","submission"), ("manual","manual"), ("summary","summary")]
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="point_ledger")
     activity = models.ForeignKey(Activity, on_delete=models.PROTECT)
     points = models.IntegerField()
     source = models.CharField(max_length=16, choices=SOURCE_CHOICES)
     reference_id = models.CharField(max_length=64)  # submission_id or note
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True)  # summaries: start of their month
 
     class Meta:
         indexes = [models.Index(fields=["user","created_at"]) ]
@@ -126,6 +160,118 @@ class PointLedger(models.Model):
             ),
         ]
 
+    def _reference_archived(self):
+        # uniq_source_reference only sees the hot table; archived rows keep their reference
+        return PointLedgerArchive.objects.filter(source=self.source, reference_id=self.reference_id).exists()
+
+    def clean(self):
+        super().clean()
+        if self._state.adding and self._reference_archived():
+            raise ValidationError({"reference_id": "This reference was already used (the row is archived)."})
+
+    def save(self, *args, **kwargs):
+        # New rows feed the materialized balance in the same transaction.
+        # Edits to existing rows are left to `manage.py reconcile_balances`.
+        is_new = self._state.adding
+        if is_new and self._reference_archived():
+            raise IntegrityError(f"{self.source} reference {self.reference_id!r} is already in the archive.")
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                record_ledger_rows([self])
+
+class PointLedgerArchive(models.Model):
+    """
+    Ledger rows moved out of PointLedger by app/archival.py. Each archived month
+    is replaced in the hot table by one "summary" row per user and activity
+    (reference "summary:<user>:<activity>:<YYYY-MM>") carrying the same total.
+    """
+    ledger_id = models.BigIntegerField()  # id the row had in PointLedger
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    activity = models.ForeignKey(Activity, on_delete=models.PROTECT, related_name="+")
+    points = models.IntegerField()
+    source = models.CharField(max_length=16)
+    reference_id = models.CharField(max_length=64)
+    created_at = models.DateTimeField()
+    summary_ref = models.CharField(max_length=64)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "created_at"])]
+        constraints = [
+            # archived submissions stay credited exactly once (see already_credited)
+            UniqueConstraint(fields=["source", "reference_id"], name="uniq_archive_source_reference"),
+        ]
+
+def already_credited(source: str, refs) -> set:
+    """References that already have a ledger row, live or archived."""
+    refs = list(refs)
+    live = PointLedger.objects.filter(source=source, reference_id__in=refs).values_list("reference_id", flat=True)
+    gone = PointLedgerArchive.objects.filter(source=source, reference_id__in=refs).values_list("reference_id", flat=True)
+    return set(live) | set(gone)
+
+class PointBalance(models.Model):
+    """Materialized per-user totals, kept in step with PointLedger/Redemption."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="point_balance")
+    earned = models.IntegerField(default=0)     # lifetime SUM(PointLedger.points)
+    spent = models.IntegerField(default=0)      # non-canceled redemptions
+    available = models.IntegerField(default=0)  # earned - spent
+    updated_at = models.DateTimeField(auto_now=True)
+
+# ====== Leaderboard standings (maintained from the ledger) ======
+class LeaderboardEntry(models.Model):
+    board = models.CharField(max_length=16)  # "all" or a month, e.g. "2025-08"
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="leaderboard_entries")
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["board", "-score", "user"], name="board_rank_idx")]
+        constraints = [
+            UniqueConstraint(fields=["board", "user"], name="uniq_board_user"),
+        ]
+
+class LeaderboardScore(models.Model):
+    """Users per (board, score); rank = 1 + users on higher scores."""
+    board = models.CharField(max_length=16)
+    score = models.IntegerField()
+    users = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["board", "score"], name="uniq_board_score"),
+        ]
+
+# ====== Period rollups (per user, activity, month) ======
+class PointRollup(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="point_rollups")
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="point_rollups")
+    period = models.DateField()  # first day of the month
+    points = models.IntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)  # ledger rows folded in
+
+    class Meta:
+        indexes = [models.Index(fields=["period", "user"], name="rollup_period_user_idx")]
+        constraints = [
+            UniqueConstraint(fields=["user", "activity", "period"], name="uniq_rollup_bucket"),
+        ]
+
+class MonthlyCapCounter(models.Model):
+    """
+    Submissions counted against Activity.monthly_cap_per_student for one month:
+    `reserved` are pending, `committed` were approved. reserved + committed <= cap
+    is enforced by a conditional UPDATE (see reserve_cap).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="+")
+    month = models.DateField()
+    reserved = models.PositiveIntegerField(default=0)
+    committed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["user", "activity", "month"], name="uniq_cap_counter"),
+        ]
+
 # ====== Badges ======
 class BadgeThreshold(models.Model):
     code = models.CharField(max_length=50, unique=True)
@@ -133,6 +279,19 @@ class BadgeThreshold(models.Model):
     percent_of_potential = models.PositiveIntegerField(default=60)  # 60% default
     active = models.BooleanField(default=True)
 
+    def __str__(self): return f"{self.name} ({self.percent_of_potential}%)"
+
+class StudentBadge(models.Model):
+    """A reached BadgeThreshold (see app/badges.py). Figures are as of the award."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="badges")
+    threshold = models.ForeignKey(BadgeThreshold, on_delete=models.CASCADE, related_name="awards")
+    earned = models.IntegerField()
+    potential = models.IntegerField()
+    awarded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [UniqueConstraint(fields=["user", "threshold"], name="uniq_user_badge")]
+
 # ====== Rewards & Redemptions ======
 class Reward(models.Model):
     title = models.CharField(max_length=120)
@@ -154,12 +313,77 @@ class Redemption(models.Model):
 
 # ====== Domain services (transactional helpers) ======
 
+def _bump_balance(user_id, earned: int = 0, spent: int = 0):
+    """Apply a delta to a user's PointBalance row, creating it on first use."""
+    changes = dict(
+        earned=F("earned") + earned,
+        spent=F("spent") + spent,
+        available=F("available") + (earned - spent),
+        updated_at=timezone.now(),
+    )
+    if not PointBalance.objects.filter(user_id=user_id).update(**changes):
+        PointBalance.objects.get_or_create(user_id=user_id)
+        PointBalance.objects.filter(user_id=user_id).update(**changes)
+
+def record_ledger_rows(rows):
+    """
+    Propagate freshly inserted PointLedger rows into the derived tables.
+    Call inside the transaction that inserted them (bulk_create skips save()).
+    """
+    from . import badges, leaderboard, profile_cache, rollups, versions
+    per_user = {}
+    for row in rows:
+        per_user[row.user_id] = per_user.get(row.user_id, 0) + row.points
+    for user_id, pts in per_user.items():
+        _bump_balance(user_id, earned=pts)
+    leaderboard.apply_rows(rows)
+    rollups.apply_rows(rows)
+    profile_cache.invalidate(per_user)
+    versions.bump("leaderboard")
+    badges.evaluate_after_commit(per_user)
+
+def rebuild_point_balances(apply: bool = True):
+    """
+    Recompute every PointBalance from the ledger and redemptions in one pass.
+    Returns a list of (user_id, (earned, spent) stored, (earned, spent) expected)
+    for each row that had drifted; rewrites the table when `apply` is true.
+    """
+    earned = dict(PointLedger.objects.values_list("user_id").annotate(s=models.Sum("points")).order_by())
+    spent = dict(Redemption.objects.exclude(status="canceled")
+                 .values_list("user_id").annotate(s=models.Sum("reward__points_cost")).order_by())
+    stored = {uid: (e, s) for uid, e, s in PointBalance.objects.values_list("user_id", "earned", "spent")}
+
+    drift = []
+    for uid in set(earned) | set(spent) | set(stored):
+        expected = (earned.get(uid, 0), spent.get(uid, 0))
+        current = stored.get(uid)
+        if current != expected and (current is not None or expected != (0, 0)):
+            drift.append((uid, current, expected))
+
+    if apply and drift:
+        with transaction.atomic():
+            now = timezone.now()
+            fixed = [PointBalance(user_id=uid, earned=e, spent=s, available=e - s, updated_at=now)
+                     for uid, _, (e, s) in drift]
+            PointBalance.objects.filter(user_id__in=[b.user_id for b in fixed]).delete()
+            PointBalance.objects.bulk_create(fixed, batch_size=500)
+    return drift
+
 def total_points(user: User, start=None, end=None) -> int:
+    if not start and not end:
+        # Lifetime total comes from the materialized balance.
+        return (PointBalance.objects.filter(user=user)
+                .values_list("earned", flat=True).first() or 0)
     qs = PointLedger.objects.filter(user=user)
     if start: qs = qs.filter(created_at__gte=start)
     if end:   qs = qs.filter(created_at__lt=end)
     return qs.aggregate(s=models.Sum("points"))["s"] or 0
 
+def _slot_changed(ev_pk):
+    """Push the slot's new counts to live events pages once we commit."""
+    from . import live
+    live.notify_after_commit([ev_pk])
+
 @transaction.atomic
 def register_user_for_event(user: User, event: EventSlot) -> Registration:
     """Atomic capacity enforcement + waitlist."""
@@ -167,92 +391,384 @@ def register_user_for_event(user: User, event: EventSlot) -> Registration:
         raise ValueError("Event already ended.")
     # Lock row
     ev = EventSlot.objects.select_for_update().get(pk=event.pk)
-    status = "registered"
+    status, position = "registered", None
     if ev.registered_count >= ev.max_participants:
-        status = "waitlisted"
-    reg, created = Registration.objects.get_or_create(event=ev, user=user, defaults={"status": status})
+        status, position = "waitlisted", ev.waitlisted_count + 1
+    reg, created = Registration.objects.get_or_create(
+        event=ev, user=user, defaults={"status": status, "waitlist_position": position})
     if not created:
         raise ValueError("Already registered for this event.")
     if status == "registered":
         ev.registered_count = F("registered_count") + 1
         ev.save(update_fields=["registered_count"])
+    else:
+        ev.waitlisted_count = F("waitlisted_count") + 1
+        ev.save(update_fields=["waitlisted_count"])
+    _slot_changed(ev.pk)
     return reg
 
+@transaction.atomic
+def register_users_for_event(event: EventSlot, users) -> list:
+    """
+    Resolve a batch of sign-ups for one slot under a single row lock.
+    Seats, then waitlist places, go out in list order. Returns one entry per
+    user: the new Registration, or the ValueError that caller should see.
+    """
+    if timezone.now() > event.end_at:
+        return [ValueError("Event already ended.") for _ in users]
+    ev = EventSlot.objects.select_for_update().get(pk=event.pk)
+    taken = set(Registration.objects
+                .filter(event=ev, user__in=[u.pk for u in users])
+                .values_list("user_id", flat=True))
+    seats = max(0, ev.max_participants - ev.registered_count)
+    position = ev.waitlisted_count
+    results, new = [], []
+    for user in users:
+        if user.pk in taken:
+            results.append(ValueError("Already registered for this event."))
+            continue
+        taken.add(user.pk)
+        if seats:
+            seats -= 1
+            reg = Registration(event=ev, user=user, status="registered")
+        else:
+            position += 1
+            reg = Registration(event=ev, user=user, status="waitlisted", waitlist_position=position)
+        new.append(reg)
+        results.append(reg)
+    Registration.objects.bulk_create(new)
+    from . import profile_cache, versions
+    profile_cache.invalidate([r.user_id for r in new])
+    versions.bump("events")
+    _slot_changed(ev.pk)
+    waitlisted = position - ev.waitlisted_count
+    seated = len(new) - waitlisted
+    if new:
+        EventSlot.objects.filter(pk=ev.pk).update(
+            registered_count=F("registered_count") + seated,
+            waitlisted_count=F("waitlisted_count") + waitlisted,
+        )
+    return results
+
+def _close_waitlist_gaps(ev_pk, positions):
+    """Shift everyone behind each vacated waitlist position forward by one."""
+    for pos in sorted(positions, reverse=True):
+        (Registration.objects
+         .filter(event_id=ev_pk, status="waitlisted", waitlist_position__gt=pos)
+         .update(waitlist_position=F("waitlist_position") - 1))
+    if positions:
+        EventSlot.objects.filter(pk=ev_pk).update(waitlisted_count=F("waitlisted_count") - len(positions))
+
+@transaction.atomic
+def promote_waitlist(event: EventSlot) -> int:
+    """
+    Fill every free seat from the head of the waitlist with one UPDATE.
+    Call after anything frees seats: cancellations, capacity increases,
+    admin removals. Returns the number of people promoted.
+    """
+    ev = EventSlot.objects.select_for_update().get(pk=event.pk)
+    free = ev.max_participants - ev.registered_count
+    if free <= 0 or not ev.waitlisted_count:
+        return 0
+    # positions are dense, so the head of the queue is exactly 1..free
+    n = (Registration.objects
+         .filter(event=ev, status="waitlisted", waitlist_position__lte=free)
+         .update(status="registered", waitlist_position=None))
+    if n:
+        (Registration.objects.filter(event=ev, status="waitlisted")
+         .update(waitlist_position=F("waitlist_position") - n))
+        EventSlot.objects.filter(pk=ev.pk).update(
+            registered_count=F("registered_count") + n,
+            waitlisted_count=F("waitlisted_count") - n,
+        )
+        from . import versions
+        versions.bump("events")
+        _slot_changed(ev.pk)
+    return n
+
 @transaction.atomic
 def cancel_registration(reg: Registration):
-    ev = EventSlot.objects.select_for_update().get(pk=reg.event_id)
-    was_registered = (reg.status == "registered")
+    EventSlot.objects.select_for_update().get(pk=reg.event_id)
+    reg.refresh_from_db(fields=["status", "waitlist_position"])
+    was_status, was_position = reg.status, reg.waitlist_position
     reg.status = "canceled"
-    reg.save(update_fields=["status"])
-    if was_registered:
-        ev.registered_count = F("registered_count") - 1
-        ev.save(update_fields=["registered_count"])
-        # promote first waitlisted
-        wl = (Registration.objects
-              .select_for_update()
-              .filter(event=ev, status="waitlisted")
-              .order_by("created_at")
-              .first())
-        if wl:
-            wl.status = "registered"
-            wl.save(update_fields=["status"])
-            ev.registered_count = F("registered_count") + 1
-            ev.save(update_fields=["registered_count"])
+    reg.waitlist_position = None
+    reg.save(update_fields=["status", "waitlist_position"])
+    if was_status == "registered":
+        EventSlot.objects.filter(pk=reg.event_id).update(registered_count=F("registered_count") - 1)
+        promote_waitlist(reg.event)
+    elif was_status == "waitlisted":
+        _close_waitlist_gaps(reg.event_id, [was_position])
+    _slot_changed(reg.event_id)
+
+@transaction.atomic
+def remove_registrations(regs):
+    """Delete registrations (admin removals) and hand freed seats to the waitlist."""
+    by_event = {}
+    for reg in regs:
+        by_event.setdefault(reg.event_id, []).append(reg.pk)
+    for ev_pk, pks in sorted(by_event.items()):
+        ev = EventSlot.objects.select_for_update().get(pk=ev_pk)
+        rows = list(Registration.objects.filter(pk__in=pks).values_list("status", "waitlist_position"))
+        Registration.objects.filter(pk__in=pks).delete()
+        seated = sum(1 for st, _ in rows if st == "registered")
+        if seated:
+            EventSlot.objects.filter(pk=ev_pk).update(registered_count=F("registered_count") - seated)
+        _close_waitlist_gaps(ev_pk, [pos for st, pos in rows if st == "waitlisted"])
+        promote_waitlist(ev)
+
+# ----- Monthly caps -----
+def reserve_cap(user: User, activity: Activity, when=None):
+    """
+    Take one slot of `activity`'s monthly cap for `user`; call in the same
+    transaction that saves the submission. Returns the month (store it in
+    Submission.cap_period), None if the activity is uncapped, and raises
+    ValueError when the cap is already used up.
+    """
+    cap = activity.monthly_cap_per_student
+    if not cap:
+        return None
+    from .rollups import month_start
+    month = month_start(when)
+    counter = MonthlyCapCounter.objects.filter(user=user, activity=activity, month=month)
+
+    def take():
+        return counter.filter(reserved__lt=cap - F("committed")).update(reserved=F("reserved") + 1)
+
+    if not take():
+        MonthlyCapCounter.objects.get_or_create(user=user, activity=activity, month=month)
+        if not take():
+            raise ValueError("Monthly cap reached for this activity.")
+    return month
+
+def _recommit_cap(user_id, activity_id, month, cap) -> bool:
+    """
+    Rejected -> approved: the slot was released on rejection, so take it back
+    with the same conditional UPDATE as reserve_cap. False when the cap is full.
+    """
+    counter = MonthlyCapCounter.objects.filter(user_id=user_id, activity_id=activity_id, month=month)
+    if not cap:
+        counter.update(committed=F("committed") + 1)
+        return True
+
+    def take():
+        return counter.filter(committed__lt=cap - F("reserved")).update(committed=F("committed") + 1)
+
+    if take():
+        return True
+    MonthlyCapCounter.objects.get_or_create(user_id=user_id, activity_id=activity_id, month=month)
+    return bool(take())
+
+def _move_caps(moves):
+    """
+    moves: [(user_id, activity_id, month, from_status, to_status)] for capped
+    submissions. Rejected -> approved goes through _recommit_cap instead.
+    """
+    deltas = {}
+    for uid, aid, month, old, new in moves:
+        d_res, d_com = deltas.get((uid, aid, month), (0, 0))
+        if old == "pending":
+            d_res -= 1
+            if new == "approved":
+                d_com += 1
+        elif old == "approved" and new == "rejected":
+            d_com -= 1  # released; approving again must fit under the cap
+        deltas[(uid, aid, month)] = (d_res, d_com)
+    for (uid, aid, month), (d_res, d_com) in deltas.items():
+        if d_res or d_com:
+            (MonthlyCapCounter.objects.filter(user_id=uid, activity_id=aid, month=month)
+             .update(reserved=F("reserved") + d_res, committed=F("committed") + d_com))
+
+def submit_evidence(sub: Submission, upload=None) -> Submission:
+    """
+    Reserve the monthly cap slot, store the evidence and save, all or nothing:
+    a file written for a new blob is deleted again if the transaction fails.
+    """
+    written = []
+    try:
+        with transaction.atomic():
+            sub.cap_period = reserve_cap(sub.student.user, sub.activity)
+            if upload:
+                from .uploads import store_evidence
+                # already hashed while streaming; identical files share one blob
+                sub.evidence_blob = store_evidence(upload, written=written)
+                sub.evidence_file = sub.evidence_blob.file.name
+            sub.save()
+    except BaseException:
+        from django.core.files.storage import default_storage
+        for name in written:
+            default_storage.delete(name)
+        raise
+    return sub
 
 @transaction.atomic
 def approve_submission(sub: Submission, by_user: User, comment: str = ""):
     if not sub.can_verify(by_user):
         raise PermissionError("Not allowed to approve this submission.")
-    if sub.status == "approved":
+    prev = Submission.objects.select_for_update().filter(pk=sub.pk).values_list("status", flat=True).first()
+    if prev == "approved":
+        sub.status = prev
         return  # idempotent, ledger enforced below
+    if sub.cap_period:
+        if prev == "rejected":
+            if not _recommit_cap(sub.student.user_id, sub.activity_id, sub.cap_period,
+                                 sub.activity.monthly_cap_per_student):
+                raise ValueError("Monthly cap reached for this activity.")
+        else:
+            _move_caps([(sub.student.user_id, sub.activity_id, sub.cap_period, prev, "approved")])
     sub.status = "approved"
     sub.verified_by = by_user
     sub.verified_at = timezone.now()
     sub.comment = (comment or sub.comment)
     sub.save()
 
-    # create ledger exactly once per submission
+    # create ledger exactly once per submission (its row may have been archived)
+    ref = f"submission:{sub.id}"
+    if already_credited("submission", [ref]):
+        return
     PointLedger.objects.create(
         user=sub.student.user,
         activity=sub.activity,
         points=sub.activity.points,
         source="submission",
-        reference_id=f"submission:{sub.id}",
+        reference_id=ref,
     )
 
 @transaction.atomic
 def reject_submission(sub: Submission, by_user: User, comment: str = ""):
     if not sub.can_verify(by_user):
         raise PermissionError("Not allowed to reject this submission.")
+    prev = Submission.objects.select_for_update().filter(pk=sub.pk).values_list("status", flat=True).first()
+    if sub.cap_period and prev in ("pending", "approved"):
+        _move_caps([(sub.student.user_id, sub.activity_id, sub.cap_period, prev, "rejected")])
     sub.status = "rejected"
     sub.verified_by = by_user
     sub.verified_at = timezone.now()
     sub.comment = (comment or sub.comment)
     sub.save()
 
+def is_verifier(user: User) -> bool:
+    """Admins and volunteers may verify (self-approval is checked per item)."""
+    if user.is_staff:
+        return True
+    try:
+        return user.student.role == "volunteer"
+    except Student.DoesNotExist:
+        return False
+
+@transaction.atomic
+def bulk_verify_submissions(ids, by_user: User, action: str = "approve", comment: str = "") -> dict:
+    """
+    Approve or reject many submissions in one transaction.
+    Statuses change with a single UPDATE and approvals write their ledger rows
+    with bulk_create (still one row per submission). Returns
+    {submission_id: "approved" | "rejected" | "already_approved" |
+     "already_rejected" | "forbidden" | "cap_reached" | "not_found"}.
+    """
+    if action not in ("approve", "reject"):
+        raise ValueError("Unknown action.")
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    report = {pk: "not_found" for pk in ids}
+    if not is_verifier(by_user):
+        return {pk: "forbidden" for pk in ids}
+
+    target = "approved" if action == "approve" else "rejected"
+    rows = (Submission.objects.select_for_update(of=("self",))
+            .filter(pk__in=ids)
+            .values_list("pk", "status", "student__user_id", "activity_id", "activity__tier", "cap_period",
+                         "activity__monthly_cap_per_student"))
+    todo, caps = [], []
+    for pk, status, owner_id, activity_id, tier, cap_period, cap in rows:
+        if owner_id == by_user.id:
+            report[pk] = "forbidden"
+        elif status == target:
+            report[pk] = f"already_{target}"
+        elif cap_period and status == "rejected" and not _recommit_cap(owner_id, activity_id, cap_period, cap):
+            report[pk] = "cap_reached"
+        else:
+            report[pk] = target
+            todo.append((pk, owner_id, activity_id, tier))
+            if cap_period:
+                caps.append((owner_id, activity_id, cap_period, status, target))
+    if not todo:
+        return report
+    _move_caps(caps)
+
+    changes = dict(status=target, verified_by=by_user, verified_at=timezone.now())
+    if comment:
+        changes["comment"] = comment
+    Submission.objects.filter(pk__in=[t[0] for t in todo]).update(**changes)
+    from . import profile_cache
+    profile_cache.invalidate({t[1] for t in todo})
+
+    if action == "approve":
+        refs = {f"submission:{pk}": (owner_id, activity_id, tier) for pk, owner_id, activity_id, tier in todo}
+        done = already_credited("submission", refs)
+        ledger = [PointLedger(user_id=uid, activity_id=aid, points=tier, source="submission", reference_id=ref)
+                  for ref, (uid, aid, tier) in refs.items() if ref not in done]
+        PointLedger.objects.bulk_create(ledger, batch_size=500)
+        record_ledger_rows(ledger)
+    return report
+
+def describe_outcomes(report: dict):
+    """('3 approved, 1 forbidden', all_ok) for flash messages."""
+    counts = {}
+    for outcome in report.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    summary = ", ".join(f"{n} {k.replace('_', ' ')}" for k, n in sorted(counts.items()))
+    return summary, not (counts.keys() - {"approved", "rejected"})
+
 @transaction.atomic
 def redeem_reward(user: User, reward: Reward) -> Redemption:
-    # stock check
-    if not reward.active:
-        raise ValueError("Reward not active.")
-    if reward.stock is not None and reward.stock <= 0:
-        raise ValueError("Reward out of stock.")
-
-    # sufficient points?
-    pts = total_points(user)
-    spent = (Redemption.objects.filter(user=user)
-             .exclude(status="canceled")
-             .aggregate(x=models.Sum("reward__points_cost"))["x"] or 0)
-    available = pts - spent
-    if available < reward.points_cost:
+    """
+    Reserve a unit of stock, then spend the points, then record the redemption.
+    Each step is one conditional UPDATE, so concurrent redemptions can neither
+    oversell a limited reward nor overdraw a balance; a failed step raises and
+    the transaction rolls the earlier ones back.
+    """
+    # reserve inventory (NULL stock = unlimited, NULL - 1 stays NULL)
+    reserved = (Reward.objects
+                .filter(pk=reward.pk, active=True)
+                .filter(Q(stock__isnull=True) | Q(stock__gt=0))
+                .update(stock=F("stock") - 1))
+    if not reserved:
+        active = Reward.objects.filter(pk=reward.pk).values_list("active", flat=True).first()
+        raise ValueError("Reward out of stock." if active else "Reward not active.")
+
+    # spend points against the materialized balance
+    cost = reward.points_cost
+    def spend():
+        return (PointBalance.objects
+                .filter(user=user, available__gte=cost)
+                .update(spent=F("spent") + cost, available=F("available") - cost, updated_at=timezone.now()))
+    spent = spend()
+    if not spent and not cost:
+        # no balance row yet (nothing earned); a free reward is still affordable
+        PointBalance.objects.get_or_create(user=user)
+        spent = spend()
+    if not spent:
         raise ValueError("Insufficient points.")
 
-    # create redemption
-    red = Redemption.objects.create(user=user, reward=reward, status="pending")
-    # decrement stock
-    if reward.stock is not None:
-        Reward.objects.filter(pk=reward.pk, stock__gt=0).update(stock=F("stock") - 1)
-        reward.refresh_from_db()
-        if reward.stock < 0:
-            raise ValueError("Race: stock went negative")
-    return red
+    from . import profile_cache
+    profile_cache.invalidate([user.pk])
+    return Redemption.objects.create(user=user, reward=reward, status="pending")
+
+@transaction.atomic
+def cancel_redemption(redemption: Redemption) -> bool:
+    """
+    Cancel a redemption: refund its points and return the unit to stock.
+    The status flip is a conditional UPDATE, so a redemption is refunded at
+    most once. Returns False if it was already canceled.
+    """
+    canceled = (Redemption.objects
+                .filter(pk=redemption.pk).exclude(status="canceled")
+                .update(status="canceled"))
+    if not canceled:
+        return False
+    redemption.status = "canceled"
+    reward = Reward.objects.get(pk=redemption.reward_id)
+    _bump_balance(redemption.user_id, spent=-reward.points_cost)
+    Reward.objects.filter(pk=reward.pk, stock__isnull=False).update(stock=F("stock") + 1)
+    from . import profile_cache
+    profile_cache.invalidate([redemption.user_id])
+    return True
@@ -0,0 +1,166 @@
+# app/onboarding.py
+"""
+Bulk student import from the registrar CSV.
+
+Rows are read as a stream and handled in batches. Each batch is validated,
+deduplicated against the file so far and against existing emails/PNRs (two
+IN queries), has its passwords hashed on a process pool, and is written with
+two bulk_creates (User, then Student) in one transaction.
+
+CSV header: name,email,pnr,phone,department,semester[,password]
+Rows without a password get an unusable one (students use password reset).
+The web upload takes at most WEB_MAX_ROWS rows, WEB_MAX_PASSWORDS of them with
+a password (each costs a full PBKDF2 hash inside the request); bigger files
+go through `manage.py import_students`.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.validators import validate_email
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .models import Student
+
+REQUIRED = ("name", "email", "pnr", "phone", "department", "semester")
+WEB_MAX_ROWS = 2000
+WEB_MAX_PASSWORDS = 50  # ~0.4 s each on one core: well inside a worker timeout
+# CSV column -> the model field it ends up in (email is also the username)
+STORED_IN = {"name": (User, "first_name"), "email": (User, "username"), "pnr": (Student, "pnr"),
+             "phone": (Student, "phone"), "department": (Student, "department"),
+             "semester": (Student, "semester")}
+
+def _max_lengths():
+    return {col: model._meta.get_field(name).max_length for col, (model, name) in STORED_IN.items()}
+
+def _init_worker():
+    # spawn-based platforms start with a bare interpreter
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+def _hash(password):
+    return make_password(password or None)
+
+def iter_rows(fileobj):
+    """Yield (line_no, row dict) with stripped values and lower-cased email."""
+    reader = csv.DictReader(fileobj)
+    missing = [c for c in REQUIRED if c not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    for row in reader:
+        row = {k: (v or "").strip() for k, v in row.items() if k}
+        row["email"] = row["email"].lower()
+        yield reader.line_num, row
+
+def _batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_students(rows, batch_size=500, workers=None, dry_run=False, progress=None):
+    """
+    Import (line_no, row) pairs from iter_rows(). `workers=1` hashes inline
+    (what the web upload uses); otherwise a process pool does, for the CLI.
+    `progress(report)` is called after every batch. Returns the report dict:
+    rows, created, existing, duplicate, invalid, errors [(line, reason)], seconds.
+    """
+    report = {"rows": 0, "created": 0, "existing": 0, "duplicate": 0, "invalid": 0,
+              "errors": [], "seconds": 0.0}
+    seen_emails, seen_pnrs = set(), set()
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers != 1 else None
+    try:
+        for batch in _batches(rows, batch_size):
+            report["rows"] += len(batch)
+            fresh = _validate(batch, seen_emails, seen_pnrs, report)
+            if fresh and not dry_run:
+                _insert(fresh, pool, report)
+            elif dry_run:
+                report["created"] += len(fresh)
+            report["seconds"] = time.perf_counter() - started
+            if progress:
+                progress(report)
+    finally:
+        if pool:
+            pool.shutdown()
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+def _validate(batch, seen_emails, seen_pnrs, report):
+    ok = []
+    limits = _max_lengths()
+    for line, row in batch:
+        if not all(row.get(c) for c in REQUIRED):
+            report["invalid"] += 1
+            report["errors"].append((line, "missing field(s)"))
+            continue
+        # checked here so one long cell can't fail the whole bulk insert (DataError)
+        too_long = [f"{col} (max {n})" for col, n in limits.items() if len(row[col]) > n]
+        if too_long:
+            report["invalid"] += 1
+            report["errors"].append((line, f"too long: {', '.join(too_long)}"))
+            continue
+        try:
+            validate_email(row["email"])
+        except ValidationError:
+            report["invalid"] += 1
+            report["errors"].append((line, f"bad email {row['email']!r}"))
+            continue
+        if row["email"] in seen_emails or row["pnr"] in seen_pnrs:
+            report["duplicate"] += 1
+            report["errors"].append((line, "duplicate of an earlier row"))
+            continue
+        seen_emails.add(row["email"])
+        seen_pnrs.add(row["pnr"])
+        ok.append((line, row))
+    if not ok:
+        return ok
+
+    emails = [r["email"] for _, r in ok]
+    taken_emails = set(User.objects.annotate(e=Lower("email")).filter(e__in=emails, email__gt="")
+                       .values_list("e", flat=True))
+    taken_emails |= set(User.objects.filter(username__in=emails).values_list("username", flat=True))
+    taken_pnrs = set(Student.objects.filter(pnr__in=[r["pnr"] for _, r in ok]).values_list("pnr", flat=True))
+    fresh = []
+    for line, row in ok:
+        if row["email"] in taken_emails or row["pnr"] in taken_pnrs:
+            report["existing"] += 1
+        else:
+            fresh.append((line, row))
+    return fresh
+
+def _insert(fresh, pool, report):
+    passwords = [row.get("password", "") for _, row in fresh]
+    if pool:
+        chunk = max(1, len(passwords) // ((os.cpu_count() or 1) * 4))
+        hashes = list(pool.map(_hash, passwords, chunksize=chunk))
+    else:
+        hashes = [_hash(p) for p in passwords]
+    users = [User(username=row["email"], email=row["email"], first_name=row["name"], password=h)
+             for (_, row), h in zip(fresh, hashes)]
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            Student.objects.bulk_create([
+                Student(user=u, phone=row["phone"], pnr=row["pnr"],
+                        department=row["department"], semester=row["semester"])
+                for u, (_, row) in zip(users, fresh)
+            ])
+    except IntegrityError as e:
+        # someone signed up with one of these emails/PNRs mid-import
+        report["invalid"] += len(fresh)
+        report["errors"].append((fresh[0][0], f"batch from line {fresh[0][0]} rejected: {e}"))
+        return
+    report["created"] += len(fresh)
@@ -0,0 +1,60 @@
+# app/profile_cache.py
+"""
+Per-user profile summary, cached as plain data.
+
+asummary() caches the points, counts, completed activities and badges under
+a per-user version. The version moves whenever that user's registrations,
+submissions or ledger rows change, so a hit costs one cache read and no queries.
+"""
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from . import versions
+from .models import PointBalance, PointLedger, Registration, Submission
+
+def _name(user_id):
+    return f"user:{user_id}"
+
+def summary_version(user_id) -> int:
+    return versions.get(_name(user_id))
+
+async def asummary_version(user_id) -> int:
+    return await versions.aget(_name(user_id))
+
+def invalidate(user_ids):
+    versions.bump(*(_name(uid) for uid in user_ids))
+
+def completed_activities(user):
+    """
+    Latest submission-ledger row per activity, picked in SQL. Archived months
+    only have "summary" rows left, each folding a month of rows into one: they
+    count towards the totals but are not single completions, so not listed here.
+    """
+    mine = PointLedger.objects.filter(user=user, source="submission")
+    latest = (mine.filter(activity_id=OuterRef("activity_id"))
+              .order_by("-created_at", "-id").values("id")[:1])
+    return (mine.filter(id=Subquery(latest))
+            .select_related("activity").order_by("-created_at"))
+
+async def asummary(user, version):
+    """
+    The summary as plain data for the async profile view, so its template
+    never queries from the event loop.
+    """
+    key = f"profile:summary:{user.pk}:{version}"
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+    completed = completed_activities(user).values("created_at", "points", "activity__title")
+    badges = user.badges.order_by("awarded_at").values("earned", "potential", "threshold__name")
+    data = {
+        "points": await PointBalance.objects.filter(user=user).values_list("earned", flat=True).afirst() or 0,
+        "active_registrations": await Registration.objects.filter(user=user).exclude(status="canceled").acount(),
+        "pending_submissions": await Submission.objects.filter(student__user=user, status="pending").acount(),
+        "completed": [{"created_at": r["created_at"], "points": r["points"],
+                       "activity": {"title": r["activity__title"]}} async for r in completed],
+        "badges": [{"earned": b["earned"], "potential": b["potential"],
+                    "threshold": {"name": b["threshold__name"]}} async for b in badges],
+    }
+    await cache.aset(key, data, 3600)
+    return data
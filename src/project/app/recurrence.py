@@ -0,0 +1,96 @@
+# app/recurrence.py
+"""
+Weekly recurrence for event slots ("every Tue/Thu 16:00 for 90 min from
+Sep 1 to Dec 15, skipping holidays").
+
+expand() builds the occurrences in memory, conflicts() checks them against
+existing slots at the same location in one query, and create_series() writes
+the activity and all of its slots in one transaction with a single bulk_create.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Activity, EventSlot
+
+MAX_OCCURRENCES = 400  # ~ a year of daily slots; guards against typos in the end date
+
+def holidays():
+    """Campus closure dates from settings.CAMPUS_HOLIDAYS (ISO strings)."""
+    return {date.fromisoformat(d) for d in getattr(settings, "CAMPUS_HOLIDAYS", ())}
+
+def expand(first: date, until: date, weekdays, start: time, duration: timedelta, skip=()):
+    """
+    Occurrences as [(start_at, end_at)] for every date in [first, until] whose
+    weekday (Mon=0) is in `weekdays` and that isn't in `skip`. With no weekdays
+    it's a single occurrence on `first`, unless `first` is skipped. Raises
+    ValueError when nothing is left or the schedule passes MAX_OCCURRENCES.
+    """
+    if duration <= timedelta(0):
+        raise ValueError("Duration must be positive.")
+    skip = set(skip)
+    if not weekdays:
+        days = [first] if first not in skip else []
+    else:
+        if until < first:
+            raise ValueError("End date is before the start date.")
+        wd = set(weekdays)
+        days, d = [], first
+        last = min(until, first + timedelta(weeks=MAX_OCCURRENCES + 1))  # any weekday overflows by then
+        while d <= last:
+            if d.weekday() in wd and d not in skip:
+                days.append(d)
+                if len(days) > MAX_OCCURRENCES:  # stop before walking a far-off end date
+                    raise ValueError(f"That schedule expands to more than {MAX_OCCURRENCES} slots.")
+            d += timedelta(days=1)
+    if not days:
+        raise ValueError("No dates left after skipping holidays.")
+    spans = []
+    for d in days:
+        start_at = timezone.make_aware(datetime.combine(d, start))
+        spans.append((start_at, start_at + duration))
+    return spans
+
+def conflicts(location: str, spans):
+    """
+    [(span, existing_slot_row)] for each occurrence that overlaps a slot
+    already booked at `location` (or another occurrence of the same series).
+    """
+    if not spans:
+        return []
+    spans = sorted(spans)
+    existing = list(EventSlot.objects
+                    .filter(location=location, start_at__lt=spans[-1][1], end_at__gt=spans[0][0])
+                    .order_by("start_at")
+                    .values("id", "start_at", "end_at", "activity__title"))
+    out = []
+    for prev, cur in zip(spans, spans[1:]):
+        if cur[0] < prev[1]:
+            out.append((cur, {"id": None, "start_at": prev[0], "end_at": prev[1],
+                              "activity__title": "(this series)"}))
+    # both lists are sorted by start; walk them together
+    j = 0
+    for span in spans:
+        while j < len(existing) and existing[j]["end_at"] <= span[0]:
+            j += 1
+        k = j
+        while k < len(existing) and existing[k]["start_at"] < span[1]:
+            if existing[k]["end_at"] > span[0]:
+                out.append((span, existing[k]))
+            k += 1
+    return out
+
+def create_series(spans, capacity: int, location: str, **activity_fields):
+    """One Activity plus one EventSlot per span, in one transaction."""
+    from . import versions
+    with transaction.atomic():
+        act = Activity.objects.create(**activity_fields)
+        EventSlot.objects.bulk_create([
+            EventSlot(activity=act, start_at=s, end_at=e, max_participants=capacity,
+                      location=location, notes="")
+            for s, e in spans
+        ])
+        versions.bump("events")  # bulk_create skips the post_save bump
+    return act
@@ -0,0 +1,101 @@
+# app/rollups.py
+"""
+Per-user, per-activity, per-month PointRollup buckets.
+
+Written alongside every ledger insert (see models.record_ledger_rows) and
+rebuildable in bulk with `manage.py backfill_rollups`. Period questions -
+past months, semesters, arbitrary ranges, monthly caps - read the buckets
+instead of re-summing raw PointLedger rows.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import PointLedger, PointRollup
+
+def month_start(dt=None) -> date:
+    return timezone.localtime(dt or timezone.now()).date().replace(day=1)
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+def parse_period(value: str):
+    """
+    "2025-08"          -> that month
+    "2025-S1"/"-S2"    -> Jan-Jun / Jul-Dec
+    "2025-01..2025-03" -> inclusive month range
+    Returns (start, end_exclusive) month dates, or None if unparseable.
+    """
+    try:
+        if ".." in value:
+            a, b = value.split("..")
+            return date.fromisoformat(a + "-01"), add_months(date.fromisoformat(b + "-01"), 1)
+        year, part = value.split("-")
+        if part.upper() in ("S1", "S2"):
+            start = date(int(year), 1 if part.upper() == "S1" else 7, 1)
+            return start, add_months(start, 6)
+        start = date(int(year), int(part), 1)
+        return start, add_months(start, 1)
+    except ValueError:
+        return None
+
+# ----- writes -----
+def apply_rows(rows):
+    buckets = {}
+    for row in rows:
+        key = (row.user_id, row.activity_id, month_start(row.created_at))
+        pts, n = buckets.get(key, (0, 0))
+        buckets[key] = (pts + row.points, n + 1)
+    for (uid, aid, period), (pts, n) in buckets.items():
+        bucket = PointRollup.objects.filter(user_id=uid, activity_id=aid, period=period)
+        changes = dict(points=F("points") + pts, entries=F("entries") + n)
+        if not bucket.update(**changes):
+            PointRollup.objects.get_or_create(user_id=uid, activity_id=aid, period=period)
+            bucket.update(**changes)
+
+@transaction.atomic
+def backfill():
+    """Rebuild every bucket from the ledger with one grouped scan."""
+    PointRollup.objects.all().delete()
+    grouped = (PointLedger.objects.annotate(m=TruncMonth("created_at"))
+               .values_list("user_id", "activity_id", "m")
+               .annotate(s=Sum("points"), n=Count("id")).order_by())
+    objs = [PointRollup(user_id=uid, activity_id=aid, period=month_start(m), points=pts, entries=n)
+            for uid, aid, m, pts, n in grouped.iterator()]
+    PointRollup.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
+
+# ----- reads -----
+def _standings_qs(start: date, end: date, limit):
+    return (PointRollup.objects
+            .filter(period__gte=start, period__lt=end)
+            .values("user__id", "user__first_name")
+            .annotate(total=Sum("points"))
+            .order_by("-total", "user__id")[:limit])
+
+def _rank(rows):
+    for i, row in enumerate(rows):
+        tied = i and row["total"] == rows[i - 1]["total"]
+        row["rank"] = rows[i - 1]["rank"] if tied else i + 1
+    return rows
+
+def standings(start: date, end: date, limit=20):
+    """Top users by points earned in [start, end) month buckets."""
+    return _rank(list(_standings_qs(start, end, limit)))
+
+async def astandings(start: date, end: date, limit=20):
+    return _rank([row async for row in _standings_qs(start, end, limit)])
+
+def points_between(user, start: date, end: date) -> int:
+    return (PointRollup.objects.filter(user=user, period__gte=start, period__lt=end)
+            .aggregate(s=Sum("points"))["s"] or 0)
+
+def entries_in_month(user, activity, when=None) -> int:
+    """Ledger rows the user earned for `activity` in the month of `when`."""
+    return (PointRollup.objects
+            .filter(user=user, activity=activity, period=month_start(when))
+            .values_list("entries", flat=True).first() or 0)
@@ -0,0 +1,25 @@
+# app/signals.py
+"""Keep per-user cached views honest when rows change through save()/delete()."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import profile_cache, versions
+from .models import EventSlot, PointLedger, Registration, Submission
+
+
+@receiver([post_save, post_delete], sender=Registration)
+@receiver(post_delete, sender=PointLedger)
+def _user_row_changed(sender, instance, **kwargs):
+    profile_cache.invalidate([instance.user_id])
+    if sender is Registration:
+        versions.bump("events")  # capacity / waitlist figures moved
+
+
+@receiver([post_save, post_delete], sender=EventSlot)
+def _slot_changed(sender, instance, **kwargs):
+    versions.bump("events")
+
+
+@receiver([post_save, post_delete], sender=Submission)
+def _submission_changed(sender, instance, **kwargs):
+    profile_cache.invalidate([instance.student.user_id])
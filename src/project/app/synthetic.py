@@ -0,0 +1,118 @@
+# app/synthetic.py
+"""
+Synthetic data at a chosen scale, for benchmarks and profiling.
+
+seed() writes students, activities, event slots and ledger rows with
+bulk_create only (no per-row save(), signals or password hashing), spreads the
+ledger over the past months, then rebuilds the derived tables (balances,
+leaderboards, rollups) once. Everything it creates is named with `prefix`, so
+clear() can remove it again. Same arguments, same data: the generator is seeded.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import leaderboard, rollups
+from .models import (
+    Activity, EventSlot, PointBalance, PointLedger, PointLedgerArchive, Reward, Student,
+    rebuild_point_balances,
+)
+
+BATCH = 5000
+TIERS = [t for t, _ in Activity.TIER_CHOICES]
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def seed(students=1000, activities=50, slots=200, ledger_rows=50000, months=12,
+         prefix="syn_", seed_value=42, log=None) -> dict:
+    """Create the data set; returns counts and how long each stage took."""
+    rng = random.Random(seed_value)
+    now = timezone.now()
+    timings = {}
+
+    def stage(name, t0):
+        timings[name] = round(time.perf_counter() - t0, 3)
+        if log:
+            log(f"{name}: {timings[name]}s")
+
+    t0 = time.perf_counter()
+    password = make_password("synthetic")  # hashed once, shared by every account
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", first_name=f"Student {i}",
+                  password=password) for i in range(students)], batch_size=BATCH)
+        Student.objects.bulk_create(
+            [Student(user=u, phone="0", pnr=u.username, department=rng.choice(["CSE", "ME", "EE", "CE"]),
+                     semester=str(rng.randint(1, 8))) for u in users], batch_size=BATCH)
+    stage("students", t0)
+
+    t0 = time.perf_counter()
+    with transaction.atomic():
+        acts = Activity.objects.bulk_create(
+            [Activity(title=f"{prefix}activity {i}", tier=rng.choice(TIERS)) for i in range(activities)])
+        EventSlot.objects.bulk_create(
+            [EventSlot(activity=rng.choice(acts), location=f"{prefix}room {i % 20}",
+                       start_at=now + timedelta(hours=i), end_at=now + timedelta(hours=i + 2),
+                       max_participants=rng.choice([10, 25, 50, 100]))
+             for i in range(slots)], batch_size=BATCH)
+        Reward.objects.create(title=f"{prefix}reward", points_cost=1, stock=None)
+    stage("catalog", t0)
+
+    # auto_now_add overwrites created_at in bulk_create, so each batch is
+    # re-dated with one UPDATE; batches are sized to roughly one per day of
+    # the `months` of history.
+    t0 = time.perf_counter()
+    span = timedelta(days=30 * months)
+    batch = max(1, min(BATCH, -(-ledger_rows // span.days)))
+    n_batches = max(1, -(-ledger_rows // batch))
+    rows = (PointLedger(user=rng.choice(users), activity=act, points=act.tier, source="manual",
+                        reference_id=f"{prefix}{i}")
+            for i, act in ((i, rng.choice(acts)) for i in range(ledger_rows)))
+    for n, chunk in enumerate(_chunks(rows, batch)):
+        with transaction.atomic():
+            created = PointLedger.objects.bulk_create(chunk)
+            PointLedger.objects.filter(pk__in=[r.pk for r in created]).update(
+                created_at=now - span + span * n / n_batches)
+    stage("ledger", t0)
+
+    t0 = time.perf_counter()
+    rebuild_point_balances()
+    leaderboard.rebuild()
+    rollups.backfill()
+    stage("derived", t0)
+    return {"students": students, "activities": activities, "slots": slots,
+            "ledger_rows": ledger_rows, "timings": timings}
+
+@transaction.atomic
+def clear(prefix="syn_") -> int:
+    """Remove everything seed() made with this prefix."""
+    users = User.objects.filter(username__startswith=prefix)
+    # Plain DELETEs: QuerySet.delete() would load millions of ledger rows for signals.
+    user_ids, params = users.values("pk").query.sql_with_params()
+    with connection.cursor() as cur:
+        for model in (PointLedger, PointLedgerArchive):
+            table = connection.ops.quote_name(model._meta.db_table)
+            cur.execute(f"DELETE FROM {table} WHERE user_id IN ({user_ids})", params)
+    PointBalance.objects.filter(user__in=users).delete()
+    n = users.count()
+    users.delete()
+    acts = Activity.objects.filter(title__startswith=prefix)
+    EventSlot.objects.filter(activity__in=acts).delete()
+    acts.delete()
+    Reward.objects.filter(title__startswith=prefix).delete()
+    leaderboard.rebuild()
+    rollups.backfill()
+    return n
@@ -1,16 +1,24 @@
 # app/tests.py
 import pytest
+from unittest import mock
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from .models import (
-    Student, Activity, EventSlot, register_user_for_event, cancel_registration,
-    Submission, approve_submission, PointLedger, Reward, redeem_reward, total_points
+    Student, Activity, EventSlot, Registration, register_user_for_event, cancel_registration,
+    Submission, approve_submission, PointLedger, Reward, redeem_reward, total_points,
+    PointBalance, rebuild_point_balances, register_users_for_event, Redemption,
 )
 
 pytestmark = pytest.mark.django_db
 
+@pytest.fixture(autouse=True)
+def isolated_cache(settings, tmp_path):
+    # The default cache is shared across processes and runs; give each test its own.
+    settings.CACHES = {"default": {"BACKEND": "app.cache_backends.SharedFileCache",
+                                   "LOCATION": str(tmp_path / "cache.sqlite3")}}
+
 def make_user(email="u@example.com", name="User", staff=False, role="student"):
     u = User.objects.create_user(username=email, email=email, password="pass123", first_name=name, is_staff=staff)
     Student.objects.create(user=u, phone="1", pnr=email, department="CSE", semester="1", role=role)
@@ -70,3 +78,866 @@ def test_total_points_sum():
     PointLedger.objects.create(user=u, activity=a2, points=2, source="manual", reference_id="m1")
     PointLedger.objects.create(user=u, activity=a5, points=5, source="manual", reference_id="m2")
     assert total_points(u) == 7
+
+def test_point_balance_tracks_ledger_and_redemptions():
+    u = make_user("b1@b.com")
+    verifier = make_user("vb@b.com", role="volunteer")
+    act = Activity.objects.create(title="Drive", tier=8, requires_proof=False)
+    PointLedger.objects.create(user=u, activity=act, points=4, source="manual", reference_id="seed:b1")
+    sub = Submission.objects.create(student=u.student, activity=act)
+    approve_submission(sub, verifier)
+    redeem_reward(u, Reward.objects.create(title="Pin", points_cost=5, stock=None))
+    bal = PointBalance.objects.get(user=u)
+    assert (bal.earned, bal.spent, bal.available) == (12, 5, 7)
+    assert total_points(u) == 12
+
+    # drift is reported and repaired from the ledger
+    PointBalance.objects.filter(user=u).update(earned=0, available=0)
+    drift = rebuild_point_balances()
+    assert drift == [(u.id, (0, 5), (12, 5))]
+    assert PointBalance.objects.get(user=u).available == 7
+    assert rebuild_point_balances() == []
+
+def test_leaderboard_standings_follow_ledger():
+    from . import leaderboard as lb
+    act = Activity.objects.create(title="LB", tier=2, requires_proof=False)
+    users = [make_user(f"l{i}@l.com", name=f"L{i}") for i in range(4)]
+    for i, (u, pts) in enumerate(zip(users, [5, 9, 5, 1])):
+        PointLedger.objects.create(user=u, activity=act, points=pts, source="manual", reference_id=f"lb:{i}")
+
+    rows, cursor = lb.top(lb.OVERALL, limit=2)
+    assert [(r["user__id"], r["rank"]) for r in rows] == [(users[1].id, 1), (users[0].id, 2)]
+    rows, cursor = lb.top(lb.OVERALL, limit=2, after=cursor)
+    assert [(r["user__id"], r["rank"]) for r in rows] == [(users[2].id, 2), (users[3].id, 4)]
+    assert cursor is None
+
+    me = lb.around(lb.OVERALL, users[2], radius=1)
+    assert me["rank"] == 2
+    assert [r["user__id"] for r in me["rows"]] == [users[0].id, users[2].id, users[3].id]
+    assert lb.top(lb.month_board(), limit=10)[0][0]["total"] == 9
+
+def test_rollups_answer_past_periods():
+    from datetime import date
+    from . import rollups
+    u1, u2 = make_user("r1@r.com"), make_user("r2@r.com")
+    act = Activity.objects.create(title="Roll", tier=5, requires_proof=False)
+    rows = [(u1, 5, "2025-02-10"), (u1, 5, "2025-02-20"), (u2, 8, "2025-03-05"), (u2, 2, "2025-08-01")]
+    for i, (u, pts, day) in enumerate(rows):
+        PointLedger.objects.create(user=u, activity=act, points=pts, source="manual", reference_id=f"r:{i}")
+        PointLedger.objects.filter(reference_id=f"r:{i}").update(
+            created_at=timezone.make_aware(timezone.datetime.fromisoformat(day + "T12:00")))
+    rollups.backfill()  # created_at was rewritten after insert
+
+    assert rollups.entries_in_month(u1, act, timezone.make_aware(timezone.datetime(2025, 2, 3))) == 2
+    s1 = rollups.standings(*rollups.parse_period("2025-S1"))
+    assert [(r["user__id"], r["total"], r["rank"]) for r in s1] == [(u1.id, 10, 1), (u2.id, 8, 2)]
+    assert rollups.parse_period("2025-01..2025-03") == (date(2025, 1, 1), date(2025, 4, 1))
+    assert rollups.points_between(u2, date(2025, 7, 1), date(2026, 1, 1)) == 2
+
+def test_batched_registration_assigns_seats_in_arrival_order():
+    users = [make_user(f"g{i}@g.com") for i in range(3)]
+    act = Activity.objects.create(title="Flash", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=2, registered_count=0, location="Quad")
+    results = register_users_for_event(ev, [users[0], users[1], users[0], users[2]])
+    assert [getattr(r, "status", None) for r in results] == ["registered", "registered", None, "waitlisted"]
+    assert isinstance(results[2], ValueError)
+    ev.refresh_from_db()
+    assert ev.registered_count == 2
+    assert Registration.objects.filter(event=ev).count() == 3
+
+def test_waitlist_positions_and_bulk_promotion():
+    from .models import promote_waitlist, remove_registrations
+    act = Activity.objects.create(title="Queue", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=1, registered_count=0, location="Hall")
+    regs = [register_user_for_event(make_user(f"w{i}@w.com"), ev) for i in range(5)]
+    assert [r.waitlist_position for r in regs] == [None, 1, 2, 3, 4]
+
+    cancel_registration(regs[2])  # leaving the waitlist closes the gap
+    assert list(Registration.objects.filter(event=ev, status="waitlisted")
+                .order_by("waitlist_position").values_list("user_id", "waitlist_position")) == [
+        (regs[1].user_id, 1), (regs[3].user_id, 2), (regs[4].user_id, 3)]
+
+    EventSlot.objects.filter(pk=ev.pk).update(max_participants=3)
+    assert promote_waitlist(ev) == 2
+    remove_registrations([regs[0]])  # admin removal frees one more seat
+    ev.refresh_from_db()
+    assert (ev.registered_count, ev.waitlisted_count) == (3, 0)
+    assert set(Registration.objects.filter(event=ev, status="registered").values_list("pk", flat=True)) == {
+        regs[1].pk, regs[3].pk, regs[4].pk}
+
+def test_promotions_push_live_and_admin_keeps_counters(django_capture_on_commit_callbacks):
+    from types import SimpleNamespace
+    from django.contrib.admin.sites import site
+    from . import live
+    from .models import promote_waitlist
+    act = Activity.objects.create(title="Push", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=1, registered_count=0, location="Hall")
+    for i in range(3):
+        register_user_for_event(make_user(f"pu{i}@w.com"), ev)
+    EventSlot.objects.filter(pk=ev.pk).update(max_participants=2)
+    with mock.patch.object(live.hub, "notify") as notify, django_capture_on_commit_callbacks(execute=True):
+        assert promote_waitlist(ev) == 1
+    notify.assert_called_once_with([ev.pk])
+
+    stale = EventSlot.objects.get(pk=ev.pk)  # what the admin form loaded: 2 registered, 1 waitlisted
+    register_user_for_event(make_user("pu-late@w.com"), ev)  # meanwhile: 2 waitlisted
+    stale.max_participants = 4
+    site._registry[EventSlot].save_model(None, stale, SimpleNamespace(changed_data=["max_participants"]), True)
+    ev.refresh_from_db()
+    assert (ev.max_participants, ev.registered_count, ev.waitlisted_count) == (4, 4, 0)
+
+def test_bulk_verify_reports_each_submission():
+    from .models import bulk_verify_submissions
+    verifier = make_user("bv@v.com", role="volunteer")
+    act = Activity.objects.create(title="Bulk", tier=5, requires_proof=False)
+    subs = [Submission.objects.create(student=make_user(f"bs{i}@s.com").student, activity=act) for i in range(3)]
+    own = Submission.objects.create(student=verifier.student, activity=act)
+    approve_submission(subs[0], verifier)
+
+    report = bulk_verify_submissions([s.pk for s in subs] + [own.pk, 999999], verifier, "approve")
+    assert report == {subs[0].pk: "already_approved", subs[1].pk: "approved", subs[2].pk: "approved",
+                      own.pk: "forbidden", 999999: "not_found"}
+    assert PointLedger.objects.filter(source="submission").count() == 3
+    assert total_points(subs[1].student.user) == 5
+    assert bulk_verify_submissions([subs[1].pk], make_user("nobody@s.com"), "reject") == {subs[1].pk: "forbidden"}
+
+def test_verify_queue_pages_and_claims():
+    from . import verification
+    act = Activity.objects.create(title="Queue", tier=2, requires_proof=False)
+    subs = [Submission.objects.create(student=make_user(f"q{i}@q.com").student, activity=act) for i in range(5)]
+    v1 = make_user("v1@q.com", role="volunteer")
+    v2 = make_user("v2@q.com", role="volunteer")
+
+    rows, cursor = verification.pending_page(v1, limit=2)
+    assert [r["id"] for r in rows] == [subs[0].pk, subs[1].pk]
+    rows, _ = verification.pending_page(v1, after=cursor, limit=2)
+    assert [r["id"] for r in rows] == [subs[2].pk, subs[3].pk]
+    # v1 holds the first four; v2 only sees what is left
+    rows, cursor = verification.pending_page(v2, limit=10)
+    assert [r["id"] for r in rows] == [subs[4].pk] and cursor is None
+    verification.release(v1, [subs[0].pk])
+    assert [r["id"] for r in verification.pending_page(v2, limit=1)[0]] == [subs[0].pk]
+    assert verification.pending_count() == 5
+
+    # v2 wins the race for v1's first window: v1's page fills from further on
+    act2 = Activity.objects.create(title="Race", tier=2, requires_proof=False)
+    race = [Submission.objects.create(student=make_user(f"r{i}@q.com").student, activity=act2) for i in range(5)]
+    real_claim = verification.claim
+    def racing(user, ids, now=None):
+        if user == v1 and ids == [race[0].pk, race[1].pk]:
+            real_claim(v2, ids, now=now)
+        return real_claim(user, ids, now=now)
+    with mock.patch.object(verification, "claim", racing):
+        rows, cursor = verification.pending_page(v1, activity=act2.pk, limit=2)
+    assert [r["id"] for r in rows] == [race[2].pk, race[3].pk] and cursor
+    rows, cursor = verification.pending_page(v1, activity=act2.pk, after=cursor, limit=2)
+    assert [r["id"] for r in rows] == [race[4].pk] and cursor is None
+
+def test_evidence_upload_is_hashed_deduped_and_thumbnailed(settings, tmp_path):
+    import io
+    from PIL import Image
+    from .models import EvidenceBlob
+    from .thumbnails import make_thumbnail
+    settings.MEDIA_ROOT = tmp_path
+    from django.test import Client
+    u = make_user("e@e.com")
+    act = Activity.objects.create(title="Photo", tier=2, requires_proof=True)
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 900), "green").save(buf, "JPEG")
+    c = Client()
+    c.force_login(u)
+    for name in ("a.jpg", "b.jpg"):
+        c.post("/submissions/new/", {"activity": act.pk,
+                                     "evidence_file": SimpleUploadedFile(name, buf.getvalue(), "image/jpeg")})
+    assert Submission.objects.count() == 2
+    blob = EvidenceBlob.objects.get()
+    assert set(Submission.objects.values_list("evidence_blob", flat=True)) == {blob.pk}
+
+    assert make_thumbnail(blob.pk) == "done"
+    blob.refresh_from_db()
+    with blob.thumbnail.open("rb") as fh:
+        assert max(Image.open(fh).size) <= 480
+
+    # evidence is served to its student and to verifiers only, never as public media
+    for who, status in ((u, 200), (make_user("e-v@e.com", role="volunteer"), 200), (make_user("e-x@e.com"), 404)):
+        viewer = Client(); viewer.force_login(who)
+        for name in (blob.file.name, blob.thumbnail.name):
+            assert viewer.get(f"/evidence/{name}").status_code == status, (who, name)
+    assert Client().get(f"/evidence/{blob.file.name}").status_code == 302  # to the login page
+    verifier = Client(); verifier.force_login(User.objects.get(username="e-v@e.com"))
+    assert f'src="/evidence/{blob.thumbnail.name}"' in verifier.get("/verify/queue/").content.decode()
+    assert c.get(f"/{settings.MEDIA_URL}{blob.file.name}").status_code == 404
+
+    # a submission that fails to save leaves no new file behind
+    from django.db import DatabaseError
+    with mock.patch.object(Submission, "save", side_effect=DatabaseError("disk full")), pytest.raises(DatabaseError):
+        c.post("/submissions/new/", {"activity": act.pk,
+                                     "evidence_file": SimpleUploadedFile("d.png", b"fresh bytes", "image/png")})
+    assert EvidenceBlob.objects.count() == 1
+    assert [p.name for p in (tmp_path / "evidence").rglob("*.png")] == []
+    assert blob.file.storage.exists(blob.file.name)  # shared blobs are never touched
+
+    settings.EVIDENCE_MAX_UPLOAD_BYTES = 100
+    c.post("/submissions/new/", {"activity": act.pk,
+                                 "evidence_file": SimpleUploadedFile("c.jpg", b"x" * 5000, "image/jpeg")})
+    assert Submission.objects.count() == 2
+
+def test_thumbnail_of_decompression_bomb_is_marked_failed(settings, tmp_path, monkeypatch):
+    import io
+    from PIL import Image
+    from django.core.files.base import ContentFile
+    from .models import EvidenceBlob
+    from .thumbnails import make_thumbnail
+    settings.MEDIA_ROOT = tmp_path
+    buf = io.BytesIO()
+    Image.new("RGB", (400, 400), "green").save(buf, "PNG")
+    blob = EvidenceBlob(sha256="b" * 64, size=len(buf.getvalue()), content_type="image/png")
+    blob.file.save("bomb.png", ContentFile(buf.getvalue()), save=True)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)  # 400x400 is > 2x this: DecompressionBombError
+    assert make_thumbnail(blob.pk) == "failed"
+    assert EvidenceBlob.objects.get(pk=blob.pk).thumb_status == "failed"
+
+def test_sliding_window_rate_limit_headers_and_keys():
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from .throttling import hit, rate_limit
+    bucket = "rl:test:slide"
+    for _ in range(4):
+        assert hit(bucket, limit=4, window_sec=60, now=6000.0)[0]
+    assert not hit(bucket, limit=4, window_sec=60, now=6030.0)[0]
+    # 5 hits last window still weigh 55/60 at the start of the next one
+    assert not hit(bucket, limit=4, window_sec=60, now=6065.0)[0]
+    assert hit(bucket, limit=4, window_sec=60, now=6115.0)[0]
+
+    view = rate_limit("t-user", limit=1, window_sec=60, key="user+ip")(lambda r: HttpResponse("ok"))
+    rf = RequestFactory()
+    a, b = make_user("rl1@r.com"), make_user("rl2@r.com")
+    for u in (a, b):  # same NAT address, separate buckets per user
+        req = rf.post("/", REMOTE_ADDR="10.9.9.9")
+        req.user = u
+        resp = view(req)
+        assert resp.status_code == 200 and resp["X-RateLimit-Remaining"] == "0"
+    req = rf.post("/", REMOTE_ADDR="10.9.9.9")
+    req.user = a
+    resp = view(req)
+    assert resp.status_code == 429 and "Retry-After" in resp
+
+def test_shared_file_cache_semantics(tmp_path):
+    from .cache_backends import SharedFileCache
+    c = SharedFileCache(str(tmp_path / "c.sqlite3"), {"OPTIONS": {"MAX_ENTRIES": 10, "CULL_EVERY": 1}})
+    assert c.add("n", 1, 60) and not c.add("n", 5, 60)
+    assert c.incr("n", 4) == 5 and c.decr("n") == 4
+    c.set("d", {"a": [1]}, 60)
+    assert c.get("d") == {"a": [1]}
+    c.set("gone", 1, -1)
+    assert c.get("gone", "miss") == "miss" and c.add("gone", 2)
+    with pytest.raises(ValueError):
+        c.incr("missing")
+    # another handle on the same file sees the same data
+    assert SharedFileCache(str(tmp_path / "c.sqlite3"), {}).get("n") == 4
+    for i in range(30):
+        c.set(f"x{i}", i, 60)
+    assert c._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0] <= 10
+
+def test_shared_file_cache_async_writes_never_block_the_loop(tmp_path):
+    import asyncio, sqlite3, time
+    from asgiref.sync import async_to_sync
+    from .cache_backends import SharedFileCache
+    path = str(tmp_path / "c.sqlite3")
+    c = SharedFileCache(path, {})
+    c.set("k", 0, 60)
+
+    async def scenario():
+        holder = sqlite3.connect(path, isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")  # another process mid-write
+        assert await c.aget("k") == 0      # WAL readers go straight through
+        write = asyncio.ensure_future(c.aset("k", 1, 60))
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.05)          # the loop keeps running meanwhile
+        assert time.perf_counter() - t0 < 1 and not write.done()
+        holder.execute("COMMIT")
+        await write
+        return await c.aget("k")
+
+    assert async_to_sync(scenario)() == 1
+
+def test_profile_summary_is_cached_until_user_data_changes(django_assert_max_num_queries):
+    from django.test import Client
+    from . import profile_cache
+    u = make_user("pf@p.com", name="Pro")
+    act = Activity.objects.create(title="Compost", tier=5, requires_proof=False)
+    for i in range(3):
+        sub = Submission.objects.create(student=u.student, activity=act)
+        approve_submission(sub, make_user(f"pfv{i}@p.com", role="volunteer"))
+    assert [r.activity_id for r in profile_cache.completed_activities(u)] == [act.id]
+
+    c = Client()
+    c.force_login(u)
+    assert "15 Green Points" in c.get("/profile/").content.decode()
+    with django_assert_max_num_queries(7):  # session, user, student, two page counts, rank
+        c.get("/profile/")
+    v = profile_cache.summary_version(u.id)
+    PointLedger.objects.create(user=u, activity=act, points=1, source="manual", reference_id="pf:1")
+    # on_commit bumps do not fire inside the test transaction; do it by hand
+    profile_cache.versions._bump_now([f"user:{u.id}"])
+    assert profile_cache.summary_version(u.id) == v + 1
+    assert "16 Green Points" in c.get("/profile/").content.decode()
+
+    # the cached summary holds no Student/User fields: profile edits show at once
+    User.objects.filter(pk=u.pk).update(first_name="Renamed")
+    Student.objects.filter(user=u).update(department="Botany")
+    body = c.get("/profile/").content.decode()
+    assert "Renamed" in body and "Botany" in body and "16 Green Points" in body
+
+def test_api_conditional_get_and_projection(django_capture_on_commit_callbacks):
+    from django.test import Client
+    from . import versions
+    u = make_user("api@a.com", name="Api")
+    act = Activity.objects.create(title="Kiosk", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=3, registered_count=0, location="Gate")
+    register_user_for_event(u, ev)
+    PointLedger.objects.create(user=u, activity=act, points=2, source="manual", reference_id="api:1")
+    c = Client()
+    c.force_login(u)
+
+    r = c.get("/api/v1/events/")
+    assert r.status_code == 200
+    assert r.json()["results"][0]["title"] == "Kiosk" and r.json()["results"][0]["registered_count"] == 1
+    assert c.get("/api/v1/events/", HTTP_IF_NONE_MATCH=r["ETag"]).status_code == 304
+    versions._bump_now(["events"])
+    assert c.get("/api/v1/events/", HTTP_IF_NONE_MATCH=r["ETag"]).status_code == 200
+
+    assert c.get("/api/v1/leaderboard/").json()["results"] == [{"user_id": u.id, "name": "Api", "points": 2, "rank": 1}]
+    me = c.get("/api/v1/me/").json()
+    assert me["points"]["available"] == 2 and me["upcoming_registrations"][0]["status"] == "registered"
+    assert Client().get("/api/v1/me/").status_code == 403
+
+    # /me shows the rank and the balance: either one moving retires its ETag
+    etag = c.get("/api/v1/me/")["ETag"]
+    versions._bump_now(["leaderboard"])
+    r = c.get("/api/v1/me/", HTTP_IF_NONE_MATCH=etag)
+    assert r.status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        redeem_reward(u, Reward.objects.create(title="Badge", points_cost=1))
+    r = c.get("/api/v1/me/", HTTP_IF_NONE_MATCH=r["ETag"])
+    assert r.status_code == 200 and r.json()["points"]["available"] == 1
+
+def test_api_etag_is_per_drf_user_and_never_304s_anonymous():
+    import base64
+    from django.test import Client
+    def basic(email):
+        return {"HTTP_AUTHORIZATION": "Basic " + base64.b64encode(f"{email}:pass123".encode()).decode()}
+    make_user("b1@a.com"); make_user("b2@a.com")
+    c = Client()
+    r1 = c.get("/api/v1/me/", **basic("b1@a.com"))
+    r2 = c.get("/api/v1/me/", **basic("b2@a.com"))
+    assert r1.status_code == r2.status_code == 200
+    assert r1["ETag"] != r2["ETag"]
+    assert c.get("/api/v1/me/", HTTP_IF_NONE_MATCH=r1["ETag"], **basic("b1@a.com")).status_code == 304
+    assert c.get("/api/v1/me/", HTTP_IF_NONE_MATCH=r1["ETag"], **basic("b2@a.com")).status_code == 200
+    events = c.get("/api/v1/events/", **basic("b1@a.com"))
+    assert Client().get("/api/v1/events/", HTTP_IF_NONE_MATCH=events["ETag"]).status_code == 403
+    assert Client().get("/api/v1/me/", HTTP_IF_NONE_MATCH="*").status_code == 403
+
+def test_event_listing_keyset_and_calendar_window():
+    from django.test import Client
+    from . import event_listing
+    u = make_user("cal@a.com")
+    a2 = Activity.objects.create(title="Litter", tier=2, requires_proof=False)
+    a5 = Activity.objects.create(title="Garden", tier=5, requires_proof=False)
+    base = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+    for i in range(5):
+        EventSlot.objects.create(activity=a2 if i % 2 else a5, start_at=base + timezone.timedelta(days=i * 10),
+                                 end_at=base + timezone.timedelta(days=i * 10, hours=1), max_participants=1,
+                                 location="North" if i < 3 else "South")
+    EventSlot.objects.filter(start_at=base).update(registered_count=1)  # full
+
+    rows, cur = event_listing.active_page(limit=2)
+    rows2, cur2 = event_listing.active_page(limit=2, after=cur)
+    assert len(rows) == 2 and len(rows2) == 2 and cur2 is None
+    assert {r["id"] for r in rows}.isdisjoint(r["id"] for r in rows2)
+    assert len(event_listing.active_page(include_full=True)[0]) == 5
+    assert [r["activity__tier"] for r in event_listing.active_page(tier=2)[0]] == [2, 2]
+    assert len(event_listing.active_page(location="South", include_full=True)[0]) == 2
+    week = event_listing.active_page(mode="week", anchor=timezone.localtime(base).date(), include_full=True)[0]
+    assert len(week) == 1
+
+    c = Client(); c.force_login(u)
+    day = timezone.localtime(base + timezone.timedelta(days=20)).date().isoformat()
+    r = c.get("/events/", {"view": "month", "date": day, "tier": "5"})
+    assert r.status_code == 200 and "Garden" in r.content.decode()
+
+def test_recurring_schedule_preview_and_bulk_create(settings):
+    from datetime import date, time, timedelta
+    from django.test import Client
+    from . import recurrence
+    settings.CAMPUS_HOLIDAYS = ["2031-09-09"]
+    spans = recurrence.expand(date(2031, 9, 1), date(2031, 9, 30), [1, 3], time(16, 0),
+                              timedelta(minutes=90), skip=recurrence.holidays())
+    assert len(spans) == 8 and all(e - s == timedelta(minutes=90) for s, e in spans)  # 9 Tue/Thu, minus the holiday
+    with pytest.raises(ValueError, match="holidays"):  # a one-off on a holiday
+        recurrence.expand(date(2031, 9, 9), date(2031, 9, 9), [], time(16, 0), timedelta(hours=1),
+                          skip=recurrence.holidays())
+    with pytest.raises(ValueError, match="more than"):
+        recurrence.expand(date(2031, 9, 1), date(9999, 12, 31), range(7), time(16, 0), timedelta(hours=1))
+
+    other = Activity.objects.create(title="Existing", tier=2, requires_proof=False)
+    EventSlot.objects.create(activity=other, start_at=spans[2][0] + timedelta(minutes=30),
+                             end_at=spans[2][1] + timedelta(hours=1), max_participants=5, location="Quad")
+    assert [c[0] for c in recurrence.conflicts("Quad", spans)] == [spans[2]]
+    assert recurrence.conflicts("Lab", spans) == []
+
+    admin = make_user("adm@a.com", staff=True)
+    c = Client(); c.force_login(admin)
+    form = {"title": "Weekly cleanup", "description": "x", "slots": "10", "tier": "5", "location": "Lab",
+            "date": "2031-09-01", "time": "16:00", "duration": "90", "until": "2031-09-30",
+            "weekdays": ["1", "3"]}
+    r = c.post("/admins/activities/", {**form, "action": "preview"})
+    assert r.status_code == 200 and len(r.context["preview"]["spans"]) == 8
+    assert not Activity.objects.filter(title="Weekly cleanup").exists()
+    c.post("/admins/activities/", {**form, "action": "confirm"})
+    act = Activity.objects.get(title="Weekly cleanup")
+    assert act.slots.count() == 8 and act.slots.filter(location="Lab", max_participants=10).count() == 8
+
+def test_admin_activity_listing_aggregates_in_sql():
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    admin = make_user("lst@a.com", staff=True)
+    student = make_user("lst-s@a.com").student
+    now = timezone.now()
+    for i in range(25):
+        act = Activity.objects.create(title=f"Act {i:02d}", tier=2, requires_proof=False)
+        for _ in range(2):
+            EventSlot.objects.create(activity=act, start_at=now, end_at=now + timezone.timedelta(hours=1),
+                                     max_participants=4, registered_count=i % 5, location="Q")
+    busy = Activity.objects.get(title="Act 04")
+    Submission.objects.create(student=student, activity=busy, status="pending")
+
+    c = Client(); c.force_login(admin)
+    with CaptureQueriesContext(connection) as ctx:
+        r = c.get("/admins/activities/", {"sort": "fill"})
+    page = r.context["activities"]
+    assert page.paginator.count == 25 and len(page) == 20
+    top = page[0]
+    assert top["fill_rate"] == 100.0 and top["slot_count"] == 2 and top["capacity"] == 8
+    assert len(ctx.captured_queries) < 10
+    row = c.get("/admins/activities/", {"q": "Act 04"}).context["activities"][0]
+    assert row["pending"] == 1 and row["registered"] == 8
+
+def test_import_students_dedupes_and_bulk_creates(tmp_path):
+    import io
+    from django.contrib.auth import authenticate
+    from django.core.management import call_command
+    from .onboarding import import_students, iter_rows
+    make_user("taken@a.com")
+    csv_text = (
+        "name,email,pnr,phone,department,semester,password\n"
+        "Ann,Ann@Uni.edu,P1,1,CSE,1,pw-ann-1\n"
+        "Bob,bob@uni.edu,P2,1,CSE,1,\n"
+        "Dup,ann@uni.edu,P3,1,CSE,1,x\n"       # same email as line 2
+        "Old,TAKEN@a.com,P4,1,CSE,1,x\n"       # already registered
+        "Bad,not-an-email,P5,1,CSE,1,x\n"
+        "Cy,cy@uni.edu,P6,1,ME,3,pw-cy\n"
+        "Long,long@uni.edu,P7,1234567890123456,CSE,123456,x\n"  # phone > 15, semester > 5
+    )
+    report = import_students(iter_rows(io.StringIO(csv_text)), batch_size=2, workers=1)
+    assert (report["created"], report["duplicate"], report["existing"], report["invalid"]) == (3, 1, 1, 2)
+    assert (8, "too long: phone (max 15), semester (max 5)") in report["errors"]
+    assert Student.objects.get(pnr="P6").user.email == "cy@uni.edu"
+    assert authenticate(username="ann@uni.edu", password="pw-ann-1") is not None
+    assert not User.objects.get(email="bob@uni.edu").has_usable_password()
+
+    path = tmp_path / "again.csv"
+    path.write_text(csv_text)
+    out = io.StringIO()
+    call_command("import_students", str(path), "--workers", "2", stdout=out)
+    assert "0 student(s) created" in out.getvalue()
+
+def test_email_login_is_case_insensitive_and_indexed():
+    from django.contrib.auth import authenticate
+    from django.db import IntegrityError, connection, transaction
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    u = make_user("Mixed.Case@Uni.edu")
+    User.objects.filter(pk=u.pk).update(email="mixed.case@uni.edu")
+    with CaptureQueriesContext(connection) as ctx:
+        assert authenticate(None, email="  MIXED.case@uni.EDU ", password="pass123") == u
+    assert len(ctx.captured_queries) == 1 and "LOWER" in ctx.captured_queries[0]["sql"]
+    assert authenticate(None, email="mixed.case@uni.edu", password="nope") is None
+    with pytest.raises(IntegrityError), transaction.atomic():
+        User.objects.create(username="other", email="MIXED.CASE@uni.edu")
+    User.objects.create(username="blank1", email=""); User.objects.create(username="blank2", email="")
+
+    r = Client().post("/login/", {"email": "Mixed.Case@uni.edu", "password": "pass123"})
+    assert r.status_code == 302
+
+def test_badges_full_pass_and_incremental(django_capture_on_commit_callbacks):
+    from . import badges
+    from .models import BadgeThreshold, StudentBadge
+    gold = BadgeThreshold.objects.create(code="gold", name="Gold", percent_of_potential=80)
+    BadgeThreshold.objects.create(code="bronze", name="Bronze", percent_of_potential=20)
+    BadgeThreshold.objects.create(code="off", name="Off", percent_of_potential=0, active=False)
+    a, b = make_user("bd-a@a.com"), make_user("bd-b@a.com")
+    act = Activity.objects.create(title="Plant", tier=5, requires_proof=False)
+    past = timezone.now() - timezone.timedelta(days=1)
+    for _ in range(2):  # potential: 2 slots x 5 = 10 each
+        EventSlot.objects.create(activity=act, start_at=past, end_at=past + timezone.timedelta(hours=1),
+                                 max_participants=5, location="Q")
+    User.objects.filter(pk__in=[a.pk, b.pk]).update(date_joined=past - timezone.timedelta(days=1))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        PointLedger.objects.create(user=a, activity=act, points=8, source="manual", reference_id="bd:1")
+    assert set(StudentBadge.objects.filter(user=a).values_list("threshold__code", flat=True)) == {"gold", "bronze"}
+    assert not StudentBadge.objects.filter(user=b).exists()  # not touched by a's ledger row
+
+    PointLedger.objects.bulk_create([PointLedger(user=b, activity=act, points=3, source="manual", reference_id="bd:2")])
+    from .models import _bump_balance
+    _bump_balance(b.id, earned=3)
+    assert badges.evaluate() == 1  # full pass: b reaches bronze; a's awards aren't duplicated
+    assert StudentBadge.objects.get(user=b).threshold.code == "bronze"
+    assert StudentBadge.objects.filter(threshold=gold).count() == 1
+
+def test_monthly_cap_reserve_release_commit():
+    from .models import MonthlyCapCounter, bulk_verify_submissions, reject_submission, submit_evidence
+    u = make_user("cap@a.com")
+    verifier = make_user("capv@a.com", staff=True)
+    act = Activity.objects.create(title="Capped", tier=2, requires_proof=False, monthly_cap_per_student=2)
+    s1 = submit_evidence(Submission(student=u.student, activity=act))
+    s2 = submit_evidence(Submission(student=u.student, activity=act))
+    with pytest.raises(ValueError):
+        submit_evidence(Submission(student=u.student, activity=act))
+    assert Submission.objects.filter(student=u.student).count() == 2
+
+    reject_submission(s1, verifier)
+    s3 = submit_evidence(Submission(student=u.student, activity=act))  # released slot is reusable
+    approve_submission(s2, verifier)
+    assert bulk_verify_submissions([s3.id], verifier, "approve") == {s3.id: "approved"}
+    c = MonthlyCapCounter.objects.get(user=u, activity=act)
+    assert (c.reserved, c.committed, s3.cap_period) == (0, 2, c.month)
+    with pytest.raises(ValueError):
+        submit_evidence(Submission(student=u.student, activity=act))
+
+def test_redeem_reserves_stock_before_spending():
+    u, poor = make_user("rs@a.com"), make_user("rs-poor@a.com")
+    act = Activity.objects.create(title="Seed", tier=2, requires_proof=False)
+    PointLedger.objects.create(user=u, activity=act, points=10, source="manual", reference_id="rs:1")
+    reward = Reward.objects.create(title="Tote", points_cost=6, stock=2)
+
+    with pytest.raises(ValueError, match="Insufficient"):
+        redeem_reward(poor, reward)
+    reward.refresh_from_db()
+    assert reward.stock == 2  # reservation rolled back with the failed spend
+
+    redeem_reward(u, reward)
+    with pytest.raises(ValueError, match="Insufficient"):
+        redeem_reward(u, reward)  # 4 left, costs 6
+    stale = Reward.objects.get(pk=reward.pk)
+    Reward.objects.filter(pk=reward.pk).update(stock=0)
+    with pytest.raises(ValueError, match="out of stock"):
+        redeem_reward(u, stale)  # stale in-memory stock doesn't matter
+    assert PointBalance.objects.get(user=u).available == 4 and Redemption.objects.filter(reward=reward).count() == 1
+
+    newcomer = make_user("rs-new@a.com")  # no PointBalance row yet
+    assert redeem_reward(newcomer, Reward.objects.create(title="Sticker", points_cost=0)).status == "pending"
+    with pytest.raises(ValueError, match="Insufficient"):
+        redeem_reward(make_user("rs-new2@a.com"), Reward.objects.create(title="Bag", points_cost=1))
+
+def test_admin_cancel_refunds_points_and_stock():
+    from django.test import Client
+    u = make_user("rc@a.com")
+    boss = User.objects.create_superuser("rc-admin", "rc-admin@a.com", "pass123")
+    act = Activity.objects.create(title="Seed", tier=2, requires_proof=False)
+    PointLedger.objects.create(user=u, activity=act, points=10, source="manual", reference_id="rc:1")
+    reward = Reward.objects.create(title="Cap", points_cost=6, stock=1)
+    red = redeem_reward(u, reward)
+    c = Client(); c.force_login(boss)
+    form = {"user": u.pk, "reward": reward.pk, "status": "canceled", "fulfilled_by": "",
+            "fulfilled_at_0": "", "fulfilled_at_1": ""}
+    assert c.post(f"/admin/app/redemption/{red.pk}/change/", form).status_code == 302
+    c.post(f"/admin/app/redemption/{red.pk}/change/", {**form, "status": "pending"})  # status is read-only now
+    red.refresh_from_db(); reward.refresh_from_db()
+    assert red.status == "canceled" and reward.stock == 1
+    bal = PointBalance.objects.get(user=u)
+    assert (bal.earned, bal.spent, bal.available) == (10, 0, 10)
+    assert rebuild_point_balances(apply=False) == []
+
+    other = redeem_reward(u, reward)
+    c.post(f"/admin/app/redemption/{other.pk}/delete/", {"post": "yes"})
+    assert PointBalance.objects.get(user=u).available == 10 and rebuild_point_balances(apply=False) == []
+
+def test_admin_ledger_is_append_only():
+    from django.test import Client
+    u = make_user("la@a.com")
+    boss = User.objects.create_superuser("la-admin", "la-admin@a.com", "pass123")
+    act = Activity.objects.create(title="Seed", tier=2, requires_proof=False)
+    row = PointLedger.objects.create(user=u, activity=act, points=10, source="manual", reference_id="la:1")
+    c = Client(); c.force_login(boss)
+    c.post(f"/admin/app/pointledger/{row.pk}/change/", {"user": u.pk, "activity": act.pk, "points": 99,
+                                                        "source": "manual", "reference_id": "la:1"})
+    c.post(f"/admin/app/pointledger/{row.pk}/delete/", {"post": "yes"})
+    row.refresh_from_db()
+    assert row.points == 10 and PointBalance.objects.get(user=u).earned == 10
+
+def test_async_read_views_render_without_sync_queries():
+    # Async views run on an event loop here too; any lazy DB access during
+    # rendering would raise SynchronousOnlyOperation.
+    from django.test import Client
+    staff = User.objects.create_user(username="root", email="root@a.com", password="x", is_staff=True)
+    u = make_user("as@a.com", name="Asy")
+    act = Activity.objects.create(title="Async", tier=5, requires_proof=False)
+    Submission.objects.create(student=u.student, activity=act)  # shows in the staff nav badge
+    PointLedger.objects.create(user=u, activity=act, points=5, source="manual", reference_id="as:1")
+    for who in (staff, u):
+        c = Client(); c.force_login(who)
+        for path in ("/events/", "/leaderboard/data/", "/profile/"):
+            assert c.get(path).status_code == 200, (who, path)
+    c = Client(); c.force_login(u)
+    body = c.get("/leaderboard/data/").content.decode()
+    assert "Asy" in body
+    assert c.get("/leaderboard/data/").context["me"]["rank"] == 1
+
+def test_live_hub_coalesces_changes_into_one_query():
+    import asyncio
+    from asgiref.sync import async_to_sync, sync_to_async
+    from .live import Hub
+    u1, u2 = make_user("l1@a.com"), make_user("l2@a.com")
+    act = Activity.objects.create(title="Live", tier=1, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=1, registered_count=0, location="Hall")
+
+    async def scenario():
+        hub = Hub(coalesce=0.05, poll=60)
+        watchers = [hub.subscribe([ev.pk]) for _ in range(3)]
+        await sync_to_async(register_user_for_event)(u1, ev)
+        await sync_to_async(register_user_for_event)(u2, ev)
+        hub.notify([ev.pk]); hub.notify([ev.pk])  # a burst: both land in one flush
+        got = [await asyncio.wait_for(q.get(), 2) for q in watchers]
+        flushes = hub.flushes
+        for q in watchers:
+            hub.unsubscribe(q)
+        return got, flushes
+
+    got, flushes = async_to_sync(scenario)()
+    assert flushes == 1
+    assert all(row == {"id": ev.pk, "registered_count": 1, "max_participants": 1,
+                       "waitlisted_count": 1, "full": True} for row in got)
+
+def test_archive_ledger_keeps_totals_and_idempotency(settings):
+    from datetime import timedelta
+    from django.db.models import Sum
+    from .models import PointLedgerArchive
+    from . import archival, profile_cache
+    settings.LEDGER_ARCHIVE_AFTER_DAYS = 30
+    u = make_user("ar@a.com")
+    staff = User.objects.create_user(username="arv", email="arv@a.com", password="x", is_staff=True)
+    act = Activity.objects.create(title="Old", tier=3, requires_proof=False)
+    old = timezone.now() - timedelta(days=120)
+    subs = [Submission.objects.create(student=u.student, activity=act) for _ in range(3)]
+    for s in subs:
+        approve_submission(s, staff)
+    PointLedger.objects.create(user=u, activity=act, points=2, source="manual", reference_id="m:1")
+    PointLedger.objects.exclude(reference_id="m:1").update(created_at=old)
+    before = PointLedger.objects.filter(user=u).aggregate(s=Sum("points"))["s"]
+
+    report = archival.archive()
+    assert (report["rows"], report["summaries"]) == (3, 1)
+    assert PointLedger.objects.filter(user=u).count() == 2  # one summary + the recent manual row
+    assert PointLedger.objects.filter(user=u).aggregate(s=Sum("points"))["s"] == before == total_points(u)
+    summary = PointLedger.objects.get(source="summary")
+    assert summary.points == 9 and summary.created_at == archival.cutoff(days=0, now=old)
+    assert PointLedgerArchive.objects.filter(summary_ref=summary.reference_id).count() == 3
+    assert list(profile_cache.completed_activities(u)) == []  # summaries only feed the totals
+
+    # an archived submission is still credited exactly once
+    Submission.objects.filter(pk=subs[0].pk).update(status="rejected")
+    approve_submission(Submission.objects.get(pk=subs[0].pk), staff)
+    assert total_points(u) == before
+    assert archival.archive()["rows"] == 0
+
+    # a manual reference stays unique once its row is archived
+    from django.core.exceptions import ValidationError
+    from django.db import IntegrityError
+    archived_manual = PointLedger(user=u, activity=act, points=1, source="manual", reference_id="m:1")
+    PointLedger.objects.filter(reference_id="m:1").update(created_at=old)
+    assert archival.archive()["rows"] == 1
+    with pytest.raises(ValidationError):
+        archived_manual.full_clean()
+    with pytest.raises(IntegrityError):
+        archived_manual.save()
+    PointLedger.objects.filter(source="manual").update(created_at=old)
+    assert archival.archive()["rows"] == 0  # nothing slipped in to collide on the next run
+
+def test_metrics_middleware_counts_queries_per_view(caplog, settings):
+    from django.test import Client
+    from . import metrics
+    settings.METRICS_SLOW_REQUEST_MS = 0
+    settings.METRICS_SLOW_LOG_SAMPLE = 1.0
+    metrics.reset()
+    u = make_user("me@a.com")
+    c = Client(); c.force_login(u)
+    with caplog.at_level("WARNING", logger="app.metrics"):
+        assert c.get("/profile/").status_code == 200
+    assert "slow request GET /profile/ (profile)" in caplog.text and "SELECT" in caplog.text
+
+    queries = metrics._series["ecocampus_sql_queries", "profile"]
+    assert queries.count == 1 and queries.sum > 0  # async view: its ORM calls still counted
+    assert Client().get("/metrics/").status_code == 403  # nobody is allowed by address by default
+    settings.METRICS_ALLOWED_IPS = ["127.0.0.1"]
+    body = Client().get("/metrics/").content.decode()  # the test client's address
+    assert 'ecocampus_requests_total{view="profile",status="2xx"} 1' in body
+    assert 'ecocampus_request_seconds_bucket{view="profile",le="+Inf"} 1' in body
+    assert f'ecocampus_sql_queries_sum{{view="profile"}} {queries.sum}' in body
+
+def test_synthetic_seed_and_benchmark_comparison():
+    from django.db.models import Sum
+    from . import synthetic
+    from .bench import compare
+    report = synthetic.seed(students=20, activities=4, slots=5, ledger_rows=700, months=3)
+    assert PointLedger.objects.count() == 700
+    assert PointLedger.objects.dates("created_at", "month").count() >= 3  # spread over the history
+    assert (PointBalance.objects.aggregate(s=Sum("earned"))["s"]
+            == PointLedger.objects.aggregate(s=Sum("points"))["s"])
+    assert set(report["timings"]) == {"students", "catalog", "ledger", "derived"}
+    assert synthetic.clear() == 20 and not PointLedger.objects.exists()
+
+    base = {"100": {"ops": {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 0.1}}}}
+    cur = {"100": {"ops": {"a": {"p50_ms": 14.0}, "b": {"p50_ms": 0.3}, "new": {"p50_ms": 1.0}}}}
+    rows = {r["op"]: r for r in compare(base, cur, threshold=0.25, min_ms=0.5)}
+    assert rows["a"]["regressed"] and not rows["b"]["regressed"]  # b tripled, but by 0.2 ms
+    assert "new" not in rows
+
+def test_evidence_upload_cap_does_not_apply_to_other_uploads(settings):
+    from django.test import Client
+    settings.EVIDENCE_MAX_UPLOAD_BYTES = 100
+    staff = User.objects.create_user(username="reg", email="reg@a.com", password="x", is_staff=True)
+    rows = "".join(f"Name {i},big{i}@a.com,BIG{i},555000{i},CSE,3,\n" for i in range(3))
+    csv_file = SimpleUploadedFile("s.csv", ("name,email,pnr,phone,department,semester,password\n" + rows).encode())
+    c = Client(enforce_csrf_checks=True)
+    c.force_login(staff)
+    assert c.post("/submissions/new/", {}).status_code == 403  # CSRF still enforced on the evidence view
+    c = Client(); c.force_login(staff)
+    from . import onboarding
+    with mock.patch.object(onboarding, "ProcessPoolExecutor", side_effect=AssertionError("no pool in a web worker")):
+        c.post("/admins/students/import/", {"csv_file": csv_file})
+    assert Student.objects.filter(pnr__startswith="BIG").count() == 3
+
+    rows = "".join(f"Name {i},pw{i}@a.com,PW{i},555000{i},CSE,3,secret{i}\n" for i in range(onboarding.WEB_MAX_PASSWORDS + 1))
+    csv_file = SimpleUploadedFile("s.csv", ("name,email,pnr,phone,department,semester,password\n" + rows).encode())
+    r = c.post("/admins/students/import/", {"csv_file": csv_file}, follow=True)
+    assert "manage.py import_students" in str(list(r.context["messages"])[-1])
+    assert not Student.objects.filter(pnr__startswith="PW").exists()  # too many hashes for one request
+
+def test_slow_group_commit_leader_is_reported_not_a_500(monkeypatch):
+    from django.test import Client
+    from . import batching
+    u = make_user("slow@a.com")
+    act = Activity.objects.create(title="Slow", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=5, registered_count=0, location="Hall")
+    b = batching.RegistrationBatcher(timeout=0.01)
+    b._leading.add(ev.pk)  # someone else is leading and never gets to us
+    with pytest.raises(batching.StillProcessing):
+        b.submit(u, ev)
+
+    monkeypatch.setattr(batching, "register", b.submit)
+    c = Client(); c.force_login(u)
+    r = c.post("/events/register/", {"event_id": ev.pk}, follow=True)
+    assert r.status_code == 200
+    assert "Still processing your registration" in r.content.decode()
+
+def test_group_commit_constraint_error_falls_back_to_single_sign_ups(monkeypatch):
+    from django.db import IntegrityError
+    from . import batching
+    u, again = make_user("gc1@a.com"), make_user("gc2@a.com")
+    act = Activity.objects.create(title="Batch", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=5, registered_count=0, location="Hall")
+    register_user_for_event(again, ev)
+    def flush_fails(event, users):
+        raise IntegrityError("UNIQUE constraint failed: app_registration.event_id, app_registration.user_id")
+    monkeypatch.setattr(batching, "register_users_for_event", flush_fails)
+    b = batching.RegistrationBatcher(window=0)
+    assert b.submit(u, ev).status == "registered"
+    with pytest.raises(ValueError, match="Already registered"):
+        b.submit(again, ev)
+
+def test_reapproving_a_rejected_capped_submission_respects_the_cap():
+    from .models import MonthlyCapCounter, bulk_verify_submissions, reject_submission, submit_evidence
+    u = make_user("recap@a.com")
+    verifier = make_user("recapv@a.com", staff=True)
+    act = Activity.objects.create(title="Capped1", tier=2, requires_proof=False, monthly_cap_per_student=1)
+    s1 = submit_evidence(Submission(student=u.student, activity=act))
+    reject_submission(s1, verifier)
+    s2 = submit_evidence(Submission(student=u.student, activity=act))  # took the released slot
+    approve_submission(s2, verifier)
+
+    with pytest.raises(ValueError, match="cap"):
+        approve_submission(Submission.objects.get(pk=s1.pk), verifier)
+    assert bulk_verify_submissions([s1.id], verifier, "approve") == {s1.id: "cap_reached"}
+    c = MonthlyCapCounter.objects.get(user=u, activity=act)
+    assert (c.reserved, c.committed) == (0, 1)
+
+    # un-approving frees the slot again, and then the old one fits
+    reject_submission(Submission.objects.get(pk=s2.pk), verifier)
+    assert bulk_verify_submissions([s1.id], verifier, "approve") == {s1.id: "approved"}
+    c.refresh_from_db()
+    assert (c.reserved, c.committed) == (0, 1)
+
+def _sse_frames(raw):
+    """Parse 'event: x\\ndata: {...}\\n\\n' chunks into [(event, data)]."""
+    import json
+    frames = []
+    for block in raw.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "data" in fields:
+            frames.append((fields.get("event"), json.loads(fields["data"])))
+    return frames
+
+def test_event_stream_sends_snapshot_then_pushes_committed_registrations():
+    import asyncio
+    from asgiref.sync import async_to_sync, sync_to_async
+    from django.test import AsyncClient, TestCase
+    from . import live
+    u, other = make_user("sse@a.com"), make_user("sse2@a.com")
+    act = Activity.objects.create(title="Stream", tier=2, requires_proof=False)
+    ev = EventSlot.objects.create(activity=act, start_at=timezone.now(), end_at=timezone.now()+timezone.timedelta(hours=1),
+                                  max_participants=2, registered_count=0, location="Hall")
+
+    def commit(fn, *args):
+        with TestCase.captureOnCommitCallbacks(execute=True):  # the test transaction never commits
+            return fn(*args)
+
+    async def scenario():
+        c = AsyncClient()
+        await c.aforce_login(u)
+        r = await c.get(f"/events/stream/?ids={ev.pk}")
+        assert r.status_code == 200 and r["Content-Type"].startswith("text/event-stream")
+        body = aiter(r.streaming_content)
+        first = (await anext(body)).decode() + (await anext(body)).decode()
+        assert first.startswith("retry:")
+        assert _sse_frames(first) == [("capacity", {"id": ev.pk, "registered_count": 0, "max_participants": 2,
+                                                    "waitlisted_count": 0, "full": False})]
+        assert live.hub._subs  # subscribed while the stream is open
+
+        reg = await sync_to_async(commit)(register_user_for_event, other, ev)
+        pushed = (await asyncio.wait_for(anext(body), 5)).decode()
+        assert _sse_frames(pushed) == [("capacity", {"id": ev.pk, "registered_count": 1, "max_participants": 2,
+                                                     "waitlisted_count": 0, "full": False})]
+        await sync_to_async(commit)(cancel_registration, reg)
+        pushed = (await asyncio.wait_for(anext(body), 5)).decode()
+        assert _sse_frames(pushed)[0][1]["registered_count"] == 0
+        # client goes away: Django's ASGI handler cancels the task reading the stream
+        reading = asyncio.ensure_future(anext(body))
+        await asyncio.sleep(0.05)
+        reading.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reading
+        return dict(live.hub._subs), live.hub._ticker
+
+    subs, ticker = async_to_sync(scenario)()
+    assert subs == {} and ticker is None  # unsubscribed, version poller stopped
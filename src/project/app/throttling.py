@@ -1,33 +1,82 @@
 # app/throttling.py
 import time
+from functools import wraps
+
 from django.core.cache import cache
 from django.http import HttpResponse
 
-def simple_rate_limit(key_prefix: str, limit: int, window_sec: int):
+# Finished windows never change again, so each process remembers the last
+# one it read per bucket instead of fetching it on every request.
+_closed_windows = {}
+_CLOSED_WINDOWS_MAX = 10000
+
+def client_key(request, key: str = "ip") -> str:
     """
-    Very small IP-based rate limiter.
-    Returns HTTP 429 when more than `limit` requests occur within `window_sec`.
+    Identify the caller for rate limiting.
+    key="ip" | "user" | "user+ip"; anonymous users always fall back to IP.
     """
-    def deco(view):
-        def _wrapped(request, *args, **kwargs):
-            ip = request.META.get("REMOTE_ADDR", "unknown")
-            key = f"rl:{key_prefix}:{ip}"
-            now = int(time.monotonic())  # monotonic clock is safer for buckets
+    ip = request.META.get("REMOTE_ADDR", "unknown")
+    user = getattr(request, "user", None)
+    if key in ("user", "user+ip") and user is not None and user.is_authenticated:
+        return f"u{user.pk}:{ip}" if key == "user+ip" else f"u{user.pk}"
+    return ip
 
-            bucket = cache.get(key)
-            if not bucket:
-                bucket = {"start": now, "count": 0}
+def hit(bucket: str, limit: int, window_sec: int, now: float = None):
+    """
+    Count one request against `bucket` using a sliding-window counter.
 
-            # reset window
-            if now - bucket["start"] >= window_sec:
-                bucket = {"start": now, "count": 0}
+    The current fixed window is bumped with an atomic cache incr (add on first
+    use). The previous window's count is weighted by how much of it still
+    overlaps the sliding window. Returns (allowed, remaining, reset_after_sec).
+    """
+    now = time.time() if now is None else now  # wall clock: shared across processes
+    idx = int(now // window_sec)
+    cur_key = f"{bucket}:{idx}"
+    try:
+        count = cache.incr(cur_key)
+    except ValueError:
+        if cache.add(cur_key, 1, window_sec * 2):
+            count = 1
+        else:
+            count = cache.incr(cur_key)
 
-            bucket["count"] += 1
-            cache.set(key, bucket, window_sec)
+    memo = _closed_windows.get(bucket)
+    if memo and memo[0] == idx - 1:
+        prev = memo[1]
+    else:
+        prev = cache.get(f"{bucket}:{idx - 1}", 0)
+        if len(_closed_windows) >= _CLOSED_WINDOWS_MAX:
+            _closed_windows.clear()
+        _closed_windows[bucket] = (idx - 1, prev)
 
-            if bucket["count"] > limit:
-                return HttpResponse("Rate limit exceeded. Try again shortly.", status=429)
+    elapsed = now - idx * window_sec
+    estimate = prev * (window_sec - elapsed) / window_sec + count
+    remaining = max(0, int(limit - estimate))
+    return estimate <= limit, remaining, int(window_sec - elapsed) + 1
 
-            return view(request, *args, **kwargs)
+def rate_limit(key_prefix: str, limit: int, window_sec: int, key: str = "ip"):
+    """
+    Return HTTP 429 when a caller exceeds `limit` requests per sliding `window_sec`.
+    `key` picks the caller identity (see client_key). Every response carries
+    X-RateLimit-* headers.
+    """
+    def deco(view):
+        @wraps(view)
+        def _wrapped(request, *args, **kwargs):
+            bucket = f"rl:{key_prefix}:{client_key(request, key)}"
+            allowed, remaining, reset = hit(bucket, limit, window_sec)
+            if allowed:
+                response = view(request, *args, **kwargs)
+            else:
+                response = HttpResponse("Rate limit exceeded. Try again shortly.", status=429)
+                response["Retry-After"] = str(reset)
+            response["X-RateLimit-Limit"] = str(limit)
+            response["X-RateLimit-Remaining"] = str(remaining)
+            response["X-RateLimit-Reset"] = str(reset)
+            return response
         return _wrapped
     return deco
+
+def simple_rate_limit(key_prefix: str, limit: int, window_sec: int):
+    """Per-IP limit; kept for existing callers."""
+    return rate_limit(key_prefix, limit, window_sec, key="ip")
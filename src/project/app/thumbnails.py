@@ -0,0 +1,55 @@
+# app/thumbnails.py
+"""
+Downscaled previews of evidence images, generated off the request path.
+
+enqueue() hands work to a small in-process thread pool after the upload
+commits; `manage.py process_thumbnails` sweeps anything still pending (e.g.
+after a restart) and can be run from cron instead.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from .models import EvidenceBlob
+
+log = logging.getLogger(__name__)
+
+THUMB_SIZE = (480, 480)
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbs")
+
+def make_thumbnail(blob_id) -> str:
+    """Render one blob's thumbnail; returns the resulting thumb_status."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    blob = EvidenceBlob.objects.get(pk=blob_id)
+    if blob.thumb_status != "pending":
+        return blob.thumb_status
+    try:
+        with blob.file.open("rb") as fh, Image.open(fh) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(THUMB_SIZE)
+            out = io.BytesIO()
+            img.convert("RGB").save(out, "JPEG", quality=80, optimize=True)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        # a bomb or a corrupt image will never render; don't leave it pending for every sweep
+        status = "skipped" if not blob.content_type.startswith("image/") else "failed"
+        EvidenceBlob.objects.filter(pk=blob.pk).update(thumb_status=status)
+        return status
+    blob.thumbnail.save(f"{blob.sha256}.jpg", ContentFile(out.getvalue()), save=False)
+    EvidenceBlob.objects.filter(pk=blob.pk).update(thumbnail=blob.thumbnail.name, thumb_status="done")
+    return "done"
+
+def _run(blob_id):
+    close_old_connections()
+    try:
+        make_thumbnail(blob_id)
+    except Exception:
+        log.exception("thumbnail failed for blob %s", blob_id)
+    finally:
+        close_old_connections()
+
+def enqueue(blob_id):
+    _pool.submit(_run, blob_id)
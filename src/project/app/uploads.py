@@ -0,0 +1,87 @@
+# app/uploads.py
+"""
+Evidence uploads: hash while streaming, store each distinct file once.
+
+HashingUploadHandler is installed by the evidence view only (see
+use_hashing_handler). It spools the upload to a temp file chunk by chunk,
+feeding the same chunks to sha256. Files over EVIDENCE_MAX_UPLOAD_BYTES are dropped before they hit
+the disk. store_evidence() then moves the temp file into storage under its
+hash, or reuses the existing blob. Thumbnails are made later by
+app.thumbnails, never inside the request.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+
+from .models import EvidenceBlob
+
+def max_upload_bytes():
+    return getattr(settings, "EVIDENCE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._sha = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._size += len(raw_data)
+        if self._size > max_upload_bytes():
+            if self.request is not None:
+                self.request.upload_too_large = True
+            self.file.close()
+            raise SkipFile()
+        self._sha.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        f.sha256 = self._sha.hexdigest()
+        return f
+
+def use_hashing_handler(request):
+    """
+    Put HashingUploadHandler in front for this request. Must run before
+    request.POST/FILES is read, so the view has to be csrf_exempt with the
+    CSRF check applied inside (csrf_protect) once the handler is in place.
+    """
+    request.upload_handlers.insert(0, HashingUploadHandler(request))
+
+def _hash_of(uploaded):
+    sha = getattr(uploaded, "sha256", None)
+    if sha:
+        return sha
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    uploaded.seek(0)
+    return digest.hexdigest()
+
+def store_evidence(uploaded, written=None) -> EvidenceBlob:
+    """
+    Return the EvidenceBlob for this upload, saving the bytes only if new.
+    The name of a newly written file is appended to `written`, so a caller
+    whose transaction rolls back can delete it (see submit_evidence).
+    """
+    sha = _hash_of(uploaded)
+    blob = EvidenceBlob.objects.filter(sha256=sha).first()
+    if blob:
+        return blob
+    ext = os.path.splitext(uploaded.name)[1].lower()[:10]
+    blob = EvidenceBlob(sha256=sha, size=uploaded.size,
+                        content_type=getattr(uploaded, "content_type", "") or "")
+    blob.file.save(f"{sha[:2]}/{sha}{ext}", uploaded, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:  # same bytes uploaded concurrently
+        blob.file.delete(save=False)
+        return EvidenceBlob.objects.get(sha256=sha)
+    if written is not None:
+        written.append(blob.file.name)
+    from . import thumbnails
+    transaction.on_commit(lambda: thumbnails.enqueue(blob.pk))
+    return blob
@@ -17,28 +17,42 @@ urlpatterns = [
 from django.urls import path
 from . import views  # your existing
 from . import views_extra as vx  # the server handlers we already added
+from . import api
+from .metrics import metrics_view
 
 urlpatterns += [
     # Admin Activities (HTML form posts)
     path('admins/activities/', vx.activities_admin, name='activities_admin'),
     path('admins/activities/delete/', vx.delete_activity, name='activities_delete'),
+    path('admins/students/import/', vx.import_students_view, name='import_students'),
 
     # Events HTML flows
     path('events/active/', vx.active_events, name='events_active'),
+    path('events/stream/', vx.event_stream, name='event_stream'),
     path('events/register/', vx.register_event, name='register_event'),
     path('events/cancel/', vx.cancel_event_registration, name='cancel_event'),
 
     # Submissions & Rewards via HTML forms
     path('submissions/new/', vx.create_submission, name='create_submission'),
+    path('evidence/<path:name>', vx.evidence_file, name='evidence_file'),
     path('verify/queue/', vx.verify_queue, name='verify_queue'),
     path('verify/<int:pk>/approve/', vx.approve_submission_view, name='approve_submission'),
     path('verify/<int:pk>/reject/', vx.reject_submission_view, name='reject_submission'),
+    path('verify/bulk/', vx.bulk_verify_view, name='bulk_verify'),
     path('rewards/', vx.rewards_list, name='rewards_list'),
     path('rewards/redeem/', vx.redeem, name='redeem'),
 
     # Leaderboard
     path('leaderboard/data/', vx.leaderboard, name='leaderboard_data'),
 
+    # JSON API (read-only, conditional GET)
+    path('api/v1/events/', api.events, name='api_events'),
+    path('api/v1/leaderboard/', api.leaderboard, name='api_leaderboard'),
+    path('api/v1/me/', api.me, name='api_me'),
+
+    # Prometheus scrape target
+    path('metrics/', metrics_view, name='metrics'),
+
      path('events/', vx.active_events, name='event'),
      path('admins/', vx.activities_admin, name='admin')
 ]
@@ -0,0 +1,104 @@
+# app/verification.py
+"""
+Keyset-paginated verification queue with claim leases.
+
+Pages walk pending submissions in (created_at, id) order off the
+(status, created_at, id) index. Showing a page claims its rows for the
+viewer for CLAIM_LEASE with one conditional UPDATE; rows leased to someone
+else are skipped until the lease runs out. No row locks are held between
+requests.
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Submission
+
+CLAIM_LEASE = timedelta(minutes=10)
+PENDING_COUNT_TTL = 30  # seconds; nav badge can lag slightly
+
+FIELDS = ("id", "created_at", "evidence_url", "evidence_file", "comment",
+          "student__user__first_name", "student__user__email",
+          "activity_id", "activity__title", "activity__tier",
+          "event_slot_id", "event_slot__start_at", "event_slot__location",
+          "evidence_blob__file", "evidence_blob__thumbnail")
+
+def _claimable(user, now):
+    return Q(claimed_by__isnull=True) | Q(claim_expires_at__lt=now) | Q(claimed_by=user)
+
+def encode_cursor(row):
+    return f'{row["created_at"].isoformat()}~{row["id"]}'
+
+def decode_cursor(value):
+    try:
+        ts, pk = value.split("~")
+        return datetime.fromisoformat(ts), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+def pending_page(user, after=None, activity=None, event_slot=None,
+                 min_age_hours=None, max_age_hours=None, limit=25):
+    """
+    Claim and return the next page of pending submissions for `user`.
+    Returns (rows, next_cursor); rows are dicts of FIELDS.
+    """
+    now = timezone.now()
+    qs = (Submission.objects
+          .filter(status="pending")
+          .exclude(student__user=user)
+          .filter(_claimable(user, now)))
+    if activity:
+        qs = qs.filter(activity_id=activity)
+    if event_slot:
+        qs = qs.filter(event_slot_id=event_slot)
+    if min_age_hours is not None:
+        qs = qs.filter(created_at__lte=now - timedelta(hours=min_age_hours))
+    if max_age_hours is not None:
+        qs = qs.filter(created_at__gte=now - timedelta(hours=max_age_hours))
+    pos = decode_cursor(after) if after else None
+
+    # Whatever another verifier grabbed in between drops off the page, so keep
+    # going until it is full or the queue runs out. The cursor follows the
+    # candidates scanned, not the rows won, so a lost window still moves on.
+    rows, more = [], True
+    while more and len(rows) < limit:
+        window = qs
+        if pos:
+            window = qs.filter(Q(created_at__gt=pos[0]) | Q(created_at=pos[0], id__gt=pos[1]))
+        want = limit - len(rows)
+        candidates = list(window.order_by("created_at", "id").values_list("id", "created_at")[:want + 1])
+        more = len(candidates) > want
+        candidates = candidates[:want]
+        if not candidates:
+            break
+        ids = [pk for pk, _ in candidates]
+        claim(user, ids, now=now)
+        rows += (Submission.objects.filter(pk__in=ids, claimed_by=user, status="pending")
+                 .order_by("created_at", "id").values(*FIELDS))
+        pos = candidates[-1][1], candidates[-1][0]
+    return rows, (encode_cursor({"created_at": pos[0], "id": pos[1]}) if more else None)
+
+def claim(user, ids, now=None):
+    now = now or timezone.now()
+    return (Submission.objects
+            .filter(pk__in=ids, status="pending")
+            .filter(_claimable(user, now))
+            .update(claimed_by=user, claim_expires_at=now + CLAIM_LEASE))
+
+def release(user, ids):
+    return (Submission.objects.filter(pk__in=ids, claimed_by=user)
+            .update(claimed_by=None, claim_expires_at=None))
+
+def pending_count() -> int:
+    return cache.get_or_set("verify:pending_count",
+                            lambda: Submission.objects.filter(status="pending").count(),
+                            PENDING_COUNT_TTL)
+
+async def apending_count() -> int:
+    n = await cache.aget("verify:pending_count")
+    if n is None:
+        n = await Submission.objects.filter(status="pending").acount()
+        await cache.aset("verify:pending_count", n, PENDING_COUNT_TTL)
+    return n
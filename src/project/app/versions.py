@@ -0,0 +1,46 @@
+# app/versions.py
+"""
+Cheap version counters in the shared cache.
+
+Readers fold a version into cache keys / ETags; writers bump it after their
+transaction commits. A counter that was evicted restarts from the current
+time in milliseconds, so an old version number is never handed out again.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+def _key(name):
+    return f"ver:{name}"
+
+def get(name) -> int:
+    v = cache.get(_key(name))
+    if v is None:
+        cache.add(_key(name), int(time.time() * 1000), None)
+        v = cache.get(_key(name))
+    return v
+
+def get_many(names) -> dict:
+    found = cache.get_many([_key(n) for n in names])
+    return {n: found.get(_key(n)) or get(n) for n in names}
+
+async def aget(name) -> int:
+    v = await cache.aget(_key(name))
+    if v is None:
+        await cache.aadd(_key(name), int(time.time() * 1000), None)
+        v = await cache.aget(_key(name))
+    return v
+
+def _bump_now(names):
+    for name in names:
+        try:
+            cache.incr(_key(name))
+        except ValueError:
+            cache.add(_key(name), int(time.time() * 1000), None)
+
+def bump(*names):
+    """Advance the named versions once the current transaction commits."""
+    names = list(dict.fromkeys(names))
+    if names:
+        transaction.on_commit(lambda: _bump_now(names))
@@ -6,8 +6,12 @@ from django.contrib import messages
 from .models import Student
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Q
-from .models import Student, Registration, EventSlot, PointLedger, Activity
+from django.core.paginator import Paginator
+from .models import Student, Registration
+from . import leaderboard as lb
+from . import profile_cache
+from .auth_backends import find_by_email, normalize_email
+from .context_processors import aprepare
 def home(request):
     return render(request, 'main.html')
 
@@ -16,7 +20,7 @@ def sign(request):
         name = request.POST.get("name", "").strip()
         phone = request.POST.get("phone", "").strip()
         pnr = request.POST.get("pnr", "").strip()
-        email = request.POST.get("email", "").strip()
+        email = normalize_email(request.POST.get("email", ""))
         password = request.POST.get("password", "").strip()
         department = request.POST.get("department", "").strip()
         semester = request.POST.get("semester", "").strip()
@@ -27,7 +31,7 @@ def sign(request):
             return render(request, "signup.html")
 
         # Check duplicates
-        if User.objects.filter(email=email).exists():
+        if find_by_email(email) is not None:
             messages.error(request, "Email already registered!")
             return render(request, "signup.html")
 
@@ -59,19 +63,11 @@ def sign(request):
 
 def log(request):
     if request.method == "POST":
-        email = request.POST.get('email').strip()
-        password = request.POST.get('password').strip()
+        email = request.POST.get('email', '').strip()
+        password = request.POST.get('password', '').strip()
 
-        # Find user by email
-        try:
-            user_obj = User.objects.get(email=email)
-            username = user_obj.username
-        except User.DoesNotExist:
-            messages.error(request, "User with this email does not exist.")
-            return render(request, 'login.html')
-
-        # Authenticate user
-        user = authenticate(request, username=username, password=password)
+        # Single indexed lookup by email (app.auth_backends.EmailBackend)
+        user = authenticate(request, email=email, password=password)
         if user is not None:
             login(request, user)
             if request.user.is_staff:  # or use request.user.is_superuser for superuser only
@@ -82,7 +78,7 @@ def log(request):
             
                 return redirect('home')
         else:
-            messages.error(request, "Invalid password.")
+            messages.error(request, "Invalid email or password.")
             return render(request, 'login.html')
 
     return render(request, 'login.html')
@@ -90,47 +86,39 @@ def log(request):
 def logout_view(request):
     logout(request)
     return redirect('login')
+async def _apage(qs, number, per_page=10):
+    """Paginator page with the count and rows fetched through the async ORM."""
+    paginator = Paginator(qs, per_page)
+    paginator.count = await qs.acount()  # cached_property; set it so get_page() doesn't query
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
 @login_required(login_url='login')
-def profile(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+async def profile(request):
+    # Async: every read below is awaited, so this runs on the event loop under ASGI.
+    user, student = await aprepare(request)
 
-    # --- Registered events for this user (exclude canceled) ---
+    # --- Registered events for this user (exclude canceled), paged in SQL ---
     regs = (Registration.objects
             .select_related("event__activity")
-            .filter(user=request.user)
+            .filter(user=user)
             .exclude(status="canceled")
             .order_by("-created_at"))
-
-    # You can split into upcoming/past if you want:
     now = timezone.now()
-    registered_upcoming = [r for r in regs if r.event.end_at >= now]
-    registered_past = [r for r in regs if r.event.end_at <  now]
-
-    # --- Completed activities (approved submissions => PointLedger) ---
-    # If you only want submission-awarded points, filter source="submission"
-    completed_ledgers = (PointLedger.objects
-                         .select_related("activity")
-                         .filter(user=request.user, source="submission")
-                         .order_by("-created_at"))
-
-    # A simple distinct-by-activity list (one row per activity last completed)
-    seen = set()
-    completed_activities = []
-    for row in completed_ledgers:
-        if row.activity_id in seen:
-            continue
-        seen.add(row.activity_id)
-        completed_activities.append(row)
+    registered_upcoming = await _apage(regs.filter(event__end_at__gte=now), request.GET.get("upcoming"))
+    registered_past = await _apage(regs.filter(event__end_at__lt=now), request.GET.get("past"))
 
+    # Points, counts and completed activities: plain data cached per summary
+    # version (one cache read when nothing changed).
+    version = await profile_cache.asummary_version(user.id)
     return render(request, 'profile.html', {
-        'user': request.user,
+        'user': user,
         'student': student,
+        'summary': await profile_cache.asummary(user, version),
+        'rank': await lb.arank_of(lb.OVERALL, user),
         'registered_upcoming': registered_upcoming,
         'registered_past': registered_past,
-        'completed_activities': completed_activities,
     })
     
 def leader(request):
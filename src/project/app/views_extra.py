@@ -1,22 +1,40 @@
 # app/views_extra.py
-from datetime import timedelta
+import asyncio
+import json
+from datetime import date, timedelta
 from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum,F
+from django.db.models import Count, Sum,F, Q
 from django.views.decorators.http import require_POST
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse, FileResponse, Http404
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
 
 from .models import (
     Activity, EventSlot, Registration, Submission,
     approve_submission, reject_submission,
-    total_points, Reward, Redemption, redeem_reward, Student, PointLedger,
-    register_user_for_event,       # ← add this
+    Reward, Redemption, redeem_reward, Student,
     cancel_registration,
+    bulk_verify_submissions, describe_outcomes, submit_evidence, is_verifier,
 )
 from .forms import EventRegistrationForm, EventCancelForm, SubmissionForm, RedemptionForm
 from .permissions import admin_required, staff_or_volunteer_required
-from .throttling import simple_rate_limit
+from .throttling import rate_limit
+from . import leaderboard as lb
+from . import rollups
+from . import batching
+from . import verification
+from . import event_listing
+from . import recurrence
+from . import onboarding
+from . import versions
+from . import live
+from .context_processors import aprepare
+from django.core.cache import cache
+from .uploads import max_upload_bytes, use_hashing_handler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
 # ----- Activities -----
 @admin_required
@@ -26,19 +44,87 @@ def activities_admin(request):
     return render(request, "admin.html", {"activities": items})  # uses your admin.html
 
 # ----- Events -----
+def _listing_params(request):
+    g = request.GET
+    try:
+        anchor = date.fromisoformat(g.get("date", ""))
+    except ValueError:
+        anchor = timezone.localdate()
+    return {
+        "mode": g.get("view") if g.get("view") in event_listing.MODES else "list",
+        "anchor": anchor,
+        "tier": _int_or_none(g.get("tier")),
+        "location": g.get("location") or None,
+        "include_full": g.get("include_full") == "true",
+    }
+
 @login_required
-def active_events(request):
-    include_full = request.GET.get("include_full") == "true"
-    now = timezone.now()
-    qs = EventSlot.objects.filter(end_at__gte=now).select_related("activity")
-    if not include_full:
-        qs = qs.filter(registered_count__lt=F("max_participants"))
+async def active_events(request):
+    # Async: all reads are awaited, so under ASGI this stays on the event loop.
+    user, _ = await aprepare(request)
+    params = _listing_params(request)
+    events, next_cursor = await event_listing.aactive_page(after=request.GET.get("after"), **params)
+    ctx = {**params, "events": events, "next_cursor": next_cursor,
+           "tiers": Activity.TIER_CHOICES, "locations": await event_listing.alocations()}
+    if params["mode"] != "list":
+        ctx["window_start"], window_end, ctx["prev_anchor"], ctx["next_anchor"] = \
+            event_listing.window(params["mode"], params["anchor"])
+        ctx["window_end"] = window_end - timedelta(days=1)
+    # The viewer's own waitlist spots ("you are #N"), read straight off the row
+    ctx["waitlisted"] = [r async for r in (Registration.objects.select_related("event__activity")
+                         .filter(user=user, status="waitlisted", event__end_at__gte=timezone.now())
+                         .order_by("event__start_at"))]
     # Hand to existing events.html
-    return render(request, "events.html", {"events": qs})
+    return render(request, "events.html", ctx)
+
+STREAM_MAX_IDS = 100
+STREAM_HEARTBEAT = 15  # seconds; keeps proxies from closing an idle stream
+
+def _sse(data, event=None):
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+@login_required
+async def event_stream(request):
+    """
+    Server-sent capacity updates for the slots on the events page (?ids=1,2,3).
+    Under ASGI the connection stays open and is fed by live.hub; under WSGI
+    we send one snapshot and let EventSource reconnect, so a sync worker is
+    never parked on an idle client.
+    """
+    await aprepare(request)
+    ids = sorted({int(x) for x in request.GET.get("ids", "").split(",") if x.isdigit()})[:STREAM_MAX_IDS]
+    if not ids:
+        return HttpResponse("ids required", status=400)
+    first = await live.snapshot(ids)
+
+    if not isinstance(request, ASGIRequest):
+        body = "retry: 5000\n" + "".join(_sse(row, "capacity") for row in first)
+        response = HttpResponse(body, content_type="text/event-stream")
+    else:
+        async def stream():
+            queue = live.hub.subscribe(ids)
+            try:
+                yield "retry: 2000\n"
+                for row in first:
+                    yield _sse(row, "capacity")
+                while True:
+                    try:
+                        row = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    yield _sse(row, "capacity")
+            finally:
+                live.hub.unsubscribe(queue)
+        response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
 
 @login_required
 @require_POST
-@simple_rate_limit("event_reg", limit=20, window_sec=60)
+@rate_limit("event_reg", limit=20, window_sec=60, key="user+ip")
 def register_event(request):
     form = EventRegistrationForm(request.POST)
     if not form.is_valid():
@@ -46,11 +132,13 @@ def register_event(request):
         return redirect("event")
     ev = get_object_or_404(EventSlot, pk=form.cleaned_data["event_id"])
     try:
-        reg = register_user_for_event(request.user, ev)
+        reg = batching.register(request.user, ev)
         if reg.status == "registered":
             messages.success(request, "Registered for event!")
         else:
             messages.info(request, "Event is full. You have been waitlisted.")
+    except batching.StillProcessing:
+        messages.info(request, "Still processing your registration; check your registrations in a moment.")
     except ValueError as e:
         messages.error(request, str(e))
     return redirect("event")
@@ -69,50 +157,106 @@ def cancel_event_registration(request):
 
 # ----- Submissions -----
 @login_required
+@csrf_exempt
 def create_submission(request):
+    # evidence size cap + streaming hash apply to this upload only
+    use_hashing_handler(request)
+    return _create_submission(request)
+
+@csrf_protect
+def _create_submission(request):
     if request.method == "POST":
         form = SubmissionForm(request.POST, request.FILES)
+        if getattr(request, "upload_too_large", False):
+            form.add_error("evidence_file", f"File too large (max {max_upload_bytes() // (1024 * 1024)} MB).")
         if form.is_valid():
             sub = form.save(commit=False)
             sub.student = get_object_or_404(Student, user=request.user)
-            # Optional cap check: monthly cap per student
-            cap = sub.activity.monthly_cap_per_student
-            if cap:
-                start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                used = PointLedger.objects.filter(
-                    user=request.user,
-                    activity=sub.activity,
-                    created_at__gte=start
-                ).count()
-                if used >= cap:
-                    messages.error(request, "Monthly cap reached for this activity.")
-                    return redirect("profile")
-            sub.save()
+            try:
+                # reserves a slot of the activity's monthly cap (if any) atomically
+                submit_evidence(sub, upload=form.cleaned_data.get("evidence_file"))
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect("profile")
             messages.success(request, "Submission created. Awaiting verification.")
             return redirect("profile")
     else:
         form = SubmissionForm()
     return render(request, "profile.html", {"submission_form": form})
 
+@login_required
+def evidence_file(request, name):
+    """Evidence files and thumbnails, for verifiers and the student who submitted them."""
+    subs = Submission.objects.filter(
+        Q(evidence_file=name) | Q(evidence_blob__file=name) | Q(evidence_blob__thumbnail=name))
+    if not is_verifier(request.user):
+        subs = subs.filter(student__user=request.user)
+    if not name or not subs.exists():
+        raise Http404
+    try:
+        return FileResponse(default_storage.open(name))
+    except FileNotFoundError:
+        raise Http404
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 @staff_or_volunteer_required
 def verify_queue(request):
-    # Volunteers/Admins: see pending (excluding own submissions)
-    qs = Submission.objects.select_related("student__user","activity").filter(status="pending")
-    qs = qs.exclude(student__user=request.user)
-    return render(request, "admin.html", {"pending_submissions": qs})
+    # Volunteers/Admins: claim and see one page of pending (excluding own submissions)
+    g = request.GET
+    rows, next_cursor = verification.pending_page(
+        request.user,
+        after=g.get("after"),
+        activity=_int_or_none(g.get("activity")),
+        event_slot=_int_or_none(g.get("event_slot")),
+        min_age_hours=_int_or_none(g.get("min_age")),
+        max_age_hours=_int_or_none(g.get("max_age")),
+    )
+    filters = g.copy()
+    filters.pop("after", None)
+    return render(request, "admin.html", {
+        "pending_submissions": rows,
+        "next_cursor": next_cursor,
+        "queue_filters": filters.urlencode(),
+    })
 
 @staff_or_volunteer_required
 @require_POST
-@simple_rate_limit("verify", limit=30, window_sec=60)
+@rate_limit("verify", limit=30, window_sec=60, key="user")
 def approve_submission_view(request, pk):
     sub = get_object_or_404(Submission, pk=pk)
     try:
         approve_submission(sub, request.user, comment=request.POST.get("comment",""))
         messages.success(request, "Submission approved and points awarded.")
-    except PermissionError as e:
+    except (PermissionError, ValueError) as e:
         messages.error(request, str(e))
     return redirect("verify_queue")
 
+@staff_or_volunteer_required
+@require_POST
+@rate_limit("verify", limit=30, window_sec=60, key="user")
+def bulk_verify_view(request):
+    """POST ids=<pk>&ids=<pk>...&action=approve|reject[&comment=...]"""
+    action = request.POST.get("action", "approve")
+    try:
+        ids = [int(i) for i in request.POST.getlist("ids")]
+        report = bulk_verify_submissions(ids, request.user, action, comment=request.POST.get("comment", ""))
+    except ValueError:
+        messages.error(request, "Invalid request.")
+        return redirect("verify_queue")
+    if "application/json" in request.headers.get("Accept", ""):
+        return JsonResponse({"results": {str(k): v for k, v in report.items()}})
+    summary, ok = describe_outcomes(report)
+    if ok:
+        messages.success(request, summary or "Nothing selected.")
+    else:
+        messages.warning(request, summary)
+    return redirect("verify_queue")
+
 @staff_or_volunteer_required
 @require_POST
 def reject_submission_view(request, pk):
@@ -126,19 +270,33 @@ def reject_submission_view(request, pk):
 
 # ----- Leaderboard -----
 @login_required
-def leaderboard(request):
-    now = timezone.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    overall = (PointLedger.objects
-               .values("user__id","user__first_name")
-               .annotate(total=Sum("points"))
-               .order_by("-total","user__first_name"))
-    monthly = (PointLedger.objects
-               .filter(created_at__gte=month_start)
-               .values("user__id","user__first_name")
-               .annotate(total=Sum("points"))
-               .order_by("-total","user__first_name"))
-    return render(request, "leader.html", {"overall": overall, "monthly": monthly})
+async def leaderboard(request):
+    # Served from the precomputed standings (app/leaderboard.py), not the ledger.
+    # ?period=2025-08 | 2025-S1 | 2025-01..2025-03 picks the left-hand board.
+    # The shared boards are cached per "leaderboard" version; only the
+    # viewer's own neighbourhood is read per request.
+    user, _ = await aprepare(request)
+    period = request.GET.get("period", "")
+    bounds = rollups.parse_period(period) if period else None
+    after = request.GET.get("after") if lb.decode_cursor(request.GET.get("after")) else None
+    version = await versions.aget("leaderboard")
+    span = f"{bounds[0]:%Y-%m}..{bounds[1]:%Y-%m}" if bounds else lb.month_board()
+    key = f"lb:view:{version}:{span}:{after or ''}"
+    boards = await cache.aget(key)
+    if boards is None:
+        if bounds and rollups.add_months(bounds[0], 1) != bounds[1]:
+            monthly = await rollups.astandings(*bounds)  # multi-month: sum the buckets
+        else:
+            board = bounds[0].strftime("%Y-%m") if bounds else lb.month_board()
+            monthly, _ = await lb.atop(board, limit=20)
+        overall, overall_next = await lb.atop(lb.OVERALL, limit=20, after=after)
+        boards = {"overall": overall, "monthly": monthly, "overall_next": overall_next}
+        await cache.aset(key, boards, 600)
+    return render(request, "leader.html", {
+        **boards,
+        "period": period if bounds else "",
+        "me": await lb.aaround(lb.OVERALL, user),
+    })
 
 # ----- Rewards & Redemptions -----
 @login_required
@@ -148,7 +306,7 @@ def rewards_list(request):
 
 @login_required
 @require_POST
-@simple_rate_limit("redeem", limit=10, window_sec=60)
+@rate_limit("redeem", limit=10, window_sec=60, key="user+ip")
 def redeem(request):
     form = RedemptionForm(request.POST)
     if not form.is_valid():
@@ -177,7 +335,6 @@ def fulfill_redemption(request, rid):
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import user_passes_test
 from django.utils import timezone
-from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 
@@ -190,12 +347,12 @@ admin_required = user_passes_test(_is_admin)
 def activities_admin(request):
     """
     GET: render admin.html with activities list
-    POST: create activity + one EventSlot from the HTML form fields
+    POST: preview, then create an activity with one or many (recurring) EventSlots
     """
     if request.method == "POST":
         title = request.POST.get("title","").strip()
         description = request.POST.get("description","").strip()
-        location = request.POST.get("location","").strip()
+        location = request.POST.get("location","").strip() or "TBD"
         slots = int(request.POST.get("slots") or 0)
         # tier/points: HTML adds a hidden input we'll wire in admin.html below
         try:
@@ -203,62 +360,132 @@ def activities_admin(request):
         except ValueError:
             tier = 2
 
-        date = (request.POST.get("date") or "").strip()
-        time_s = (request.POST.get("time") or "").strip()
-
         if not title or not slots:
             messages.error(request, "Title and number of slots are required.")
             return redirect("activities_admin")
 
-        # Build datetime if provided, else default to now → now + 1h
-        from datetime import datetime, timedelta
-        from django.utils import timezone as tz
+        try:
+            spans = _schedule_from_post(request.POST)
+        except ValueError as e:
+            messages.error(request, f"Invalid schedule: {e}")
+            return redirect("activities_admin")
+        clashes = recurrence.conflicts(location, spans)
 
-        if date and time_s:
-            start_at = tz.make_aware(datetime.fromisoformat(f"{date}T{time_s}"))
-        elif date:
-            start_at = tz.make_aware(datetime.fromisoformat(f"{date}T09:00"))
-        else:
-            start_at = tz.now() + timedelta(minutes=10)
-        end_at = start_at + timedelta(hours=1)
-
-        with transaction.atomic():
-            act = Activity.objects.create(
-                title=title,
-                description=description,
-                tier=tier,
-                requires_proof=False,
-                monthly_cap_per_student=None,
-            )
-            EventSlot.objects.create(
-                activity=act,
-                start_at=start_at,
-                end_at=end_at,
-                max_participants=max(1, slots),
-                location=location or "TBD",
-                notes="",
-            )
-        messages.success(request, "Activity created.")
+        if request.POST.get("action") != "confirm":
+            # preview: show the expansion and re-post the same fields on confirm
+            return render(request, "admin.html", {
+                **_activity_rows(request), "weekday_choices": WEEKDAYS,
+                "preview": {"title": title, "location": location, "spans": spans,
+                            "conflicts": clashes, "fields": _repost_fields(request.POST)},
+            })
+        if clashes and not request.POST.get("allow_overlap"):
+            messages.error(request, f"{len(clashes)} slot(s) overlap existing events at {location}.")
+            return redirect("activities_admin")
+
+        recurrence.create_series(
+            spans, capacity=max(1, slots), location=location,
+            title=title, description=description, tier=tier,
+            requires_proof=False, monthly_cap_per_student=None,
+        )
+        messages.success(request, f"Activity created with {len(spans)} slot(s).")
         return redirect("activities_admin")
 
-    # GET list
-    acts = (Activity.objects
-            .all()
-            .order_by("-created_at")
-            .prefetch_related("slots"))
-    # Flatten for simple template loop
-    rows = []
-    for a in acts:
-        for s in a.slots.all():
-            rows.append({
-                "id": a.id, "title": a.title, "description": a.description,
-                "points": a.tier, "slots": s.max_participants,
-                "date": s.start_at.date().isoformat(),
-                "time": s.start_at.time().strftime("%H:%M"),
-                "location": s.location,
-                "slot_id": s.id
-            })
-    return render(request, "admin.html", {"activities": rows})
+    return render(request, "admin.html", {**_activity_rows(request), "weekday_choices": WEEKDAYS})
+
+WEEKDAYS = list(enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]))
+
+def _schedule_from_post(post):
+    """Form fields -> [(start_at, end_at)]; raises ValueError on bad input."""
+    from datetime import time as dtime
+    day_s = (post.get("date") or "").strip()
+    time_s = (post.get("time") or "").strip()
+    if day_s:
+        first = date.fromisoformat(day_s)
+        start = dtime.fromisoformat(time_s) if time_s else dtime(9, 0)
+    else:
+        soon = timezone.localtime() + timedelta(minutes=10)
+        first, start = soon.date(), soon.time().replace(second=0, microsecond=0)
+    duration = timedelta(minutes=int(post.get("duration") or 60))
+    weekdays = sorted({int(d) for d in post.getlist("weekdays") if d.isdigit() and int(d) < 7})
+    until = date.fromisoformat(post["until"]) if post.get("until") else first
+    skip = recurrence.holidays() | {date.fromisoformat(d.strip())
+                                    for d in (post.get("skip") or "").replace("\n", ",").split(",") if d.strip()}
+    return recurrence.expand(first, until, weekdays, start, duration, skip=skip)
+
+def _repost_fields(post):
+    return [(k, v) for k, vals in post.lists() if k not in ("csrfmiddlewaretoken", "action") for v in vals]
+
+ACTIVITY_SORTS = {
+    "new": ("-created_at", "-id"),
+    "title": ("title", "id"),
+    "fill": ("-fill_rate", "-id"),
+    "pending": ("-pending", "-id"),
+    "slots": ("-slot_count", "-id"),
+}
+
+def _activity_rows(request):
+    """One page of activities with their slot/registration aggregates, all computed in SQL."""
+    from django.core.paginator import Paginator
+    from django.db.models import (Case, ExpressionWrapper, FloatField, IntegerField, Max,
+                                  OuterRef, Q, Subquery, Value, When)
+    from django.db.models.functions import Coalesce
+
+    pending = (Submission.objects
+               .filter(activity=OuterRef("pk"), status="pending")
+               .order_by().values("activity").annotate(c=Count("id")).values("c"))
+    qs = (Activity.objects
+          .annotate(
+              slot_count=Count("slots"),
+              capacity=Coalesce(Sum("slots__max_participants"), 0),
+              registered=Coalesce(Sum("slots__registered_count"), 0),
+              last_start=Max("slots__start_at"),
+              pending=Coalesce(Subquery(pending, output_field=IntegerField()), 0),
+          )
+          .annotate(fill_rate=Case(
+              When(capacity=0, then=Value(0.0)),
+              default=ExpressionWrapper(100.0 * F("registered") / F("capacity"), output_field=FloatField()),
+              output_field=FloatField())))
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
+    sort = request.GET.get("sort") if request.GET.get("sort") in ACTIVITY_SORTS else "new"
+    qs = qs.order_by(*ACTIVITY_SORTS[sort]).values(
+        "id", "title", "description", "tier", "slot_count", "capacity",
+        "registered", "fill_rate", "pending", "last_start")
+    page = Paginator(qs, 20).get_page(request.GET.get("page"))
+    return {"activities": page, "activity_q": q, "activity_sort": sort}
+
+@admin_required
+@require_POST
+def import_students_view(request):
+    """Registrar CSV upload; same path as the import_students command."""
+    import io
+    from itertools import islice
+    upload = request.FILES.get("csv_file")
+    if not upload:
+        messages.error(request, "Choose a CSV file to import.")
+        return redirect("activities_admin")
+    try:
+        fh = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        rows = list(islice(onboarding.iter_rows(fh), onboarding.WEB_MAX_ROWS + 1))
+        hashed = sum(1 for _, row in rows if row.get("password"))
+        if len(rows) > onboarding.WEB_MAX_ROWS or hashed > onboarding.WEB_MAX_PASSWORDS:
+            messages.error(request, f"Too big to import here (over {onboarding.WEB_MAX_ROWS} rows or "
+                                    f"{onboarding.WEB_MAX_PASSWORDS} passwords): use `manage.py import_students`.")
+            return redirect("activities_admin")
+        # hash inline: forking a process pool from a web worker would copy its
+        # DB/cache connections
+        report = onboarding.import_students(rows, workers=1,
+                                            dry_run=request.POST.get("dry_run") == "1")
+    except (ValueError, UnicodeDecodeError) as e:
+        messages.error(request, f"Import failed: {e}")
+        return redirect("activities_admin")
+    messages.success(request, f"{report['created']} student(s) imported in {report['seconds']:.1f}s; "
+                              f"{report['existing']} already registered, {report['duplicate']} duplicate, "
+                              f"{report['invalid']} invalid.")
+    for line, reason in report["errors"][:10]:
+        messages.warning(request, f"line {line}: {reason}")
+    return redirect("activities_admin")
 
 @admin_required
 @require_POST
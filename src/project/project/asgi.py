@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The read-heavy pages (events, leaderboard, profile) are async views, so under
+an ASGI server they run on the event loop instead of holding a worker thread:
+
+    uvicorn project.asgi:application --workers 4
+
+`manage.py bench_serving` compares this against the gunicorn (WSGI) deployment.
 """
 
 import os
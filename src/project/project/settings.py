@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import hashlib
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,10 +40,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'app',
 ]
 
 MIDDLEWARE = [
+    'app.metrics.MetricsMiddleware',  # outermost, so session/auth queries are counted too
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,12 +67,14 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.verify_badge',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'project.wsgi.application'
+ASGI_APPLICATION = 'project.asgi.application'
 
 
 # Database
@@ -81,9 +88,45 @@ DATABASES = {
 }
 
 
+# JSON API (app/api.py)
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
+
+
+# Cache
+# One cache shared by every worker process of this checkout (rate limits,
+# counters, cached fragments), kept in shared memory where the OS provides it.
+# The file name carries a hash of BASE_DIR so other checkouts on the host get
+# their own; set ECO_CAMPUS_CACHE_PATH to choose the file. See app/cache_backends.py.
+
+_CACHE_DIR = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+_CACHE_PATH = os.environ.get('ECO_CAMPUS_CACHE_PATH') or str(
+    _CACHE_DIR / f"eco-campus-cache-{hashlib.sha1(str(BASE_DIR).encode()).hexdigest()[:12]}.sqlite3")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'app.cache_backends.SharedFileCache',
+        'LOCATION': _CACHE_PATH,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+AUTHENTICATION_BACKENDS = [
+    'app.auth_backends.EmailBackend',  # case-insensitive email login, one indexed lookup
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,7 +160,36 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded evidence (see app/uploads.py)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Evidence uploads get app.uploads.HashingUploadHandler in their own view;
+# every other upload keeps Django's default handlers.
+EVIDENCE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Collect concurrent sign-ups for the same EventSlot into one locked transaction
+# (see app/batching.py). Only worth enabling with threaded WSGI workers: under
+# ASGI sync views share one thread, so sign-ups never land in the same batch.
+REGISTRATION_GROUP_COMMIT = False
+
+# Campus closure days the recurring schedule generator skips (app/recurrence.py).
+CAMPUS_HOLIDAYS = []  # e.g. ["2025-10-02", "2025-12-25"]
+
+# PointLedger months older than this are folded into summary rows by
+# `manage.py archive_ledger` (app/archival.py); the raw rows go to PointLedgerArchive.
+LEDGER_ARCHIVE_AFTER_DAYS = 365
+
+# Per-view latency/SQL histograms at /metrics/ (app/metrics.py). Slow requests
+# are logged with their slowest statements, for a sample of them.
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_LOG_SAMPLE = 0.1
+# Staff sessions can always read /metrics/. To let a Prometheus scraper in
+# without a login, list its address here, e.g. ['10.0.0.5']. Don't list
+# 127.0.0.1 behind a same-host reverse proxy: every client would then match.
+METRICS_ALLOWED_IPS = []